@@ -1,13 +1,27 @@
 
 import streamlit as st
 import cv2
-import tempfile
 import numpy as np
 import io
+import json
+import os
+import time
+import uuid
 from PIL import Image
 from vision.detector import IncidentDetector
 from nlp.report_generator import ReportGenerator
+from nlp.report_cache import ReportCache
+from nlp.report_worker import ReportWorker
+from nlp.backends import set_torch_threads
 from utils.risk_assessment import calculate_risk
+from utils.video_ingest import spooled_upload, VideoFrameReader
+from utils.model_loader import BackgroundModel, startup_report
+from utils.metrics import METRICS
+from utils.event_store import EventStore
+from vision.motion_sampler import AdaptiveSampler
+from vision.overlay import OverlayRenderer
+from vision.autotune import resolve_settings
+from service.client import InferenceClient, RemoteDetector, RemoteReporter
 
 # Page Config
 st.set_page_config(
@@ -49,16 +63,85 @@ st.markdown("---")
 st.sidebar.header("🔧 System Controls")
 st.sidebar.info("Model Layer: YOLOv8x + Flan-T5-Base")
 st.sidebar.success("Environment: CPU-Optimized Inference")
-confidence_threshold = st.sidebar.slider("Detection Sensitivity", 0.1, 1.0, 0.25)
+# Defaults to the node's autotuned threshold / backend (python -m vision.autotune), else the detector defaults
+node_settings = resolve_settings()[0]
+confidence_threshold = st.sidebar.slider("Detection Sensitivity", 0.05, 1.0, float(node_settings["conf"]),
+                                         help="Confidence threshold of the main detector (lower finds more objects)")
 input_source = st.sidebar.radio("Input Source", ["Upload Image", "Upload Video"])
+VISION_BACKENDS = ["pytorch", "onnx", "openvino"]
+vision_backend = st.sidebar.selectbox("Vision Engine", VISION_BACKENDS,
+                                      index=VISION_BACKENDS.index(node_settings["backend"]),
+                                      help="onnx/openvino: one-time export cached next to the .pt weights")
+tile_size = st.sidebar.selectbox("High-Res Tiling", [None, 640, 1024],
+                                 format_func=lambda size: "off" if size is None else f"{size} px tiles",
+                                 help="4K / panoramic cameras: detect on overlapping native-resolution tiles")
+zone_file = st.sidebar.file_uploader("Zone Layout (JSON)", type=["json"],
+                                     help='Lane / shoulder / crosswalk / ignore polygons; key "*" applies to this feed')
+adaptive_sampling = st.sidebar.checkbox("Motion-Adaptive Sampling", value=True,
+                                        help="Skip inference on static footage; analyze every sampled frame on motion or incidents")
+record_events = st.sidebar.checkbox("Record Events", value=False,
+                                    help="Store per-frame detections and incidents in cache/events.sqlite for queries and replay")
+METRICS.enabled = st.sidebar.checkbox("Performance Instrumentation", value=METRICS.enabled,
+                                      help="Per-stage latency histograms; Prometheus text served on localhost:9108/metrics")
+report_backend = st.sidebar.selectbox("Report Engine", ["pytorch", "int8", "onnx"],
+                                      help="pytorch: fp32 reference, int8: quantized Flan-T5, onnx: ONNX Runtime export (needs optimum)")
+report_threads = st.sidebar.number_input("Report Threads", min_value=0, max_value=os.cpu_count() or 8, value=0,
+                                         help="CPU threads of the report model (0: library default). "
+                                              "pytorch / int8 share torch's process-wide pool with the vision engine")
+service_url = st.sidebar.text_input("Inference Service", os.environ.get("CITYGUARD_SERVICE", ""),
+                                    help="URL of a shared local service (python -m service.server); "
+                                         "empty: load the models in this dashboard").strip()
 
 # Load Models (Cached)
+# Each engine loads on its own background thread (heavy imports included), so the
+# page renders at once and image analysis can start before Flan-T5 is ready.
 @st.cache_resource
-def load_models():
+def load_service_client(url):
+    # One session per dashboard process; browser sessions use their own streams in it
+    # (see video_stream_id). Frames go through shared memory on this host
+    return InferenceClient(url)
+
+@st.cache_resource
+def load_detector(backend, url=""):
+    # The shared service owns engines, tiling and zones (engine settings are its CLI flags)
+    if url:
+        return BackgroundModel("vision", lambda: RemoteDetector(load_service_client(url)))
     # v2 - Forced reload to update class definition with 'track' support
-    detector = IncidentDetector()
-    reporter = ReportGenerator()
-    return detector, reporter
+    # Fire cascade only gates video streams; still images always get the fire model
+    return BackgroundModel("vision", lambda: IncidentDetector(fire_cascade=True, backend=backend),
+                           imports=("torch", "ultralytics"))
+
+@st.cache_resource
+def apply_torch_threads(threads):
+    # torch's pool is process-wide: sized once per setting, before the engines load
+    set_torch_threads(threads)
+
+@st.cache_resource
+def load_reporter(backend, url="", threads=0):
+    if url:
+        return BackgroundModel("report", lambda: RemoteReporter(load_service_client(url)))
+    # Equivalent scenes reuse a stored report (persisted across restarts)
+    return BackgroundModel("report", lambda: ReportGenerator(
+        cache=ReportCache(max_entries=256, ttl=6 * 3600, disk_path="cache/reports.sqlite"),
+        deterministic=True, backend=backend, num_threads=threads or None), imports=("torch", "transformers"))
+
+@st.cache_resource
+def load_report_worker(_reporter, backend, url="", threads=0):
+    # Background T5 generation so the video loop keeps its frame rate
+    return ReportWorker(_reporter, max_pending=4, drop_policy="oldest")
+
+@st.cache_resource
+def load_event_store():
+    # Shared append-only store; rows are written in batched transactions
+    return EventStore("cache/events.sqlite")
+
+def get_report_worker():
+    """
+    Report worker once the language model is ready, else None.
+    """
+    if not report_model.is_ready():
+        return None
+    return load_report_worker(report_model.get(), report_backend, service_url, report_threads)
 
 # Research Abstract Section
 with st.expander("📝 Project Abstract & Research Context", expanded=False):
@@ -75,30 +158,81 @@ with st.expander("📝 Project Abstract & Research Context", expanded=False):
     - **Edge Efficiency:** Designed for deployment on low-power local computing (CPU-only).
     """)
 
-with st.spinner("Initializing SOTA Neural Engines..."):
-    detector, reporter = load_models()
+if report_threads and report_backend != "onnx" and not service_url:
+    apply_torch_threads(report_threads)
+vision_model = load_detector(vision_backend, service_url)
+report_model = load_reporter(report_backend, service_url, report_threads)
+
+with st.sidebar.expander("⏱️ Startup Timing", expanded=False):
+    st.text(startup_report(vision_model, report_model))
+
+@st.cache_resource
+def start_metrics_endpoint():
+    try:
+        METRICS.serve(9108)
+    except OSError as e: # Port taken (e.g. another dashboard on this node)
+        print(f"Warning: metrics endpoint not started: {e}")
+
+metrics_panel = st.sidebar.empty()
+
+def render_metrics_panel():
+    """
+    Compact live view of stage latencies and counters in the sidebar.
+    """
+    snap = METRICS.snapshot()
+    lines = ["stage              p50 ms   p95 ms"]
+    for stage, stats in sorted(snap["stages"].items()):
+        lines.append(f"{stage:18s} {stats['p50_ms']:7.1f}  {stats['p95_ms']:7.1f}")
+    for name, value in sorted({**snap["counters"], **snap["gauges"]}.items()):
+        lines.append(f"{name}: {value}")
+    metrics_panel.code("\n".join(lines), language=None)
+
+if METRICS.enabled:
+    start_metrics_endpoint()
+    render_metrics_panel()
 
 col1, col2 = st.columns([1, 1])
 
+ANALYSIS_FPS = 6.0 # Frames analyzed per second of footage, independent of the source FPS
+DISPLAY_FPS = 12.0 # Overlay refresh rate of the video view, independent of the analysis rate
+
+def session_zones(detector):
+    """
+    Zone layout of this browser session (key "*" of the uploaded file). It is
+    passed per call, so sessions sharing the cached detector never see each other's zones.
+    """
+    if service_url or not zone_file:
+        return None # Service: configured there
+    raw = zone_file.getvalue()
+    cached = st.session_state.get("zone_map")
+    if cached is None or cached[0] != raw:
+        zone_config = json.loads(raw)
+        zone_map = detector.zone_map(zone_config["*"]) if "*" in zone_config else None
+        cached = st.session_state["zone_map"] = (raw, zone_map)
+    return cached[1]
+
 def process_frame(frame_image, track=False):
+    detector = vision_model.get()
+    zones = session_zones(detector)
+
     # Convert PIL to CV2
-    img_cv = cv2.cvtColor(np.array(frame_image), cv2.COLOR_RGB2BGR)
+    with METRICS.time("cvtColor"):
+        img_cv = cv2.cvtColor(np.array(frame_image), cv2.COLOR_RGB2BGR)
     
     # Vision Inference (Dual Result)
-    main_res, fire_res = detector.detect(img_cv, track=track)
-    incident_type, details = detector.analyze_incident(main_res, fire_res)
-    
-    # Overlay results (Using main detection plotted image)
-    annotated_frame = main_res.plot()
-    annotated_frame_rgb = cv2.cvtColor(annotated_frame, cv2.COLOR_BGR2RGB)
+    main_res, fire_res = detector.detect(img_cv, track=track, conf=confidence_threshold, tile_size=tile_size or 0)
+    incident_type, details, analysis = detector.analyze_incident(main_res, fire_res, zones=zones,
+                                                                 return_analysis=True)
     
     # Risk Assessment
-    risk_level = calculate_risk(incident_type, 0.8, details)
+    with METRICS.time("calculate_risk"):
+        risk_level = calculate_risk(incident_type, 0.8, details)
     
-    # NLP Inference
-    report_text = reporter.generate_report(incident_type, details, risk_level)
+    # Overlay results (drawn straight into an RGB buffer, no separate conversion)
+    with METRICS.time("render"):
+        annotated_frame_rgb = OverlayRenderer().render(img_cv, analysis, risk_level, force=True)
     
-    return annotated_frame_rgb, incident_type, risk_level, report_text, details
+    return annotated_frame_rgb, incident_type, risk_level, details
 
 if input_source == "Upload Image":
     uploaded_file = st.sidebar.file_uploader("Choose a CCTV Image...", type=["jpg", "png", "jpeg"])
@@ -117,8 +251,8 @@ if input_source == "Upload Image":
             st.image(image, caption="Original CCTV Footage", width='stretch')
             
         if st.button("Analyze Scene"):
-            with st.spinner("Processing Multimodal Data..."):
-                result_img, inc_type, risk, report, details = process_frame(image)
+            with st.spinner("Processing Visual Data..."):
+                result_img, inc_type, risk, details = process_frame(image)
                 
                 with col1:
                     st.image(result_img, caption="AI Detection Output", width='stretch')
@@ -139,22 +273,40 @@ if input_source == "Upload Image":
                         st.markdown(f"<ul style='list-style-type:none; padding:0;'>{flags_html}</ul>", unsafe_allow_html=True)
 
                     st.markdown("#### 📝 Auto-Generated Report")
+                    # NLP Inference (waits here if the language model is still loading)
+                    with st.spinner("Loading Report Engine..."):
+                        reporter = report_model.get()
                     box_class = f"{risk.lower()}-risk"
-                    st.markdown(f"""
+                    report_box = st.empty()
+
+                    def show_report(text):
+                        report_box.markdown(f"""
 <div class="report-box {box_class}">
     <p style="font-size:1.1em; font-family:sans-serif; margin:0;">
-    {report}
+    {text}
     </p>
 </div>
 """, unsafe_allow_html=True)
 
+                    # The report box fills in as tokens are decoded
+                    report = ""
+                    with st.spinner("Generating Report..."):
+                        for piece in reporter.generate_report_stream(inc_type, details, risk):
+                            report += piece
+                            show_report(report + " ▌")
+                    show_report(report)
+
 elif input_source == "Upload Video":
     uploaded_file = st.sidebar.file_uploader("Choose a CCTV Video...", type=["mp4", "avi", "mov", "MP4", "AVI", "MOV"])
     if uploaded_file:
-        tfile = tempfile.NamedTemporaryFile(delete=False)
-        tfile.write(uploaded_file.read())
-        vf = cv2.VideoCapture(tfile.name)
-        
+        with st.spinner("Initializing SOTA Vision Engines..."):
+            detector = vision_model.get()
+        zones = session_zones(detector)
+        # The detector (and the service session behind it) is shared by all browser
+        # sessions: tracks, history and fire cascade are kept per session stream
+        video_stream_id = st.session_state.setdefault("video_stream_id", uuid.uuid4().hex)
+        detector.reset_stream(video_stream_id) # New upload / rerun: start from fresh tracks
+
         # Use existing columns for video layout
         with col1:
             st_image_container = st.empty()
@@ -166,47 +318,25 @@ elif input_source == "Upload Video":
             st.markdown("#### 📝 Auto-Generated Report")
             report_box = st.empty()
 
-        frame_count = 0
-        
-        while vf.isOpened():
-            ret, frame = vf.read()
-            if not ret:
-                break
-            
-            frame_count += 1
-            if frame_count % 5 != 0:
-                continue
-
-            # Run Dual Detection
-            main_res, fire_res = detector.detect(frame, track=True)
-            res_plotted = main_res.plot()
-            st_image_container.image(res_plotted, channels="BGR", width='stretch')
-            
-            # Hybrid Analyze
-            incident_type, details = detector.analyze_incident(main_res, fire_res)
-            
-            # Risk Assessment
-            risk = calculate_risk(incident_type, 0.8, details)
-            
-            # Update Info
-            if frame_count % 30 == 0 or frame_count == 5:
-                report_text = reporter.generate_report(incident_type, details, risk)
-                
-                risk_color = "green"
-                if risk == "HIGH": risk_color = "red"
-                elif risk == "MEDIUM": risk_color = "orange"
-                
-                status_text.markdown(f"**Status:** {incident_type}")
-                risk_text.markdown(f"**Risk Level:** <span style='color:{risk_color}; font-weight:bold'>{risk}</span>", unsafe_allow_html=True)
-                
-                # Professional Report Box
-                flags_html = ""
-                if details.get("flags"):
-                    flags_html = "".join([f"<li style='color:#e74c3c; font-weight:bold; margin-bottom:5px;'>⚠️ {f}</li>" for f in details["flags"]])
-                    flags_html = f"<ul style='list-style-type:none; padding:0; margin-bottom:15px;'>{flags_html}</ul>"
-
-                box_class = f"{risk.lower()}-risk"
-                report_box.markdown(f"""
+        def render_report(future, risk, details, partial=None):
+            if future.cancelled():
+                return
+            if partial is not None:
+                report_text = partial + " ▌" # Still generating
+            else:
+                try:
+                    report_text = future.result(timeout=0)
+                except Exception as e:
+                    report_text = f"Report generation failed: {e}"
+
+            # Professional Report Box
+            flags_html = ""
+            if details.get("flags"):
+                flags_html = "".join([f"<li style='color:#e74c3c; font-weight:bold; margin-bottom:5px;'>⚠️ {f}</li>" for f in details["flags"]])
+                flags_html = f"<ul style='list-style-type:none; padding:0; margin-bottom:15px;'>{flags_html}</ul>"
+
+            box_class = f"{risk.lower()}-risk"
+            report_box.markdown(f"""
 <div class="report-box {box_class}">
     {flags_html}
     <p style="font-size:1.1em; font-family:sans-serif; margin:0;">
@@ -214,3 +344,114 @@ elif input_source == "Upload Video":
     </p>
 </div>
 """, unsafe_allow_html=True)
+
+        pending_report = None # (future, risk, details) of the report in flight
+        streamed_text = {"partial": None} # What the box shows of the in-flight report
+        last_report_ts = None
+        # The report worker is shared by all browser sessions; coalescing is per session
+        report_stream_id = st.session_state.setdefault("report_stream_id", uuid.uuid4().hex)
+
+        def poll_report(pending):
+            """
+            Streams the text generated so far into the report box and renders the
+            final report once done; returns the report while still in flight, else None.
+            """
+            if pending is None:
+                return None
+            if pending[0].done():
+                render_report(*pending)
+                streamed_text["partial"] = None
+                return None
+            partial = get_report_worker().partial(pending[0])
+            if partial and partial != streamed_text["partial"]:
+                render_report(*pending, partial=partial)
+                streamed_text["partial"] = partial
+            return pending
+
+        overlay = OverlayRenderer(max_fps=DISPLAY_FPS)
+
+        # Motion-gated sampling skips static frames within the fixed analysis rate
+        # (as in pipeline.run), so motion never raises inference above ANALYSIS_FPS
+        sampler = AdaptiveSampler() if adaptive_sampling else None
+
+        # Upload is spooled to a temp file in chunks and deleted afterwards;
+        # frames are sampled by stream time and decoded ahead on a prefetch thread
+        suffix = "." + uploaded_file.name.rsplit(".", 1)[-1] if "." in uploaded_file.name else ""
+        with spooled_upload(uploaded_file, suffix=suffix) as video_path, \
+                VideoFrameReader(video_path, target_fps=ANALYSIS_FPS) as vf:
+            for frame_idx, ts, frame in vf:
+                if sampler is not None and not sampler.should_analyze(frame):
+                    # Static scene: keep the last overlay and tracks, skip inference
+                    METRICS.inc("frames_skipped_static")
+                    pending_report = poll_report(pending_report)
+                    continue
+                frame_start = time.perf_counter()
+                # Run Dual Detection
+                main_res, fire_res = detector.detect(frame, track=True, conf=confidence_threshold,
+                                                     tile_size=tile_size or 0, stream_id=video_stream_id)
+                
+                # Hybrid Analyze
+                incident_type, details, analysis = detector.analyze_incident(main_res, fire_res, stream_id=video_stream_id,
+                                                                             zones=zones, return_analysis=True)
+                
+                # Risk Assessment
+                with METRICS.time("calculate_risk"):
+                    risk = calculate_risk(incident_type, 0.8, details)
+
+                # Overlay only at the display refresh rate; in between the last one stays on screen
+                with METRICS.time("render"):
+                    overlay_rgb = overlay.render(frame, analysis, risk)
+                if overlay_rgb is not None:
+                    with METRICS.time("display"):
+                        st_image_container.image(overlay_rgb, width='stretch')
+                if record_events:
+                    load_event_store().append(uploaded_file.name, main_res, fire_res, incident_type, risk, details,
+                                              stream_time=ts, frame_idx=frame_idx,
+                                              zones=zones.config if zones is not None else None,
+                                              tile_size=tile_size)
+                if sampler is not None:
+                    sampler.report_incident(incident_type)
+                
+                # Update Info (first analyzed frame, then once per second of footage)
+                if last_report_ts is None or ts - last_report_ts >= 1.0:
+                    last_report_ts = ts
+                    risk_color = "green"
+                    if risk == "HIGH": risk_color = "red"
+                    elif risk == "MEDIUM": risk_color = "orange"
+                    
+                    status_text.markdown(f"**Status:** {incident_type}")
+                    risk_text.markdown(f"**Risk Level:** <span style='color:{risk_color}; font-weight:bold'>{risk}</span>", unsafe_allow_html=True)
+
+                    # Report is generated in the background. A running report is left to finish
+                    # (and be shown); a still queued one is superseded by the newer snapshot.
+                    pending_report = poll_report(pending_report)
+                    report_worker = get_report_worker()
+                    if report_worker is not None and (pending_report is None or not pending_report[0].running()):
+                        pending_report = (report_worker.submit(report_stream_id, incident_type, details, risk),
+                                          risk, details)
+
+                pending_report = poll_report(pending_report)
+
+                METRICS.observe("frame_total", time.perf_counter() - frame_start)
+                METRICS.inc("frames_analyzed")
+                METRICS.set_gauge("prefetch_queue_depth", vf.queue_depth())
+                if METRICS.enabled and frame_idx % 10 == 0:
+                    render_metrics_panel()
+
+        # Let the last report finish streaming into the box
+        while pending_report is not None:
+            pending_report = poll_report(pending_report)
+            if pending_report is not None:
+                time.sleep(0.05)
+        if record_events:
+            load_event_store().flush()
+        # This session's cascade only (the detector is shared), read before the reset drops it
+        fire_stats = detector.fire_gate_stats(video_stream_id)
+        detector.reset_stream(video_stream_id)
+
+        METRICS.inc("frames_skipped_by_sampler", vf.stats["grabbed"] - vf.stats["decoded"])
+        if sampler is not None and sampler.stats["frames"]:
+            st.sidebar.caption(f"🎞️ Motion gate: {sampler.stats['analyzed']} analyzed, "
+                               f"{sampler.stats['skipped']} static frames skipped")
+        if fire_stats["frames"]:
+            st.sidebar.caption(f"🔥 Fire model: {fire_stats['run']} runs, {fire_stats['skipped']} skipped ({fire_stats['skip_rate']:.0%})")
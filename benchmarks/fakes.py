@@ -0,0 +1,99 @@
+import numpy as np
+
+from vision.array_result import ArrayBoxes, ArrayResult, COCO_NAMES
+
+
+def fake_result(num_boxes, rng, frame_shape=(720, 1280), track=True, vehicle_share=0.8, first_id=1):
+    """
+    Random ArrayResult with num_boxes detections (vehicles and persons) and
+    optional consecutive track IDs starting at first_id.
+    """
+    h, w = frame_shape
+    x1 = rng.uniform(0, w - 150, num_boxes)
+    y1 = rng.uniform(0, h - 150, num_boxes)
+    bw = rng.uniform(30, 150, num_boxes)
+    bh = bw * rng.uniform(0.6, 1.4, num_boxes)
+    xyxy = np.stack([x1, y1, x1 + bw, y1 + bh], axis=1)
+    cls = np.where(rng.random(num_boxes) < vehicle_share, rng.choice([2, 3, 5, 7], num_boxes), 0)
+    conf = rng.uniform(0.15, 0.95, num_boxes)
+    ids = np.arange(first_id, first_id + num_boxes) if track else None
+    return ArrayResult(ArrayBoxes(xyxy, cls, conf, ids), COCO_NAMES, frame_shape)
+
+
+def fake_track_sequence(num_boxes, num_frames, seed=0, churn=0.0, jitter=1.5, frame_shape=(720, 1280)):
+    """
+    Sequence of ArrayResults following the same tracks across frames.
+
+    churn: share of tracks replaced by brand-new IDs every frame (scene turnover).
+    jitter: per-frame center noise in pixels (small values -> stagnant traffic).
+    """
+    rng = np.random.default_rng(seed)
+    base = fake_result(num_boxes, rng, frame_shape)
+    xyxy = base.boxes.xyxy.astype(np.float64)
+    cls, conf = base.boxes.cls, base.boxes.conf
+    ids = base.boxes.id.astype(np.int64)
+    next_id = int(ids.max()) + 1
+
+    frames = []
+    for _ in range(num_frames):
+        if churn > 0:
+            replaced = rng.random(num_boxes) < churn
+            n_new = int(replaced.sum())
+            ids = ids.copy()
+            ids[replaced] = np.arange(next_id, next_id + n_new)
+            next_id += n_new
+        xyxy = xyxy + rng.normal(0, jitter, (num_boxes, 1))
+        frames.append(ArrayResult(ArrayBoxes(xyxy, cls, conf, ids), COCO_NAMES, frame_shape))
+    return frames
+
+
+class FakeYOLO:
+    def __init__(self, names=None, default=()):
+        """
+        Stub YOLO engine. Detections for an image are registered up front with
+        expect(image, boxes) and returned by __call__ / track, so the detector
+        code path runs without weights.
+
+        default: boxes of images without an expectation (e.g. frames decoded
+                 again on the far side of the inference service).
+        """
+        self.names = names or COCO_NAMES
+        self.default = list(default)
+        self._pending = {}
+        self._next_id = 1
+
+    def expect(self, image, boxes):
+        """
+        boxes: list of (x1, y1, x2, y2, cls_id).
+        """
+        self._pending[id(image)] = boxes
+
+    def _result(self, image, track):
+        boxes = self._pending.pop(id(image), self.default)
+        arr = np.asarray(boxes, dtype=np.float64).reshape(-1, 5)
+        ids = np.arange(1, len(arr) + 1) if track else None
+        conf = np.full(len(arr), 0.8)
+        return ArrayResult(ArrayBoxes(arr[:, :4], arr[:, 4], conf, ids), self.names, image.shape[:2])
+
+    def __call__(self, source, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        return [self._result(image, track=False) for image in images]
+
+    def track(self, source, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        return [self._result(image, track=True) for image in images]
+
+
+class StubGenerator:
+    def __init__(self):
+        """
+        Stand-in for the transformers pipeline: deterministic text derived from
+        the prompt, so report-path overhead is measured without Flan-T5.
+        """
+        self.calls = 0
+
+    def __call__(self, prompt, **kwargs):
+        self.calls += 1
+        words = prompt.split()
+        text = " ".join(reversed(words[: kwargs.get("max_new_tokens", 256)]))
+        return [{"generated_text": text}]
@@ -0,0 +1,266 @@
+"""
+Offline benchmark suite for the vision and NLP hot paths (no network, no GPU).
+
+    python -m benchmarks.run --out benchmarks/baselines/$(git rev-parse --short HEAD).json
+    python -m benchmarks.run --compare benchmarks/baselines/old.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.fakes import FakeYOLO, StubGenerator, fake_result, fake_track_sequence
+from nlp.report_cache import ReportCache
+from nlp.report_generator import ReportGenerator
+from utils.generate_samples import make_scene
+from utils.risk_assessment import calculate_risk
+from vision.detector import IncidentDetector
+from vision.overlay import OverlayRenderer
+
+
+def measure(fn, iterations, warmup=5, memory_iterations=20):
+    """
+    Latency percentiles and throughput of fn(), plus peak Python/NumPy
+    allocation measured in a separate tracemalloc pass (so tracing overhead
+    does not distort the timings).
+    """
+    for _ in range(warmup):
+        fn()
+    latencies = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies[i] = time.perf_counter() - start
+
+    tracemalloc.start()
+    for _ in range(min(iterations, memory_iterations)):
+        fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    ms = latencies * 1000
+    return {
+        "iterations": iterations,
+        "throughput_per_s": iterations / latencies.sum() if latencies.sum() > 0 else float("inf"),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "peak_mem_kb": peak / 1024,
+    }
+
+
+def cycle_calls(fn, items):
+    """
+    Zero-argument callable feeding fn the next item of items on every call.
+    """
+    it = itertools.cycle(items)
+    return lambda: fn(next(it))
+
+
+# --- Cases -------------------------------------------------------------------
+
+def bench_compute_iou(n):
+    rng = np.random.default_rng(1)
+    boxes = fake_result(80, rng).boxes.xyxy.astype(np.float64)
+    pairs = [(boxes[i].tolist(), boxes[j].tolist()) for i in range(80) for j in range(i + 1, 80)]
+    results = {
+        # Pure-Python pairwise IoU over every vehicle pair of an 80-box scene
+        "compute_iou_80_pairwise": measure(lambda: [IncidentDetector.compute_iou(a, b) for a, b in pairs], n),
+        "compute_iou_matrix_80": measure(lambda: IncidentDetector.compute_iou_matrix(boxes, boxes), n),
+    }
+    return results
+
+
+def bench_analyze(n):
+    results = {}
+    for boxes in (10, 80, 200):
+        detector = IncidentDetector.from_models()
+        frames = fake_track_sequence(boxes, 60, seed=boxes, jitter=0.5)
+        results[f"analyze_incident_{boxes}_boxes"] = measure(
+            cycle_calls(detector.analyze_incident, frames), n)
+    return results
+
+
+def bench_history_growth(n):
+    """
+    Long-running feed with constant track turnover: latency and history
+    footprint after many frames (tracks never seen again must not pile up).
+    """
+    detector = IncidentDetector.from_models(history_max_age=150)
+    frames = fake_track_sequence(40, 500, seed=7, churn=0.2)
+    for result in frames * 10: # 5000 frames of churn
+        detector.analyze_incident(result)
+    stats = measure(cycle_calls(detector.analyze_incident, frames), n)
+    stats["live_tracks"] = len(detector.history)
+    stats["evicted_tracks"] = detector.history.evicted
+    stats["history_kb"] = detector.history.nbytes / 1024
+    return {"history_after_5000_churn_frames": stats}
+
+
+def bench_risk(n):
+    cases = [("Normal Traffic", {"vehicle_count": 4}), ("Traffic Congestion", {"vehicle_count": 14}),
+             ("Critical Traffic Accident", {"vehicle_count": 3}), ("Severe Traffic Gridlock", {"vehicle_count": 30})]
+    return {"calculate_risk": measure(cycle_calls(lambda c: calculate_risk(c[0], 0.8, c[1]), cases), n)}
+
+
+def _report_cases():
+    flags = ["Movement Analysis: 5 vehicles blocked", "Geometric Alert: Overturned car detected!"]
+    return [
+        ("Normal Traffic", {"vehicle_count": 6, "person_count": 0, "flags": []}, "LOW"),
+        ("Traffic Congestion", {"vehicle_count": 14, "person_count": 1, "flags": flags[:1]}, "MEDIUM"),
+        ("Critical Traffic Accident", {"vehicle_count": 3, "person_count": 3, "flags": flags}, "HIGH"),
+        ("Critical: Active Fire/Smoke Detected", {"vehicle_count": 2, "person_count": 0, "flags": []}, "HIGH"),
+    ]
+
+
+def bench_report(n):
+    cases = _report_cases()
+    plain = ReportGenerator(generator=StubGenerator(), deterministic=True)
+    cached = ReportGenerator(generator=StubGenerator(), deterministic=True, cache=ReportCache())
+    return {
+        "report_build_prompt": measure(cycle_calls(lambda c: plain.build_prompt(*c), cases), n),
+        "report_generate_stub": measure(cycle_calls(lambda c: plain.generate_report(*c), cases), n),
+        "report_generate_stub_cached": measure(cycle_calls(lambda c: cached.generate_report(*c), cases), n),
+        "report_stream_stub": measure(cycle_calls(lambda c: "".join(plain.generate_report_stream(*c)), cases), n),
+    }
+
+
+def bench_overlay(n):
+    """
+    Dashboard annotation of an analyzed 720p frame (in-place RGB overlay).
+    """
+    results = {}
+    for boxes in (10, 80):
+        image, _ = make_scene(num_vehicles=boxes, num_persons=boxes // 10, seed=boxes)
+        detector = IncidentDetector.from_models()
+        analysis = detector.analyze_incident(fake_result(boxes, np.random.default_rng(boxes)),
+                                             return_analysis=True)[2]
+        renderer = OverlayRenderer()
+        results[f"overlay_render_{boxes}_boxes"] = measure(
+            lambda: renderer.render(image, analysis, "HIGH", force=True), n)
+    return results
+
+
+def bench_end_to_end(n):
+    """
+    Per-frame pipeline on synthetic scenes with stub engines:
+    detect -> analyze_incident -> calculate_risk -> report (every 30th frame).
+    """
+    scenes = [make_scene(num_vehicles=v, num_persons=p, seed=s)
+              for s, (v, p) in enumerate([(4, 0), (12, 1), (30, 3), (60, 6)])]
+    main_model = FakeYOLO()
+    detector = IncidentDetector.from_models(main_model)
+    reporter = ReportGenerator(generator=StubGenerator(), deterministic=True, cache=ReportCache())
+    counter = itertools.count()
+
+    def step(scene):
+        image, boxes = scene
+        main_model.expect(image, boxes)
+        main_res, fire_res = detector.detect(image, track=True)
+        incident_type, details = detector.analyze_incident(main_res, fire_res)
+        risk = calculate_risk(incident_type, 0.8, details)
+        if next(counter) % 30 == 0:
+            reporter.generate_report(incident_type, details, risk)
+
+    return {"end_to_end_frame": measure(cycle_calls(step, scenes), n)}
+
+
+CASES = {
+    "iou": bench_compute_iou,
+    "analyze": bench_analyze,
+    "history": bench_history_growth,
+    "risk": bench_risk,
+    "report": bench_report,
+    "overlay": bench_overlay,
+    "end_to_end": bench_end_to_end,
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(selected=None, iterations=300):
+    results = {}
+    for name, case in CASES.items():
+        if selected and name not in selected:
+            continue
+        results.update(case(iterations))
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "iterations": iterations,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance=0.15):
+    """
+    Prints per-case p50/p95 changes against a baseline; returns the regressed cases.
+    """
+    regressions = []
+    print(f"{'case':42s} {'p50 base':>10s} {'p50 now':>10s} {'change':>8s}   p95 change")
+    for name, now in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:42s} {'-':>10s} {now['p50_ms']:10.3f}      new")
+            continue
+        change = now["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] > 0 else 0.0
+        change95 = now["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] > 0 else 0.0
+        flag = "  REGRESSION" if change > tolerance else ""
+        print(f"{name:42s} {base['p50_ms']:10.3f} {now['p50_ms']:10.3f} {change:+8.1%}   {change95:+8.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CityGuard offline benchmarks")
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="run only these case groups")
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--out", help="write results JSON (baseline) to this path")
+    parser.add_argument("--compare", help="baseline JSON to diff against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="p50 slowdown counted as regression")
+    args = parser.parse_args(argv)
+
+    current = run(args.only, args.iterations)
+    for name, res in current["results"].items():
+        extra = {k: v for k, v in res.items() if k not in ("iterations", "throughput_per_s", "mean_ms",
+                                                           "p50_ms", "p95_ms", "p99_ms", "peak_mem_kb")}
+        print(f"{name:42s} p50 {res['p50_ms']:8.3f} ms | p95 {res['p95_ms']:8.3f} | p99 {res['p99_ms']:8.3f} | "
+              f"{res['throughput_per_s']:10.1f}/s | peak {res['peak_mem_kb']:8.1f} KB {extra if extra else ''}")
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Saved baseline to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
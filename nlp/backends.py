@@ -0,0 +1,198 @@
+import difflib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+MODEL_NAME = "google/flan-t5-base"
+BACKENDS = ("pytorch", "int8", "onnx")
+
+
+def _artifact_dir(cache_dir, model_name, backend):
+    return os.path.join(cache_dir, model_name.replace("/", "__") + f"-{backend}")
+
+
+def set_torch_threads(num_threads):
+    """
+    Sizes torch's intra-op thread pool, which the pytorch / int8 report
+    backends share with the YOLO engines (it is process-wide). Call once at
+    process start, before the models load; None / 0 keeps the library default.
+    """
+    if num_threads:
+        import torch
+        torch.set_num_threads(num_threads)
+
+
+def load_generator(model_name=MODEL_NAME, backend="pytorch", num_threads=None, cache_dir="models/nlp"):
+    """
+    Builds a text2text-generation pipeline for the report model.
+
+    backend:
+    - "pytorch": default fp32 transformers model.
+    - "int8": dynamic int8 quantization of every nn.Linear (weights int8,
+              activations quantized on the fly). Quantized once; the int8
+              state_dict is saved into cache_dir and reloaded on later starts.
+    - "onnx": ONNX Runtime encoder/decoder with KV-cache (optimum). Exported
+              once into cache_dir and reused on later starts.
+    num_threads: intra-op threads of the ONNX Runtime session (None = library
+                 default). torch's thread pool is process-wide, so the
+                 pytorch / int8 backends leave it to set_torch_threads at
+                 startup and warn if it was not applied.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown report backend '{backend}', choose from {BACKENDS}")
+
+    import torch
+    from transformers import AutoConfig, AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+
+    if num_threads and backend != "onnx" and torch.get_num_threads() != num_threads:
+        print(f"Warning: the {backend} report backend runs on torch's process-wide pool "
+              f"({torch.get_num_threads()} threads); num_threads={num_threads} needs set_torch_threads at startup.")
+
+    if backend == "pytorch":
+        return pipeline("text2text-generation", model=model_name)
+
+    if backend == "int8":
+        quant_dir = _artifact_dir(cache_dir, model_name, backend)
+        weights = os.path.join(quant_dir, "quantized_state_dict.pt")
+        if not os.path.exists(weights):
+            print(f"Quantizing {model_name} to int8 (one-time) -> {quant_dir}")
+            model = AutoModelForSeq2SeqLM.from_pretrained(model_name).eval()
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            os.makedirs(quant_dir, exist_ok=True)
+            model.config.save_pretrained(quant_dir)
+            AutoTokenizer.from_pretrained(model_name).save_pretrained(quant_dir)
+            torch.save(model.state_dict(), weights + ".tmp")
+            os.replace(weights + ".tmp", weights) # Never leave a truncated artifact behind
+        else:
+            # Same module layout as above, then the saved int8 weights replace the placeholder ones
+            model = AutoModelForSeq2SeqLM.from_config(AutoConfig.from_pretrained(quant_dir)).eval()
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            model.load_state_dict(torch.load(weights))
+        return pipeline("text2text-generation", model=model, tokenizer=AutoTokenizer.from_pretrained(quant_dir))
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    try:
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise ImportError("The 'onnx' report backend needs: pip install optimum[onnxruntime]") from e
+
+    export_dir = _artifact_dir(cache_dir, model_name, backend)
+    if not os.path.exists(os.path.join(export_dir, "config.json")):
+        print(f"Exporting {model_name} to ONNX (one-time) -> {export_dir}")
+        exported = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True, use_cache=True)
+        exported.save_pretrained(export_dir)
+        tokenizer.save_pretrained(export_dir)
+        del exported
+
+    session_options = onnxruntime.SessionOptions()
+    if num_threads:
+        session_options.intra_op_num_threads = num_threads
+    model = ORTModelForSeq2SeqLM.from_pretrained(export_dir, use_cache=True, session_options=session_options)
+    return pipeline("text2text-generation", model=model, tokenizer=tokenizer)
+
+
+def _rss_mb():
+    """
+    Resident set size of this process in MB (Linux /proc, resource fallback).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+DEFAULT_PROMPTS = [
+    "TASK: Act as a Smart City Traffic Monitor. Write a professional report. CONTEXT: 6 vehicles detected, traffic flow is stable.",
+    "TASK: Urban Safety Alert. Write an urgent congestion report. CONTEXT: 18 vehicles detected. Congestion is high. RISK: MEDIUM.",
+    "TASK: Emergency Management System. Write a CRITICAL incident report. CONTEXT: A severe incident (Critical Traffic Accident) has occurred. 4 vehicles and 3 persons present. RISK: HIGH.",
+    "TASK: Safety Warning. Write a critical alert for public safety. CONTEXT: Fire/Smoke detected on camera. RISK: HIGH.",
+]
+
+
+def _measure_backend(backend, prompts, num_threads, gen_kwargs):
+    """
+    Load time, memory growth, latency and outputs of one backend. Runs in a
+    fresh process (see compare_backends).
+    """
+    try:
+        import torch
+        import transformers # Library imports are not part of the backend's footprint
+    except ImportError as e:
+        return {"error": str(e)}
+
+    if num_threads:
+        torch.set_num_threads(num_threads) # Own process, so the process-wide setting is fine
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    try:
+        generator = load_generator(backend=backend, num_threads=num_threads)
+    except ImportError as e:
+        return {"error": str(e)}
+    load_s = time.perf_counter() - start
+
+    generator(prompts[0], **gen_kwargs) # warm-up
+    outputs, latencies = [], []
+    for prompt in prompts:
+        start = time.perf_counter()
+        outputs.append(generator(prompt, **gen_kwargs)[0]["generated_text"])
+        latencies.append(time.perf_counter() - start)
+    return {
+        "load_s": load_s,
+        "rss_delta_mb": _rss_mb() - rss_before,
+        "mean_latency_ms": 1000 * sum(latencies) / len(latencies),
+        "outputs": outputs,
+    }
+
+
+def compare_backends(backends=BACKENDS, prompts=None, num_threads=None, max_new_tokens=128):
+    """
+    Measures each backend in a fresh process (so memory left behind by one
+    backend never hides in the next one's delta) and reports load time,
+    memory growth, mean per-report latency and output agreement with the
+    fp32 "pytorch" reference, which is always run, whatever the order.
+    Greedy decoding is used so differences come from the backend only.
+    """
+    prompts = prompts or DEFAULT_PROMPTS
+    gen_kwargs = {"max_new_tokens": max_new_tokens, "do_sample": False, "repetition_penalty": 1.2}
+    context = multiprocessing.get_context("spawn")
+    measured = {}
+    for backend in ["pytorch"] + [b for b in backends if b != "pytorch"]:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            measured[backend] = pool.submit(_measure_backend, backend, prompts, num_threads, gen_kwargs).result()
+
+    reference = measured["pytorch"].get("outputs")
+    results = {}
+    for backend in backends:
+        entry = measured[backend]
+        if reference is not None and "outputs" in entry:
+            outputs = entry["outputs"]
+            entry["exact_match"] = sum(a == b for a, b in zip(outputs, reference)) / len(prompts)
+            entry["similarity"] = sum(difflib.SequenceMatcher(None, a.split(), b.split()).ratio()
+                                      for a, b in zip(outputs, reference)) / len(prompts)
+        results[backend] = entry
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare report model backends on this CPU")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    for name, res in compare_backends(args.backends, num_threads=args.threads).items():
+        if "error" in res:
+            print(f"{name:8s} unavailable: {res['error']}")
+            continue
+        print(f"{name:8s} load {res['load_s']:.1f}s | +{res['rss_delta_mb']:.0f} MB | "
+              f"{res['mean_latency_ms']:.0f} ms/report | exact {res.get('exact_match', 1.0):.0%} | "
+              f"similarity {res.get('similarity', 1.0):.2f}")
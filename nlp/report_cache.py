@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# Count buckets: scenes whose counts fall in the same bucket share a report
+VEHICLE_BUCKETS = [0, 1, 3, 6, 11, 21, 41]
+PERSON_BUCKETS = [0, 1, 2, 5, 10]
+# Bumped when the prompt derived from a signature changes; older stored reports stop matching
+SIGNATURE_VERSION = 2
+
+
+def _bucket(value, edges):
+    """
+    Maps a count to the label of its bucket, e.g. 7 -> "6-10".
+    """
+    value = int(value or 0)
+    for low, high in zip(edges, edges[1:]):
+        if value < high:
+            return str(low) if high - low == 1 else f"{low}-{high - 1}"
+    return f"{edges[-1]}+"
+
+
+def _strip_numbers(flag):
+    # Confidences and counts vary frame to frame; the cue itself does not
+    flag = re.sub(r"\s*\(\d+(\.\d+)?\)", "", str(flag))
+    return re.sub(r"\s+", " ", re.sub(r"\d+(\.\d+)?", "", flag)).strip()
+
+
+def scene_summary(details):
+    """
+    The part of an incident's details a cached report may depend on: count
+    buckets and the visual cues without their numbers. Prompts of cached
+    reports are built from this only, so two scenes with the same signature
+    also get the same prompt.
+    """
+    flags = []
+    for flag in details.get("flags", []):
+        flag = _strip_numbers(flag)
+        if flag.lower() not in (f.lower() for f in flags):
+            flags.append(flag)
+    return {
+        "vehicle_count": _bucket(details.get("vehicle_count", 0), VEHICLE_BUCKETS),
+        "person_count": _bucket(details.get("person_count", 0), PERSON_BUCKETS),
+        "flags": sorted(flags, key=str.lower),
+    }
+
+
+def incident_signature(incident_type, details, risk_level, decode_mode="sample"):
+    """
+    Canonical, hashable description of a scene for report caching.
+    """
+    summary = scene_summary(details)
+    return (
+        incident_type,
+        risk_level,
+        summary["vehicle_count"],
+        summary["person_count"],
+        tuple(flag.lower() for flag in summary["flags"]),
+        decode_mode,
+        SIGNATURE_VERSION,
+    )
+
+
+class ReportCache:
+    PRUNE_EVERY = 64 # disk writes between prunes
+
+    def __init__(self, max_entries=256, ttl=3600, disk_path=None, max_disk_entries=4096):
+        """
+        Two-tier cache for generated reports.
+
+        max_entries: in-memory LRU capacity.
+        ttl: seconds an entry stays valid (None disables expiry).
+        disk_path: optional SQLite file; entries survive process restarts.
+        max_disk_entries: SQLite capacity; expired rows and the oldest ones
+                          beyond it are deleted on open and every
+                          PRUNE_EVERY writes.
+        """
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._puts = 0
+        self._memory = OrderedDict() # key -> (created, text)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+        self._db = None
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS reports (key TEXT PRIMARY KEY, text TEXT, created REAL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS reports_created ON reports (created)")
+            self._prune()
+
+    @staticmethod
+    def make_key(signature):
+        return hashlib.sha1(json.dumps(signature).encode("utf-8")).hexdigest()
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, signature):
+        key = self.make_key(signature)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0]):
+                    self._memory.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+                self.stats["expired"] += 1
+
+            if self._db is not None:
+                row = self._db.execute("SELECT text, created FROM reports WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    text, created = row
+                    if not self._expired(created):
+                        self._remember(key, created, text)
+                        self.stats["disk_hits"] += 1
+                        return text
+                    self._db.execute("DELETE FROM reports WHERE key = ?", (key,))
+                    self._db.commit()
+                    self.stats["expired"] += 1
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, signature, text):
+        key = self.make_key(signature)
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, text)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO reports (key, text, created) VALUES (?, ?, ?)",
+                                 (key, text, created))
+                self._puts += 1
+                if self._puts % self.PRUNE_EVERY == 0:
+                    self._prune()
+                else:
+                    self._db.commit()
+
+    def _prune(self):
+        """
+        Bounds the SQLite tier: drops expired rows, then the oldest beyond max_disk_entries.
+        """
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM reports WHERE created < ?", (time.time() - self.ttl,))
+        if self.max_disk_entries is not None:
+            self._db.execute("DELETE FROM reports WHERE key NOT IN "
+                             "(SELECT key FROM reports ORDER BY created DESC LIMIT ?)", (self.max_disk_entries,))
+        self._db.commit()
+
+    def disk_entries(self):
+        if self._db is None:
+            return 0
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+
+    def _remember(self, key, created, text):
+        self._memory[key] = (created, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM reports")
+                self._db.commit()
+
+    def hit_rate(self):
+        hits = self.stats["hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
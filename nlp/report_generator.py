@@ -1,20 +1,135 @@
 
-from transformers import pipeline
+import threading
+import time
+
+from nlp.backends import load_generator
+from nlp.report_cache import incident_signature, scene_summary
+from utils.metrics import METRICS
+
+# Max new tokens of a streamed report per risk level: routine reports stay short
+REPORT_TOKEN_BUDGETS = {"LOW": 64, "MEDIUM": 128, "HIGH": 256}
+SENTENCE_ENDINGS = (".", "!", "?")
+
+
+class SentenceBoundaryStop:
+    def __init__(self, tokenizer, min_tokens):
+        """
+        Stopping criterion for generate(): ends the report at the first
+        sentence boundary once min_tokens were generated (or when cancelled
+        by the consumer), instead of running to the token budget.
+        """
+        self.tokenizer = tokenizer
+        self.min_tokens = min_tokens
+        self.cancelled = False
+        self._start = None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if self.cancelled:
+            return True
+        if self._start is None:
+            self._start = input_ids.shape[-1] - 1 # decoder start token
+        if input_ids.shape[-1] - self._start < self.min_tokens:
+            return False
+        last = self.tokenizer.decode(input_ids[0, -1:], skip_special_tokens=True)
+        return last.rstrip().endswith(SENTENCE_ENDINGS)
+
 
 class ReportGenerator:
-    def __init__(self):
+    def __init__(self, cache=None, deterministic=False, backend="pytorch", num_threads=None, generator=None,
+                 token_budgets=None):
         """
         Initializes the text generation pipeline.
         Upgraded to 'google/flan-t5-base' for professional research-level reasoning.
+
+        cache: optional ReportCache; equivalent scenes reuse a stored report.
+        deterministic: greedy decoding instead of sampling, so cached entries
+                       are reproducible.
+        backend: "pytorch" (fp32), "int8" (dynamic quantization) or "onnx"
+                 (ONNX Runtime export); see nlp/backends.py.
+        num_threads: ONNX Runtime threads of the onnx backend (torch's
+                     thread pool is process-wide; size it at startup with
+                     nlp.backends.set_torch_threads).
+        generator: prebuilt text2text callable; skips model loading (e.g. stubs).
+        token_budgets: per risk level overrides of REPORT_TOKEN_BUDGETS for
+                       generate_report_stream.
         """
-        print("Loading NLP model (Flan-T5-Base)...")
-        # task='text2text-generation'
-        self.generator = pipeline("text2text-generation", model="google/flan-t5-base")
+        if generator is None:
+            print(f"Loading NLP model (Flan-T5-Base, {backend} backend)...")
+            # task='text2text-generation'
+            generator = load_generator(backend=backend, num_threads=num_threads)
+        self.generator = generator
+        self.backend = backend
+        self.cache = cache
+        self.deterministic = deterministic
+        self.token_budgets = dict(REPORT_TOKEN_BUDGETS, **(token_budgets or {}))
 
+    @METRICS.timed("generate_report")
     def generate_report(self, incident_type, details, risk_level):
         """
         Generates a natural language report based on structured data.
         """
+        signature = None
+        if self.cache is not None:
+            # Backends differ slightly in output, so they do not share entries
+            decode_mode = f"{self.backend}:{'greedy' if self.deterministic else 'sample'}"
+            signature = incident_signature(incident_type, details, risk_level, decode_mode)
+            cached = self.cache.get(signature)
+            if cached is not None:
+                METRICS.inc("report_cache_hits")
+                return cached
+
+        prompt = self._prompt(incident_type, details, risk_level, cached=signature is not None)
+        text = self._generate(prompt)
+
+        if signature is not None:
+            self.cache.put(signature, text)
+        return text
+
+    def generate_report_stream(self, incident_type, details, risk_level):
+        """
+        Streaming variant of generate_report: yields the report text in
+        pieces as tokens are decoded, so the first words show up after a few
+        decoder steps instead of after the whole report.
+
+        Generation is capped by the risk level's token budget and stops at
+        the first sentence boundary past half of it. Cached reports are
+        yielded in one piece. Closing the iterator early stops generation.
+        """
+        budget = self.token_budgets.get(risk_level, max(self.token_budgets.values()))
+        signature = None
+        if self.cache is not None:
+            # Budget-capped reports differ from the full ones, so they do not share entries
+            decode_mode = f"{self.backend}:{'greedy' if self.deterministic else 'sample'}:stream{budget}"
+            signature = incident_signature(incident_type, details, risk_level, decode_mode)
+            cached = self.cache.get(signature)
+            if cached is not None:
+                METRICS.inc("report_cache_hits")
+                yield cached
+                return
+
+        prompt = self._prompt(incident_type, details, risk_level, cached=signature is not None)
+        start = time.perf_counter()
+        pieces = []
+        for piece in self._stream(prompt, budget):
+            if not pieces:
+                METRICS.observe("report_first_chunk", time.perf_counter() - start)
+            pieces.append(piece)
+            yield piece
+        METRICS.observe("generate_report_stream", time.perf_counter() - start)
+
+        if signature is not None:
+            self.cache.put(signature, "".join(pieces))
+
+    def _prompt(self, incident_type, details, risk_level, cached):
+        # A cached report is shared by every scene with the same signature, so
+        # its prompt may only use what the signature contains (count buckets,
+        # cues without numbers); otherwise it would quote one scene's numbers to all.
+        return self.build_prompt(incident_type, scene_summary(details) if cached else details, risk_level)
+
+    def build_prompt(self, incident_type, details, risk_level):
+        """
+        Builds the instruction prompt for Flan-T5 from structured incident data.
+        """
         # We formulate a prompt for the model
         # Flan-T5 is good at following instructions.
         
@@ -35,18 +150,58 @@ class ReportGenerator:
         elif "Fire" in incident_type:
             prompt = f"TASK: Safety Warning. Write a critical alert for public safety. CONTEXT: Fire/Smoke detected on camera. RISK: {risk_level}."
         else:
-            prompt = f"TASK: Smart City Report. Status: {incident_type}. Context: {details}."
+            prompt = f"TASK: Smart City Report. Status: {incident_type}.{flags_context} CONTEXT: {vehicle_count} vehicles and {details.get('person_count', 0)} persons present. RISK: {risk_level}."
+        return prompt
 
+    def _generation_kwargs(self, max_new_tokens=256):
+        if self.deterministic:
+            # Greedy decoding: same prompt, same report
+            return {"max_new_tokens": max_new_tokens, "do_sample": False, "repetition_penalty": 1.2}
         # Generate text with repetition penalties and diverse sampling for professional flow
-        outputs = self.generator(
-            prompt,
-            max_new_tokens=256,
-            do_sample=True,
-            temperature=0.7,
-            repetition_penalty=1.2
-        )
+        return {"max_new_tokens": max_new_tokens, "do_sample": True, "temperature": 0.7, "repetition_penalty": 1.2}
+
+    def _generate(self, prompt, max_new_tokens=256):
+        outputs = self.generator(prompt, **self._generation_kwargs(max_new_tokens))
         return outputs[0]['generated_text']
 
+    def _stream(self, prompt, max_new_tokens):
+        """
+        Runs the pipeline on a background thread with a TextIteratorStreamer
+        and yields decoded text as it arrives. Generators without a tokenizer
+        (stubs) yield their whole output at once.
+        """
+        tokenizer = getattr(self.generator, "tokenizer", None)
+        if tokenizer is None:
+            yield self._generate(prompt, max_new_tokens)
+            return
+
+        from transformers import StoppingCriteriaList, TextIteratorStreamer
+
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        stop = SentenceBoundaryStop(tokenizer, min_tokens=max_new_tokens // 2)
+        errors = []
+
+        def run():
+            try:
+                self.generator(prompt, streamer=streamer, stopping_criteria=StoppingCriteriaList([stop]),
+                               **self._generation_kwargs(max_new_tokens))
+            except Exception as e:
+                errors.append(e)
+                streamer.end() # Unblock the consumer
+
+        thread = threading.Thread(target=run, name="cityguard-report-stream", daemon=True)
+        thread.start()
+        try:
+            for piece in streamer:
+                if piece:
+                    yield piece
+        finally:
+            # Consumer gone (or done): let generate() return at the next step
+            stop.cancelled = True
+            thread.join()
+        if errors:
+            raise errors[0]
+
 if __name__ == "__main__":
     # Test
     rg = ReportGenerator()
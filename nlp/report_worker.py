@@ -0,0 +1,134 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from utils.metrics import METRICS
+
+
+class ReportWorker:
+    def __init__(self, reporter, max_pending=8, drop_policy="oldest"):
+        """
+        Background report generation.
+        A single thread owns the ReportGenerator; callers submit incident
+        snapshots and receive a Future instead of blocking on T5 generation.
+
+        Pending requests are coalesced per stream: while a report is being
+        generated, newer snapshots of the same stream replace older queued
+        ones, so only the latest scene is described.
+
+        Reporters with generate_report_stream are streamed; partial(future)
+        returns the text generated so far for progressive display.
+
+        max_pending: bound on queued (not yet running) requests across streams.
+        drop_policy: "oldest" drops the longest-waiting request when full,
+                     "newest" rejects the incoming one.
+        """
+        if drop_policy not in ("oldest", "newest"):
+            raise ValueError(f"Unknown drop_policy: {drop_policy}")
+        self.reporter = reporter
+        self.max_pending = max(1, int(max_pending))
+        self.drop_policy = drop_policy
+
+        self._pending = OrderedDict() # stream_id -> (snapshot, future)
+        self._partial = {} # running future -> text so far
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {"submitted": 0, "completed": 0, "coalesced": 0, "dropped": 0, "failed": 0}
+
+        self._worker = threading.Thread(target=self._run, name="cityguard-reporter", daemon=True)
+        self._worker.start()
+
+    def submit(self, stream_id, incident_type, details, risk_level, callback=None):
+        """
+        Queues a report for a stream. Returns a Future resolving to the report
+        text; it is cancelled if superseded by a newer snapshot or dropped.
+        callback(future) is invoked on completion or cancellation.
+        """
+        # Snapshot: the caller may keep mutating its own dict
+        snapshot = (incident_type, dict(details, flags=list(details.get("flags", []))), risk_level)
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("ReportWorker is closed")
+            self.stats["submitted"] += 1
+
+            if stream_id in self._pending:
+                # Coalesce: the stale snapshot is never generated
+                _, stale = self._pending[stream_id]
+                stale.cancel()
+                self._pending[stream_id] = (snapshot, future)
+                self.stats["coalesced"] += 1
+                METRICS.inc("reports_coalesced")
+            elif len(self._pending) >= self.max_pending:
+                self.stats["dropped"] += 1
+                METRICS.inc("reports_dropped")
+                if self.drop_policy == "newest":
+                    future.cancel()
+                    return future
+                _, (_, oldest) = self._pending.popitem(last=False)
+                oldest.cancel()
+                self._pending[stream_id] = (snapshot, future)
+            else:
+                self._pending[stream_id] = (snapshot, future)
+            METRICS.set_gauge("report_queue_depth", len(self._pending))
+            self._cond.notify()
+        return future
+
+    def partial(self, future):
+        """
+        Text generated so far for a running request ("" if not started or not streamed).
+        """
+        return self._partial.get(future, "")
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def close(self, wait=True):
+        """
+        Stops the worker; requests still queued are cancelled.
+        """
+        with self._cond:
+            self._closed = True
+            for _, future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+            self._cond.notify()
+        if wait:
+            self._worker.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                _, (snapshot, future) = self._pending.popitem(last=False)
+                METRICS.set_gauge("report_queue_depth", len(self._pending))
+
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                text = self._generate(snapshot, future)
+            except Exception as e:
+                self.stats["failed"] += 1
+                future.set_exception(e)
+                continue
+            finally:
+                self._partial.pop(future, None)
+            self.stats["completed"] += 1
+            future.set_result(text)
+
+    def _generate(self, snapshot, future):
+        stream = getattr(self.reporter, "generate_report_stream", None)
+        if stream is None:
+            return self.reporter.generate_report(*snapshot)
+        text = ""
+        for piece in stream(*snapshot):
+            text += piece
+            self._partial[future] = text
+        return text
@@ -0,0 +1,47 @@
+from nlp.report_cache import ReportCache, incident_signature, scene_summary
+
+
+def test_counts_in_one_bucket_share_a_signature():
+    a = incident_signature("Gridlock", {"vehicle_count": 21, "person_count": 0}, "MEDIUM")
+    b = incident_signature("Gridlock", {"vehicle_count": 40, "person_count": 0}, "MEDIUM")
+    c = incident_signature("Gridlock", {"vehicle_count": 41, "person_count": 0}, "MEDIUM")
+    assert a == b
+    assert a != c
+
+
+def test_flag_numbers_and_order_do_not_change_the_signature():
+    a = incident_signature("Accident", {"vehicle_count": 4, "flags": ["Overlap (0.41)", "Stagnant vehicle 3"]}, "HIGH")
+    b = incident_signature("Accident", {"vehicle_count": 5, "flags": ["stagnant vehicle 7", "Overlap (0.87)"]}, "HIGH")
+    assert a == b
+    assert scene_summary({"flags": ["Overlap (0.41)", "overlap (0.9)"]})["flags"] == ["Overlap"]
+
+
+def test_signature_separates_risk_and_decode_mode():
+    details = {"vehicle_count": 4, "person_count": 1}
+    base = incident_signature("Accident", details, "HIGH", "pytorch:greedy")
+    assert base != incident_signature("Accident", details, "MEDIUM", "pytorch:greedy")
+    assert base != incident_signature("Accident", details, "HIGH", "int8:greedy")
+
+
+def test_disk_tier_round_trip_and_bound(tmp_path, monkeypatch):
+    path = str(tmp_path / "reports.sqlite")
+    details = {"vehicle_count": 2}
+    signature = incident_signature("Fire", details, "HIGH", "pytorch:greedy")
+    cache = ReportCache(disk_path=path, max_disk_entries=10)
+    cache.put(signature, "Fire reported near the junction.")
+
+    reopened = ReportCache(disk_path=path, max_disk_entries=10)
+    assert reopened.get(incident_signature("Fire", details, "HIGH", "pytorch:greedy")) == \
+        "Fire reported near the junction."
+    # Another model backend, or a changed prompt, must not reuse the stored report
+    assert reopened.get(incident_signature("Fire", details, "HIGH", "int8:greedy")) is None
+    monkeypatch.setattr("nlp.report_cache.SIGNATURE_VERSION", 3)
+    assert reopened.get(incident_signature("Fire", details, "HIGH", "pytorch:greedy")) is None
+
+    for i in range(200):
+        cache.put(("filler", i), "text")
+    assert cache.disk_entries() <= 10 + ReportCache.PRUNE_EVERY
+
+    reopened = ReportCache(disk_path=path, max_disk_entries=10)
+    assert reopened.disk_entries() <= 10
+    assert reopened.get(("filler", 199)) == "text"
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.fakes import StubGenerator
+from nlp.report_generator import ReportGenerator
+
+DETAILS = {"vehicle_count": 5, "person_count": 2, "severity": "HIGH", "flags": ["Overlap (0.40)"]}
+
+
+class _WordTokenizer:
+    """
+    Word-level tokenizer over a growing vocabulary (id 0: decoder start token).
+    """
+    def __init__(self):
+        self.vocab = ["<pad>"]
+
+    def encode(self, text):
+        ids = []
+        for word in text.split():
+            if word not in self.vocab:
+                self.vocab.append(word)
+            ids.append(self.vocab.index(word))
+        return ids
+
+    def decode(self, ids, skip_special_tokens=False, **kwargs):
+        ids = ids.tolist() if hasattr(ids, "tolist") else list(ids)
+        return " ".join(self.vocab[i] for i in ids if i or not skip_special_tokens)
+
+
+class _TokenStubGenerator(StubGenerator):
+    """
+    StubGenerator with a tokenizer, so ReportGenerator streams through
+    TextIteratorStreamer: decodes the stub text word by word, feeding the
+    streamer and checking the stopping criteria like generate() does.
+    """
+    def __init__(self, endless=False):
+        super().__init__()
+        self.tokenizer = _WordTokenizer()
+        self.endless = endless
+        self.steps = 0
+        self.finished = threading.Event()
+
+    def __call__(self, prompt, streamer=None, stopping_criteria=None, **kwargs):
+        import torch
+
+        text = super().__call__(prompt, **kwargs)[0]["generated_text"]
+        if streamer is None:
+            return [{"generated_text": text}]
+        if self.endless:
+            # A run-on report: no sentence boundary, so only cancellation or the budget ends it
+            text = " ".join((text.replace(".", "").split() * 1000)[:kwargs["max_new_tokens"]])
+        ids = self.tokenizer.encode(text)
+        try:
+            generated = [0]
+            streamer.put(torch.tensor([0])) # Decoder start token, skipped as the prompt
+            for token in ids:
+                generated.append(token)
+                self.steps += 1
+                if self.endless:
+                    time.sleep(0.005) # Decoder step
+                streamer.put(torch.tensor([token]))
+                if bool(stopping_criteria(torch.tensor([generated]), None).all()):
+                    break
+            streamer.end()
+        finally:
+            self.finished.set()
+        return [{"generated_text": self.tokenizer.decode(generated[1:], skip_special_tokens=True)}]
+
+
+def test_stub_stream_matches_the_report():
+    reporter = ReportGenerator(generator=StubGenerator(), deterministic=True)
+    pieces = list(reporter.generate_report_stream("Critical Traffic Accident", DETAILS, "HIGH"))
+    assert pieces
+    assert "".join(pieces) == reporter.generate_report("Critical Traffic Accident", DETAILS, "HIGH")
+
+
+def test_streamed_chunks_join_to_the_report():
+    pytest.importorskip("transformers")
+    reporter = ReportGenerator(generator=_TokenStubGenerator(), deterministic=True)
+    pieces = list(reporter.generate_report_stream("Critical Traffic Accident", DETAILS, "HIGH"))
+    assert len(pieces) > 1 # Arrived word by word
+    assert "".join(pieces) == reporter.generate_report("Critical Traffic Accident", DETAILS, "HIGH")
+
+
+def test_closing_the_stream_ends_the_generation_thread():
+    pytest.importorskip("transformers")
+    generator = _TokenStubGenerator(endless=True)
+    reporter = ReportGenerator(generator=generator, deterministic=True)
+    stream = reporter.generate_report_stream("Critical Traffic Accident", DETAILS, "HIGH")
+    assert next(stream)
+    stream.close() # e.g. the dashboard moved on to a newer incident
+
+    assert generator.finished.is_set()
+    assert generator.steps < 256 # Stopped well before the HIGH token budget
+    assert not [t for t in threading.enumerate() if t.name == "cityguard-report-stream"]
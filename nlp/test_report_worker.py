@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+from benchmarks.fakes import StubGenerator
+from nlp.report_generator import ReportGenerator
+from nlp.report_worker import ReportWorker
+
+DETAILS = {"vehicle_count": 4, "person_count": 1, "severity": "HIGH", "flags": []}
+
+
+class _GatedGenerator(StubGenerator):
+    """
+    StubGenerator whose first call waits until released, so the worker stays
+    busy while the test fills the queue. Records the prompt of every call.
+    """
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.prompts = []
+
+    def __call__(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        if len(self.prompts) == 1:
+            self.started.set()
+            assert self.release.wait(timeout=5)
+        return super().__call__(prompt, **kwargs)
+
+
+@pytest.fixture
+def busy_worker(request):
+    """
+    ReportWorker already generating a report for stream "busy".
+    """
+    generator = _GatedGenerator()
+    worker = ReportWorker(ReportGenerator(generator=generator, deterministic=True),
+                          max_pending=2, drop_policy=getattr(request, "param", "oldest"))
+    running = worker.submit("busy", "Normal Traffic", DETAILS, "LOW")
+    assert generator.started.wait(timeout=5)
+    yield worker, generator, running
+    generator.release.set()
+    worker.close()
+
+
+def _snapshot(vehicles):
+    return dict(DETAILS, vehicle_count=vehicles)
+
+
+def test_only_the_newest_pending_request_per_stream_is_generated(busy_worker):
+    worker, generator, running = busy_worker
+    details = {"vehicle_count": 1, "person_count": 0, "flags": ["Overlap (0.40)"]}
+    futures = []
+    for vehicles in (5, 6, 7):
+        details["vehicle_count"] = vehicles # The caller keeps mutating its dict
+        futures.append(worker.submit("cam-1", "Critical Traffic Accident", details, "HIGH"))
+    assert worker.pending() == 1
+    assert futures[0].cancelled() and futures[1].cancelled()
+
+    generator.release.set()
+    assert futures[2].result(timeout=5)
+    assert running.result(timeout=5)
+    assert len(generator.prompts) == 2
+    assert "7 vehicles" in generator.prompts[1]
+    assert worker.stats["coalesced"] == 2 and worker.stats["completed"] == 2
+
+
+def test_full_queue_drops_the_oldest_request(busy_worker):
+    worker, generator, _ = busy_worker
+    a = worker.submit("cam-a", "Gridlock", _snapshot(21), "MEDIUM")
+    b = worker.submit("cam-b", "Gridlock", _snapshot(22), "MEDIUM")
+    c = worker.submit("cam-c", "Gridlock", _snapshot(23), "MEDIUM")
+    assert a.cancelled() and not b.done() and not c.done()
+    assert worker.pending() == 2 and worker.stats["dropped"] == 1
+
+    generator.release.set()
+    assert b.result(timeout=5) and c.result(timeout=5)
+    assert len(generator.prompts) == 3
+
+
+@pytest.mark.parametrize("busy_worker", ["newest"], indirect=True)
+def test_full_queue_rejects_the_newest_request(busy_worker):
+    worker, generator, _ = busy_worker
+    a = worker.submit("cam-a", "Gridlock", _snapshot(21), "MEDIUM")
+    b = worker.submit("cam-b", "Gridlock", _snapshot(22), "MEDIUM")
+    c = worker.submit("cam-c", "Gridlock", _snapshot(23), "MEDIUM")
+    assert c.cancelled() and not a.done() and not b.done()
+    assert worker.pending() == 2 and worker.stats["dropped"] == 1
+
+    generator.release.set()
+    assert a.result(timeout=5) and b.result(timeout=5)
+    assert len(generator.prompts) == 3
+
+
+def test_close_cancels_queued_requests(busy_worker):
+    worker, generator, running = busy_worker
+    queued = worker.submit("cam-1", "Gridlock", _snapshot(30), "MEDIUM")
+    worker.close(wait=False)
+    assert queued.cancelled()
+    generator.release.set()
+    assert running.result(timeout=5) # The running report still completes
+    assert len(generator.prompts) == 1
+    with pytest.raises(RuntimeError, match="closed"):
+        worker.submit("cam-1", "Gridlock", _snapshot(30), "MEDIUM")
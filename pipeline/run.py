@@ -0,0 +1,110 @@
+"""
+Headless CityGuard runner (no Streamlit).
+
+    python -m pipeline.run traffic.mp4 rtsp://cam-07/stream videos/ --out incidents.jsonl
+"""
+import argparse
+import json
+import sys
+import time
+
+from vision.detector import IncidentDetector
+from pipeline.stages import StreamingPipeline, expand_sources
+from utils.model_loader import BackgroundModel, startup_report
+from utils.metrics import METRICS
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="CityGuard headless incident pipeline (JSON Lines output)")
+    parser.add_argument("inputs", nargs="+", help="video files, stream URLs or directories of videos")
+    parser.add_argument("--out", default="-", help="JSON Lines output file ('-' for stdout)")
+    parser.add_argument("--analysis-fps", type=float, default=5.0,
+                        help="frames analyzed per second of stream time")
+    parser.add_argument("--batch-size", type=int, default=4, help="max frames per batched forward pass")
+    parser.add_argument("--queue-size", type=int, default=32, help="capacity of each inter-stage queue")
+    parser.add_argument("--max-open-sources", type=int, default=8, help="sources decoded concurrently")
+    parser.add_argument("--report-interval", type=float, default=10.0,
+                        help="seconds of stream time between reports of an unchanged scene")
+    parser.add_argument("--no-report", action="store_true", help="skip Flan-T5 report generation")
+    parser.add_argument("--report-backend", default="pytorch", choices=["pytorch", "int8", "onnx"])
+    parser.add_argument("--report-threads", type=int, default=None,
+                        help="report model CPU threads (ONNX Runtime session; pytorch / int8 size torch's "
+                             "process-wide pool, shared with the vision engines)")
+    parser.add_argument("--vision-backend", default=None, choices=["pytorch", "onnx", "openvino"],
+                        help="default: the node profile's backend, else pytorch")
+    parser.add_argument("--tile-size", type=int, default=0,
+                        help="tiled inference on native-resolution crops of this size (0: off)")
+    parser.add_argument("--tile-overlap", type=float, default=0.2, help="overlap between neighbouring tiles")
+    parser.add_argument("--tile-workers", type=int, default=4, help="threads cropping tiles")
+    parser.add_argument("--zones", default=None,
+                        help="per-camera zone layout JSON (lane / shoulder / crosswalk / ignore polygons)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="motion-gated sampling: skip inference on static frames")
+    parser.add_argument("--all-frames", action="store_true", help="emit every analyzed frame, not only incidents")
+    parser.add_argument("--events", default=None,
+                        help="record detections and incidents in this event store (replay with pipeline.replay)")
+    parser.add_argument("--metrics-port", type=int, default=None, help="serve Prometheus /metrics on localhost:PORT")
+    parser.add_argument("--metrics-file", default=None, help="write Prometheus text metrics to this file at exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sources = expand_sources(args.inputs)
+    if not sources:
+        print("No readable inputs.", file=sys.stderr)
+        return 1
+
+    if args.metrics_port or args.metrics_file:
+        METRICS.enabled = True
+    if args.metrics_port:
+        METRICS.serve(args.metrics_port)
+
+    if args.report_threads and args.report_backend != "onnx" and not args.no_report:
+        from nlp.backends import set_torch_threads
+        set_torch_threads(args.report_threads) # Process-wide, so before any engine loads
+
+    # Vision and language engines load concurrently
+    vision_model = BackgroundModel("vision", lambda: IncidentDetector(
+        fire_cascade=True, backend=args.vision_backend, tiling=args.tile_size > 0, tile_size=args.tile_size,
+        tile_overlap=args.tile_overlap, tile_workers=args.tile_workers, zones=args.zones),
+        imports=("torch", "ultralytics"))
+    report_model = None
+    if not args.no_report:
+        from nlp.report_cache import ReportCache
+        from nlp.report_generator import ReportGenerator
+        report_model = BackgroundModel("report", lambda: ReportGenerator(
+            cache=ReportCache(disk_path="cache/reports.sqlite"), deterministic=True, backend=args.report_backend,
+            num_threads=args.report_threads), imports=("torch", "transformers"))
+    detector = vision_model.get()
+    reporter = report_model.get() if report_model else None
+    print(startup_report(*[m for m in (vision_model, report_model) if m]), file=sys.stderr)
+
+    out = sys.stdout if args.out == "-" else open(args.out, "a", encoding="utf-8")
+    events = None
+    if args.events:
+        from utils.event_store import EventStore
+        events = EventStore(args.events)
+    pipeline = StreamingPipeline(detector, reporter, queue_size=args.queue_size, batch_size=args.batch_size,
+                                 analysis_fps=args.analysis_fps, report_interval=args.report_interval,
+                                 all_frames=args.all_frames, max_open_sources=args.max_open_sources,
+                                 adaptive=args.adaptive, events=events, out=out)
+    start = time.perf_counter()
+    try:
+        stats = pipeline.run(sources)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if events is not None:
+            events.close()
+
+    if args.metrics_file:
+        METRICS.write_textfile(args.metrics_file)
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    stats["fire_model"] = detector.fire_gate_stats()
+    print(json.dumps({"summary": stats}), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
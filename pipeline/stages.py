@@ -0,0 +1,265 @@
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from utils.risk_assessment import calculate_risk
+from utils.video_ingest import VideoFrameReader
+from utils.metrics import METRICS
+from vision.motion_sampler import AdaptiveSampler
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v")
+_END = object() # end-of-stream marker passed down the queues
+
+
+def expand_sources(inputs):
+    """
+    Resolves CLI inputs into a list of (stream_id, uri, is_live).
+    Accepts video files, stream URLs (rtsp://, http://, ...) and directories of videos.
+    """
+    sources = []
+    for item in inputs:
+        if "://" in item:
+            sources.append((item, item, True))
+        elif os.path.isdir(item):
+            for name in sorted(os.listdir(item)):
+                if name.lower().endswith(VIDEO_EXTENSIONS):
+                    path = os.path.join(item, name)
+                    sources.append((path, path, False))
+        elif os.path.isfile(item):
+            sources.append((item, item, False))
+        else:
+            print(f"Warning: skipping unknown input {item}", file=sys.stderr)
+    return sources
+
+
+class StreamingPipeline:
+    def __init__(self, detector, reporter=None, queue_size=32, batch_size=4, analysis_fps=5.0,
+                 report_interval=10.0, all_frames=False, max_open_sources=8, adaptive=False,
+                 events=None, out=None):
+        """
+        Headless decode -> detect -> analyze/risk -> report pipeline.
+
+        Each stage runs on its own thread and the stages are connected by
+        bounded queues: a slow stage blocks the one before it (backpressure).
+        Live sources never block on a full queue; they drop the frame instead
+        so the camera buffer does not fall behind.
+
+        analysis_fps: frames analyzed per second of stream time, whatever the source FPS.
+        report_interval: seconds of stream time between reports of an unchanged scene.
+        all_frames: emit every analyzed frame, not only incidents.
+        adaptive: motion-gated sampling per stream on top of analysis_fps;
+                  static frames are skipped in the decode stage.
+        events: optional EventStore recording every analyzed frame.
+        """
+        self.detector = detector
+        self.reporter = reporter
+        self.batch_size = batch_size
+        self.analysis_fps = analysis_fps
+        self.report_interval = report_interval
+        self.all_frames = all_frames
+        self.adaptive = adaptive
+        self._samplers = {} # stream_id -> AdaptiveSampler
+        self.events = events
+        self.out = out or sys.stdout
+
+        self.decoded_q = queue.Queue(maxsize=queue_size)
+        self.detected_q = queue.Queue(maxsize=queue_size)
+        self.analyzed_q = queue.Queue(maxsize=queue_size)
+        self._open_slots = threading.Semaphore(max_open_sources)
+        self._lock = threading.Lock()
+        self._failed = threading.Event()
+        self._errors = [] # (stage, exception)
+        self.stats = {"decoded": 0, "analyzed": 0, "dropped": 0, "static_skipped": 0, "reports": 0, "emitted": 0}
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+        if key == "dropped":
+            METRICS.inc("frames_dropped", n)
+
+    def _record_queue_depths(self):
+        METRICS.set_gauge("decoded_queue_depth", self.decoded_q.qsize())
+        METRICS.set_gauge("detected_queue_depth", self.detected_q.qsize())
+        METRICS.set_gauge("analyzed_queue_depth", self.analyzed_q.qsize())
+
+    def _fail(self, stage, error):
+        """
+        Records a stage failure. The pipeline winds down (decoders stop, the
+        other stages drain their queues) and run() re-raises the error.
+        """
+        with self._lock:
+            self._errors.append((stage, error))
+        self._failed.set()
+        print(f"Error: {stage} stage failed: {error!r}", file=sys.stderr)
+
+    @staticmethod
+    def _drain(q):
+        # Keeps consuming after a failure so upstream stages never block on a full queue
+        while q.get() is not _END:
+            pass
+
+    # 1. DECODE
+    def _decode(self, stream_id, uri, is_live):
+        try:
+            with self._open_slots:
+                # This stage already is the decode thread, so no extra prefetch thread
+                reader = VideoFrameReader(uri, target_fps=self.analysis_fps, prefetch=0, live=is_live)
+                if not reader.isOpened():
+                    print(f"Warning: cannot open {uri}", file=sys.stderr)
+                sampler = AdaptiveSampler() if self.adaptive else None
+                self._samplers[stream_id] = sampler
+                with reader:
+                    for frame_idx, ts, frame in reader:
+                        if self._failed.is_set():
+                            break
+                        self._count("decoded")
+                        if sampler is not None and not sampler.should_analyze(frame):
+                            self._count("static_skipped")
+                            continue
+                        item = (stream_id, frame_idx, ts, frame)
+                        if is_live:
+                            try:
+                                self.decoded_q.put_nowait(item)
+                            except queue.Full:
+                                self._count("dropped")
+                        else:
+                            self.decoded_q.put(item)
+        except Exception as e:
+            self._fail(f"decode {stream_id}", e)
+        finally:
+            self.decoded_q.put((stream_id, _END))
+
+    # 2. DETECT (batched across streams)
+    def _detect(self, n_sources):
+        finished = 0
+        try:
+            while finished < n_sources:
+                batch = [self.decoded_q.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.decoded_q.get_nowait())
+                    except queue.Empty:
+                        break
+                ends = [item for item in batch if item[1] is _END]
+                finished += len(ends)
+
+                frames = [item for item in batch if item[1] is not _END]
+                self._record_queue_depths()
+                if frames and not self._failed.is_set():
+                    # A failing batch stops the run (see _fail) instead of silently dropping its frames
+                    results = self.detector.detect_batch([f[3] for f in frames],
+                                                         stream_ids=[f[0] for f in frames], track=True)
+                    for (stream_id, frame_idx, ts, _), (main_res, fire_res) in zip(frames, results):
+                        self.detected_q.put((stream_id, frame_idx, ts, main_res, fire_res))
+
+                for item in ends:
+                    self.detected_q.put(item)
+        except Exception as e:
+            self._fail("detect", e)
+            while finished < n_sources:
+                if self.decoded_q.get()[1] is _END:
+                    finished += 1
+        finally:
+            self.detected_q.put(_END)
+
+    # 3. ANALYZE + RISK
+    def _analyze(self):
+        try:
+            self._analyze_items()
+        except Exception as e:
+            self._fail("analyze", e)
+            self._drain(self.detected_q)
+        finally:
+            self.analyzed_q.put(_END)
+
+    def _analyze_items(self):
+        while True:
+            item = self.detected_q.get()
+            if item is _END:
+                break
+            if item[1] is _END:
+                self.detector.reset_stream(item[0])
+                continue
+            stream_id, frame_idx, ts, main_res, fire_res = item
+            incident_type, details = self.detector.analyze_incident(main_res, fire_res, stream_id=stream_id)
+            with METRICS.time("calculate_risk"):
+                risk = calculate_risk(incident_type, 0.8, details)
+            sampler = self._samplers.get(stream_id)
+            if sampler is not None:
+                sampler.report_incident(incident_type)
+            wall_time = time.time()
+            if self.events is not None:
+                tiler = self.detector.tiler
+                self.events.append(stream_id, main_res, fire_res, incident_type, risk, details,
+                                   ts=wall_time, stream_time=ts, frame_idx=frame_idx,
+                                   zones=self.detector.zone_config(stream_id),
+                                   tile_size=tiler.tile_size if tiler is not None else None)
+            self._count("analyzed")
+            self.analyzed_q.put({
+                "stream": stream_id,
+                "frame": frame_idx,
+                "stream_time": round(ts, 3),
+                "wall_time": wall_time,
+                "incident_type": incident_type,
+                "risk": risk,
+                "severity": details["severity"],
+                "vehicle_count": details["vehicle_count"],
+                "person_count": details["person_count"],
+                "flags": details["flags"],
+                "_details": details,
+            })
+
+    # 4. REPORT + EMIT
+    def _report_and_emit(self):
+        try:
+            self._report_and_emit_items()
+        except Exception as e:
+            self._fail("report", e)
+            self._drain(self.analyzed_q)
+
+    def _report_and_emit_items(self):
+        last_report = {} # stream -> (incident_type, stream_time)
+        while True:
+            event = self.analyzed_q.get()
+            if event is _END:
+                break
+            details = event.pop("_details")
+            is_incident = event["incident_type"] != "Normal Traffic"
+
+            if self.reporter is not None:
+                previous = last_report.get(event["stream"])
+                if (previous is None or previous[0] != event["incident_type"]
+                        or event["stream_time"] - previous[1] >= self.report_interval):
+                    event["report"] = self.reporter.generate_report(event["incident_type"], details, event["risk"])
+                    last_report[event["stream"]] = (event["incident_type"], event["stream_time"])
+                    self._count("reports")
+
+            if is_incident or self.all_frames:
+                self.out.write(json.dumps(event) + "\n")
+                self.out.flush()
+                self._count("emitted")
+
+    def run(self, sources):
+        """
+        Processes all sources to completion. Returns the stage counters.
+        If a stage fails, the pipeline shuts down and its exception is re-raised.
+        """
+        if not sources:
+            return dict(self.stats)
+        threads = [threading.Thread(target=self._decode, args=src, name=f"decode-{i}", daemon=True)
+                   for i, src in enumerate(sources)]
+        threads += [
+            threading.Thread(target=self._detect, args=(len(sources),), name="detect", daemon=True),
+            threading.Thread(target=self._analyze, name="analyze", daemon=True),
+            threading.Thread(target=self._report_and_emit, name="report", daemon=True),
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if self._errors:
+            raise self._errors[0][1]
+        return dict(self.stats)
@@ -0,0 +1,59 @@
+import io
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks.fakes import FakeYOLO
+from pipeline.stages import StreamingPipeline
+from vision.detector import IncidentDetector
+
+CAR = (10, 10, 40, 30, 2)
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    """
+    2 s of 10 FPS video.
+    """
+    path = str(tmp_path_factory.mktemp("video") / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("OpenCV build cannot write MJPG video")
+    for i in range(20):
+        writer.write(np.full((48, 64, 3), 5 * i, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def _detector(main_model=None):
+    return IncidentDetector.from_models(main_model or FakeYOLO(default=[CAR]), fire_cascade=True,
+                                        fire_model=FakeYOLO(names={0: "fire", 1: "smoke"}))
+
+
+def test_fire_gate_stats_survive_the_end_of_stream(clip):
+    pytest.importorskip("ultralytics") # Per-stream ByteTrack
+    detector = _detector()
+    out = io.StringIO()
+    stats = StreamingPipeline(detector, analysis_fps=5.0, all_frames=True, out=out).run([("cam", clip, False)])
+    assert stats["analyzed"] == 10
+    assert len(out.getvalue().splitlines()) == 10
+    assert json.loads(out.getvalue().splitlines()[0])["vehicle_count"] == 1
+
+    # The stream was reset at its end; its cascade counters still count
+    assert "cam" not in detector._fire_gates
+    fire_stats = detector.fire_gate_stats()
+    assert fire_stats["frames"] == 10
+    assert fire_stats["run"] + fire_stats["skipped"] == 10
+    assert fire_stats["run"] >= 1 # First frame always runs
+
+
+def test_detection_failure_stops_the_run(clip):
+    class Broken(FakeYOLO):
+        def __call__(self, source, **kwargs):
+            raise RuntimeError("engine crashed")
+
+    pipeline = StreamingPipeline(_detector(Broken()), analysis_fps=5.0, out=io.StringIO())
+    with pytest.raises(RuntimeError, match="engine crashed"):
+        pipeline.run([("cam", clip, False)])
@@ -0,0 +1,282 @@
+import codecs
+import http.client
+import json
+import threading
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+from urllib.parse import urlencode, urlparse
+
+import cv2
+import numpy as np
+
+from service.protocol import (DEFAULT_URL, JPEG, SHM, ServiceError, decode_analysis, decode_result, int_keys,
+                              json_default)
+
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+
+class InferenceClient:
+    def __init__(self, url=DEFAULT_URL, transport="auto", jpeg_quality=90, timeout=30):
+        """
+        Client of the local inference service (python -m service.server).
+
+        transport: "shm" hands frames over in shared memory (same host only,
+                   no encode / decode), "jpeg" sends encoded frames, "auto"
+                   uses shared memory on localhost and falls back to JPEG if
+                   the service cannot attach the segments.
+
+        A session is opened on first use (and re-opened if the service
+        restarted); connections are kept alive per thread.
+        """
+        if transport not in ("auto", "shm", "jpeg"):
+            raise ValueError(f"Unknown transport: {transport}")
+        parsed = urlparse(url)
+        self.url = url
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.auto_fallback = transport == "auto"
+        if transport == "auto":
+            transport = "shm" if self.host in LOCAL_HOSTS else "jpeg"
+        self.transport = transport
+        self.jpeg_quality = jpeg_quality
+        self.timeout = timeout
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._session = None
+        self._segments = {} # stream -> SharedMemory
+        self._stream_locks = {} # stream -> Lock held from writing its segment until the reply
+
+    # --- HTTP --------------------------------------------------------------------
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def _send(self, method, path, body=None, content_type="application/json"):
+        headers = {"Content-Type": content_type} if body is not None else {}
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                return conn.getresponse()
+            except (ConnectionError, http.client.HTTPException):
+                # Keep-alive connection dropped (e.g. service restarted): reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+    def _request(self, method, path, body=None, content_type="application/json"):
+        response = self._send(method, path, body, content_type)
+        data = json.loads(response.read() or b"null")
+        if response.status >= 400:
+            raise ServiceError(response.status, (data or {}).get("error", response.reason))
+        return data
+
+    def _json(self, method, path, payload=None):
+        body = json.dumps(payload, default=json_default).encode("utf-8") if payload is not None else None
+        return self._request(method, path, body)
+
+    # --- Sessions ----------------------------------------------------------------
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = self._json("POST", "/v1/sessions")["session"]
+            return self._session
+
+    def _session_call(self, fn):
+        """
+        Runs fn(session); re-opens the session once if the service no longer knows it.
+        """
+        session = self.session
+        try:
+            return fn(session)
+        except ServiceError as e:
+            if e.status != 404:
+                raise
+            with self._lock:
+                if self._session == session:
+                    self._session = None
+            return fn(self.session)
+
+    # --- API ---------------------------------------------------------------------
+    def info(self):
+        return self._json("GET", "/v1/info")
+
+    def stats(self):
+        return self._json("GET", "/v1/stats")
+
+    def stream_stats(self, stream="default"):
+        return self._session_call(lambda session: self._json(
+            "GET", f"/v1/sessions/{session}/stats?{urlencode({'stream': stream})}"))
+
+    def detect(self, frame, stream="default", track=False, conf=None):
+        """
+        Detection + incident analysis of one BGR frame. Returns the service's
+        JSON payload (boxes, fire, shape, incident_type, details, risk, analysis).
+        """
+        query = {"stream": stream, "track": int(bool(track))}
+        if conf is not None:
+            query["conf"] = conf
+
+        def call(session):
+            path = f"/v1/sessions/{session}/detect?{urlencode(query)}"
+            if self.transport == "shm":
+                try:
+                    # One frame in flight per stream segment: callers sharing this client
+                    # (e.g. dashboard sessions on "default") must not overwrite it before it is read
+                    with self._stream_lock(stream):
+                        return self._request("POST", path, self._share(stream, frame), SHM)
+                except (ServiceError, OSError) as e:
+                    if not self.auto_fallback or getattr(e, "status", 400) != 400:
+                        raise
+                    # Service in another container / namespace: no shared memory
+                    print(f"Warning: shared memory transport unavailable ({e}); sending JPEG frames.")
+                    self.transport = "jpeg"
+                    self._release_segments()
+            ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                raise ValueError("Could not encode frame")
+            return self._request("POST", path, encoded.tobytes(), JPEG)
+
+        return self._session_call(call)
+
+    def _stream_lock(self, stream):
+        with self._lock:
+            lock = self._stream_locks.get(stream)
+            if lock is None:
+                lock = self._stream_locks[stream] = threading.Lock()
+            return lock
+
+    def _share(self, stream, frame):
+        """
+        Copies the frame into this stream's segment (grown as needed) and
+        returns the JSON header the service attaches by name.
+        """
+        with self._lock:
+            shm = self._segments.get(stream)
+            if shm is None or shm.size < frame.nbytes:
+                if shm is not None:
+                    shm.close()
+                    shm.unlink()
+                shm = self._segments[stream] = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        np.ndarray(frame.shape, dtype=frame.dtype, buffer=shm.buf)[...] = frame
+        return json.dumps({"name": shm.name, "shape": list(frame.shape), "dtype": str(frame.dtype)}).encode("utf-8")
+
+    def reset(self, stream="default"):
+        self._session_call(lambda session: self._request(
+            "POST", f"/v1/sessions/{session}/reset?{urlencode({'stream': stream})}", b""))
+
+    def report(self, incident_type, details, risk_level):
+        payload = {"incident_type": incident_type, "details": details, "risk": risk_level}
+        return self._json("POST", "/v1/report", payload)["report"]
+
+    def report_stream(self, incident_type, details, risk_level):
+        """
+        Yields the report text as the service generates it (chunked response).
+        """
+        payload = {"incident_type": incident_type, "details": details, "risk": risk_level}
+        body = json.dumps(payload, default=json_default).encode("utf-8")
+        response = self._send("POST", "/v1/report?stream=1", body)
+        if response.status >= 400:
+            data = json.loads(response.read() or b"null")
+            raise ServiceError(response.status, (data or {}).get("error", response.reason))
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        try:
+            while True:
+                data = response.read1(4096)
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    yield text
+        finally:
+            if not response.isclosed():
+                # Abandoned mid-stream: the connection cannot be reused
+                self._local.conn.close()
+                self._local.conn = None
+
+    def _release_segments(self):
+        with self._lock:
+            for shm in self._segments.values():
+                shm.close()
+                shm.unlink()
+            self._segments.clear()
+
+    def close(self):
+        """
+        Ends the session (resetting its streams on the service) and frees the shared memory.
+        """
+        with self._lock:
+            session, self._session = self._session, None
+        if session is not None:
+            try:
+                self._json("DELETE", f"/v1/sessions/{session}")
+            except (ServiceError, OSError):
+                pass
+        self._release_segments()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RemoteDetector:
+    def __init__(self, client, stream="default"):
+        """
+        IncidentDetector stand-in backed by the inference service, for the
+        dashboard: detect() returns ArrayResults and analyze_incident() the
+        analysis the service ran on the same frame.
+        """
+        self.client = client
+        self.stream = stream
+        info = client.info()
+        if not info["ready"]["vision"]:
+            # Wait for the service's vision engine (first detect blocks until it is loaded)
+            client.stats()
+            info = client.info()
+        self.main_model = SimpleNamespace(names=int_keys(info["names"]))
+        self.fire_names = int_keys(info["fire_names"])
+        self.tiler = None # Tiling / zones are configured on the service
+        self.load_timings = {}
+
+    def detect(self, image, track=False, conf=None, stream_id=None, tile_size=None):
+        # tile_size is ignored: tiling is configured on the service
+        payload = self.client.detect(image, stream_id or self.stream, track=track, conf=conf)
+        shape = payload["shape"]
+        main_res = decode_result(payload["boxes"], self.main_model.names, shape)
+        fire_res = decode_result(payload["fire"], self.fire_names, shape)
+        main_res.remote = payload
+        return main_res, fire_res
+
+    def analyze_incident(self, main_result, fire_result=None, stream_id=None, zones=None, return_analysis=False):
+        # zones is ignored: the analysis already ran on the service with its zone layout
+        payload = main_result.remote
+        if not return_analysis:
+            return payload["incident_type"], payload["details"]
+        analysis = decode_analysis(payload["analysis"], self.main_model.names)
+        return payload["incident_type"], payload["details"], analysis
+
+    def reset_stream(self, stream_id=None):
+        self.client.reset(stream_id or self.stream)
+
+    def fire_gate_stats(self, stream_id=None):
+        # Without stream_id service-wide: the fire gate counts frames of every client
+        if stream_id is not None:
+            return self.client.stream_stats(stream_id)["fire_gate"]
+        return self.client.stats()["fire_gate"]
+
+
+class RemoteReporter:
+    def __init__(self, client):
+        self.client = client
+
+    def generate_report(self, incident_type, details, risk_level):
+        return self.client.report(incident_type, details, risk_level)
+
+    def generate_report_stream(self, incident_type, details, risk_level):
+        return self.client.report_stream(incident_type, details, risk_level)
@@ -0,0 +1,98 @@
+import numpy as np
+
+from vision.array_result import ArrayBoxes, ArrayResult
+
+# Frame transports of POST /v1/sessions/<id>/detect
+JPEG = "image/jpeg"
+SHM = "application/x-cityguard-shm" # JSON header naming a shared-memory segment holding a raw BGR frame
+DEFAULT_URL = "http://127.0.0.1:8765"
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def encode_boxes(boxes):
+    """
+    Boxes (Ultralytics or ArrayBoxes) as compact JSON-able columns.
+    """
+    boxes = ArrayBoxes.from_boxes(boxes)
+    return {
+        "xyxy": np.round(boxes.xyxy, 1).tolist(),
+        "cls": boxes.cls.astype(np.int64).tolist(),
+        "conf": np.round(boxes.conf, 4).tolist(),
+        "ids": boxes.id.astype(np.int64).tolist() if boxes.id is not None else None,
+    }
+
+
+def decode_boxes(data):
+    return ArrayBoxes(np.asarray(data["xyxy"], dtype=np.float64).reshape(-1, 4), data["cls"], data["conf"],
+                      data["ids"])
+
+
+def decode_result(data, names, shape):
+    return ArrayResult(decode_boxes(data), names, tuple(shape)) if data is not None else None
+
+
+def encode_analysis(analysis):
+    """
+    Per-box analysis of analyze_incident(..., return_analysis=True) without the
+    class names; masks become index lists.
+    """
+    if analysis is None:
+        return None
+    return {
+        "xyxy": np.round(analysis["xyxy"], 1).tolist(),
+        "cls": analysis["cls"].tolist(),
+        "ids": analysis["ids"].tolist() if analysis["ids"] is not None else None,
+        "zones": analysis["zones"].tolist() if analysis["zones"] is not None else None,
+        "stagnant": np.flatnonzero(analysis["stagnant"]).tolist(),
+        "crash": np.flatnonzero(analysis["crash"]).tolist(),
+        "overturned": np.flatnonzero(analysis["overturned"]).tolist(),
+        "incident_type": analysis["incident_type"],
+        "severity": analysis["severity"],
+        "flags": analysis["flags"],
+    }
+
+
+def decode_analysis(data, names):
+    if data is None:
+        return None
+    n = len(data["cls"])
+
+    def mask(index):
+        full = np.zeros(n, dtype=bool)
+        full[index] = True
+        return full
+
+    return {
+        "xyxy": np.asarray(data["xyxy"], dtype=np.float64).reshape(-1, 4),
+        "cls": np.asarray(data["cls"], dtype=np.int64),
+        "ids": np.asarray(data["ids"], dtype=np.int64) if data["ids"] is not None else None,
+        "names": names,
+        "zones": np.asarray(data["zones"], dtype=np.uint8) if data["zones"] is not None else None,
+        "stagnant": mask(data["stagnant"]),
+        "crash": mask(data["crash"]),
+        "overturned": mask(data["overturned"]),
+        "incident_type": data["incident_type"],
+        "severity": data["severity"],
+        "flags": data["flags"],
+    }
+
+
+def json_default(value):
+    """
+    json.dumps fallback for NumPy scalars left in details / stats.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def int_keys(names):
+    """
+    JSON turns class-id keys into strings; restores them.
+    """
+    return {int(k): v for k, v in names.items()} if names else names
@@ -0,0 +1,380 @@
+"""
+Local CityGuard inference service: one IncidentDetector and ReportGenerator
+per node, shared by every dashboard and batch job.
+
+    python -m service.server --port 8765
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import resource_tracker, shared_memory
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+from service.protocol import JPEG, SHM, ServiceError, encode_analysis, encode_boxes, json_default
+from utils.metrics import METRICS
+from utils.model_loader import BackgroundModel, startup_report
+from utils.risk_assessment import calculate_risk
+from vision.batching import BatchScheduler
+
+
+def read_shared_frame(header):
+    """
+    Copies a raw frame out of the client's shared-memory segment.
+    The client owns (and unlinks) the segment; attaching must not register it
+    with this process' resource tracker, or it would be unlinked at our exit.
+    """
+    try:
+        shm = shared_memory.SharedMemory(name=header["name"])
+    except (FileNotFoundError, KeyError) as e:
+        raise ServiceError(400, f"shared memory segment unavailable: {e}")
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+        shape = tuple(header["shape"])
+        if int(np.prod(shape)) > shm.size:
+            raise ServiceError(400, "frame larger than shared memory segment")
+        return np.ndarray(shape, dtype=np.uint8, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+
+
+class InferenceService:
+    def __init__(self, vision_model, report_model=None, max_batch_size=8, max_wait_ms=10,
+                 session_ttl=300, load_timeout=600):
+        """
+        Hosts the engines for many clients.
+
+        vision_model / report_model: BackgroundModels (the service answers
+        /v1/info while they load). Frames from all clients are batched into
+        shared detect_batch calls; every client session gets its own
+        namespace of streams ("<session>/<stream>"), so ByteTrack state,
+        track history and fire cascades stay per client and camera. Zone
+        layouts are looked up by the plain stream name, so every client of a
+        camera gets its zones. Sessions idle for session_ttl seconds are reset.
+        """
+        self.vision_model = vision_model
+        self.report_model = report_model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.session_ttl = session_ttl
+        self.load_timeout = load_timeout
+
+        self._scheduler = None
+        self._lock = threading.Lock()
+        self._analysis_lock = threading.Lock() # track histories are not thread-safe (analyze / reset)
+        self._report_lock = threading.Lock() # one generation at a time
+        self._sessions = {} # session -> {"streams": set, "last_seen": monotonic}
+        self._last_reap = time.monotonic()
+
+    # --- Engines -----------------------------------------------------------------
+    def _detector(self):
+        try:
+            detector = self.vision_model.get(timeout=self.load_timeout)
+        except TimeoutError as e:
+            raise ServiceError(503, str(e))
+        with self._lock:
+            if self._scheduler is None:
+                self._scheduler = BatchScheduler(detector, self.max_batch_size, self.max_wait_ms)
+        return detector
+
+    def info(self):
+        ready = {"vision": self.vision_model.is_ready(),
+                 "report": self.report_model.is_ready() if self.report_model else None}
+        detector = self.vision_model.get() if ready["vision"] else None
+        with self._lock:
+            sessions = len(self._sessions)
+        return {"ready": ready, "sessions": sessions,
+                "names": dict(detector.main_model.names) if detector else None,
+                "fire_names": dict(detector.fire_model.names) if detector and detector.fire_model else None,
+                "batching": dict(self._scheduler.stats) if self._scheduler else None,
+                "startup": startup_report(*[m for m in (self.vision_model, self.report_model) if m])}
+
+    # --- Sessions ----------------------------------------------------------------
+    def open_session(self):
+        session = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._sessions[session] = {"streams": set(), "last_seen": time.monotonic()}
+        self._reap()
+        return session
+
+    def close_session(self, session):
+        with self._lock:
+            state = self._sessions.pop(session, None)
+        if state is None:
+            raise ServiceError(404, f"unknown session {session}")
+        self._reset_streams(state["streams"])
+
+    def _stream_key(self, session, stream):
+        with self._lock:
+            state = self._sessions.get(session)
+            if state is None:
+                raise ServiceError(404, f"unknown session {session}")
+            key = f"{session}/{stream}"
+            state["streams"].add(key)
+            state["last_seen"] = time.monotonic()
+        return key
+
+    def _reset_streams(self, keys):
+        if self.vision_model.is_ready():
+            detector = self.vision_model.get()
+            with self._analysis_lock:
+                for key in keys:
+                    detector.reset_stream(key)
+
+    def reset_stream(self, session, stream):
+        key = self._stream_key(session, stream)
+        self._reset_streams([key])
+
+    def _reap(self):
+        """
+        Drops sessions whose clients went away without closing them.
+        """
+        now = time.monotonic()
+        if now - self._last_reap < 10:
+            return
+        self._last_reap = now
+        with self._lock:
+            expired = [s for s, state in self._sessions.items() if now - state["last_seen"] > self.session_ttl]
+            streams = [key for s in expired for key in self._sessions.pop(s)["streams"]]
+        self._reset_streams(streams)
+
+    # --- Requests ----------------------------------------------------------------
+    def detect(self, session, stream, frame, track=False, conf=None):
+        key = self._stream_key(session, stream)
+        detector = self._detector()
+        with METRICS.time("service_detect"):
+            main_res, fire_res = self._scheduler.submit(key, frame, track=track, conf=conf).result()
+        with self._analysis_lock:
+            # State is per session stream; zone layouts are keyed by the client's camera name
+            incident_type, details, analysis = detector.analyze_incident(main_res, fire_res, stream_id=key,
+                                                                         zones=detector.zones_for(stream),
+                                                                         return_analysis=True)
+        analysis = encode_analysis(analysis)
+        self._reap()
+        return {
+            "shape": list(frame.shape[:2]),
+            "boxes": encode_boxes(main_res.boxes),
+            "fire": encode_boxes(fire_res.boxes) if fire_res is not None else None,
+            "incident_type": incident_type,
+            "details": details,
+            "risk": calculate_risk(incident_type, 0.8, details),
+            "analysis": analysis,
+        }
+
+    def _reporter(self):
+        if self.report_model is None:
+            raise ServiceError(404, "report generation disabled on this service")
+        try:
+            return self.report_model.get(timeout=self.load_timeout)
+        except TimeoutError as e:
+            raise ServiceError(503, str(e))
+
+    def report(self, payload):
+        reporter = self._reporter()
+        with self._report_lock, METRICS.time("service_report"):
+            text = reporter.generate_report(payload["incident_type"], payload["details"], payload["risk"])
+        return {"report": text}
+
+    def report_stream(self, payload):
+        """
+        Yields report text as it is decoded (generate_report_stream).
+        """
+        reporter = self._reporter()
+        with self._report_lock, METRICS.time("service_report"):
+            yield from reporter.generate_report_stream(payload["incident_type"], payload["details"], payload["risk"])
+
+    def stats(self):
+        detector = self._detector()
+        return {"fire_gate": detector.fire_gate_stats(),
+                "batching": dict(self._scheduler.stats) if self._scheduler else None}
+
+    def stream_stats(self, session, stream):
+        key = self._stream_key(session, stream)
+        return {"fire_gate": self._detector().fire_gate_stats(key)}
+
+    def close(self):
+        if self._scheduler is not None:
+            self._scheduler.close()
+
+    # --- HTTP --------------------------------------------------------------------
+    def serve(self, port=8765, host="127.0.0.1"):
+        """
+        Serves the HTTP API on a ThreadingHTTPServer (one thread per
+        connection, keep-alive). Returns the server; call serve_forever().
+        """
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive between frames
+
+            def _reply(self, status, payload=None, body=None, content_type="application/json"):
+                if body is None:
+                    body = json.dumps(payload, default=json_default).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _reply_stream(self, pieces):
+                """
+                Chunked text/plain response; errors before the first piece
+                still get a proper status, later ones drop the connection.
+                """
+                try:
+                    first = next(pieces, "")
+                except BaseException:
+                    pieces.close()
+                    raise
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    self._write_chunk(first)
+                    for piece in pieces:
+                        self._write_chunk(piece)
+                    self.wfile.write(b"0\r\n\r\n")
+                except Exception as e:
+                    print(f"Warning: report stream aborted: {e}")
+                    self.close_connection = True
+                finally:
+                    pieces.close() # Client gone: release the report lock and stop generating
+
+            def _write_chunk(self, text):
+                data = text.encode("utf-8")
+                if data:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length", 0))
+                return self.rfile.read(length) if length else b""
+
+            def _dispatch(self, method):
+                url = urlparse(self.path)
+                parts = [p for p in url.path.split("/") if p]
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                try:
+                    body = self._body() if method in ("POST", "DELETE") else b""
+                    if method == "GET" and url.path == "/metrics":
+                        return self._reply(200, body=METRICS.render_prometheus().encode("utf-8"),
+                                           content_type="text/plain; version=0.0.4")
+                    if parts[:1] != ["v1"]:
+                        raise ServiceError(404, "not found")
+                    route = parts[1:]
+                    if method == "GET" and route == ["info"]:
+                        return self._reply(200, service.info())
+                    if method == "GET" and route == ["stats"]:
+                        return self._reply(200, service.stats())
+                    if method == "GET" and len(route) == 3 and route[0] == "sessions" and route[2] == "stats":
+                        return self._reply(200, service.stream_stats(route[1], query.get("stream", "default")))
+                    if method == "POST" and route == ["sessions"]:
+                        return self._reply(200, {"session": service.open_session()})
+                    if method == "DELETE" and len(route) == 2 and route[0] == "sessions":
+                        service.close_session(route[1])
+                        return self._reply(200, {"closed": route[1]})
+                    if method == "POST" and len(route) == 3 and route[0] == "sessions" and route[2] == "detect":
+                        frame = self._frame(body)
+                        conf = float(query["conf"]) if "conf" in query else None
+                        return self._reply(200, service.detect(route[1], query.get("stream", "default"), frame,
+                                                               track=query.get("track") == "1", conf=conf))
+                    if method == "POST" and len(route) == 3 and route[0] == "sessions" and route[2] == "reset":
+                        service.reset_stream(route[1], query.get("stream", "default"))
+                        return self._reply(200, {"reset": query.get("stream", "default")})
+                    if method == "POST" and route == ["report"] and query.get("stream") == "1":
+                        return self._reply_stream(service.report_stream(json.loads(body)))
+                    if method == "POST" and route == ["report"]:
+                        return self._reply(200, service.report(json.loads(body)))
+                    raise ServiceError(404, "not found")
+                except ServiceError as e:
+                    self._reply(e.status, {"error": str(e)})
+                except (ValueError, KeyError) as e:
+                    self._reply(400, {"error": f"bad request: {e}"})
+                except Exception as e:
+                    self._reply(500, {"error": str(e)})
+
+            def _frame(self, body):
+                content_type = self.headers.get("Content-Type", "")
+                if content_type == SHM:
+                    return read_shared_frame(json.loads(body))
+                if content_type == JPEG:
+                    frame = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+                    if frame is None:
+                        raise ServiceError(400, "undecodable JPEG")
+                    return frame
+                raise ServiceError(415, f"unsupported frame transport {content_type!r}")
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CityGuard local inference service")
+    parser.add_argument("--host", default="127.0.0.1", help="bind address (keep it local)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch-size", type=int, default=8, help="max frames per batched forward pass")
+    parser.add_argument("--max-wait-ms", type=float, default=10, help="batch window for frames of other clients")
+    parser.add_argument("--session-ttl", type=float, default=300, help="seconds before idle sessions are reset")
+    parser.add_argument("--vision-backend", default=None, choices=["pytorch", "onnx", "openvino"],
+                        help="default: the node profile's backend, else pytorch")
+    parser.add_argument("--report-backend", default="pytorch", choices=["pytorch", "int8", "onnx"])
+    parser.add_argument("--report-threads", type=int, default=None,
+                        help="report model CPU threads (ONNX Runtime session; pytorch / int8 size torch's "
+                             "process-wide pool, shared with the vision engines)")
+    parser.add_argument("--no-report", action="store_true", help="do not host Flan-T5")
+    parser.add_argument("--tile-size", type=int, default=0, help="tiled inference tile size (0: off)")
+    parser.add_argument("--zones", default=None, help="zone layout JSON (keys: camera / stream names sent by clients, or '*')")
+    args = parser.parse_args(argv)
+
+    from vision.detector import IncidentDetector
+
+    if args.report_threads and args.report_backend != "onnx" and not args.no_report:
+        from nlp.backends import set_torch_threads
+        set_torch_threads(args.report_threads) # Process-wide, so before any engine loads
+
+    vision_model = BackgroundModel("vision", lambda: IncidentDetector(
+        fire_cascade=True, backend=args.vision_backend, tiling=args.tile_size > 0,
+        tile_size=args.tile_size or 640, zones=args.zones), imports=("torch", "ultralytics"))
+    report_model = None
+    if not args.no_report:
+        from nlp.report_cache import ReportCache
+        from nlp.report_generator import ReportGenerator
+        report_model = BackgroundModel("report", lambda: ReportGenerator(
+            cache=ReportCache(disk_path="cache/reports.sqlite"), deterministic=True, backend=args.report_backend,
+            num_threads=args.report_threads), imports=("torch", "transformers"))
+
+    service = InferenceService(vision_model, report_model, args.max_batch_size, args.max_wait_ms, args.session_ttl)
+    server = service.serve(args.port, args.host)
+    print(f"CityGuard inference service on http://{args.host}:{args.port} (models loading in background)",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from benchmarks.fakes import FakeYOLO, StubGenerator
+from nlp.report_generator import ReportGenerator
+from service.client import InferenceClient, RemoteDetector, RemoteReporter
+from service.protocol import ServiceError
+from service.server import InferenceService
+from utils.model_loader import BackgroundModel
+from vision.detector import IncidentDetector
+
+# Two cars and a truck, returned for every frame the service decodes
+BOXES = [(100, 100, 200, 180, 2), (400, 200, 520, 280, 2), (700, 150, 820, 240, 7)]
+FIRE_NAMES = {0: "fire", 1: "smoke"}
+
+
+def _frame(seed=0):
+    return np.random.default_rng(seed).integers(0, 255, (360, 960, 3), dtype=np.uint8)
+
+
+class _BrightnessYOLO(FakeYOLO):
+    """
+    One car whose width is the frame's mean brightness, so a reply shows which frame was detected.
+    """
+    def _result(self, image, track):
+        self._pending[id(image)] = [(0, 0, 10 + float(image.mean()), 20, 2)]
+        return super()._result(image, track)
+
+
+@pytest.fixture
+def service():
+    yield from _serve(FakeYOLO(default=BOXES))
+
+
+def _serve(main_model):
+    vision = BackgroundModel("vision", lambda: IncidentDetector.from_models(
+        main_model, fire_model=FakeYOLO(names=FIRE_NAMES)))
+    report = BackgroundModel("report", lambda: ReportGenerator(generator=StubGenerator(), deterministic=True))
+    service = InferenceService(vision, report, max_batch_size=4, max_wait_ms=5)
+    server = service.serve(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield service, f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+@pytest.mark.parametrize("transport", ["jpeg", "shm"])
+def test_detect_round_trip(service, transport):
+    _, url = service
+    with InferenceClient(url, transport=transport) as client:
+        payload = client.detect(_frame(), stream="cam-1")
+        assert client.transport == transport
+        assert payload["shape"] == [360, 960]
+        assert payload["details"]["vehicle_count"] == 3
+        assert payload["incident_type"] == "Normal Traffic"
+        assert payload["boxes"]["cls"] == [2, 2, 7]
+
+        # The dashboard stand-in decodes the same payload into results and the overlay analysis
+        detector = RemoteDetector(client)
+        main_res, fire_res = detector.detect(_frame(1), stream_id="cam-1")
+        assert len(main_res.boxes) == 3 and len(fire_res.boxes) == 0
+        incident_type, details, analysis = detector.analyze_incident(main_res, fire_res, return_analysis=True)
+        assert details["vehicle_count"] == 3
+        np.testing.assert_allclose(analysis["xyxy"], [b[:4] for b in BOXES])
+        assert analysis["names"][7] == "truck"
+
+
+def test_sessions_keep_separate_stream_state(service):
+    svc, url = service
+    with InferenceClient(url, transport="jpeg") as a, InferenceClient(url, transport="jpeg") as b:
+        a.detect(_frame(), stream="cam")
+        b.detect(_frame(), stream="cam")
+        assert a.session != b.session
+        histories = svc.vision_model.get()._stream_histories
+        key_a, key_b = f"{a.session}/cam", f"{b.session}/cam"
+        assert key_a in histories and key_b in histories
+        assert histories[key_a] is not histories[key_b]
+
+        a.reset("cam")
+        assert key_a not in histories
+        assert key_b in histories
+
+
+def test_tracked_sessions_use_their_own_trackers(service):
+    pytest.importorskip("ultralytics")
+    svc, url = service
+    with InferenceClient(url, transport="shm") as a, InferenceClient(url, transport="shm") as b:
+        for seed in range(3):
+            payload_a = a.detect(_frame(seed), stream="cam", track=True)
+        payload_b = b.detect(_frame(), stream="cam", track=True)
+        assert payload_a["boxes"]["ids"] is not None and payload_b["boxes"]["ids"] is not None
+        trackers = svc.vision_model.get()._stream_trackers
+        assert trackers[f"{a.session}/cam"] is not trackers[f"{b.session}/cam"]
+        assert trackers[f"{a.session}/cam"].frame_id == 3
+        assert trackers[f"{b.session}/cam"].frame_id == 1
+
+
+def test_report_streaming(service):
+    _, url = service
+    with InferenceClient(url, transport="jpeg") as client:
+        details = {"vehicle_count": 5, "person_count": 2, "severity": "HIGH", "flags": ["Overlap (0.40)"]}
+        streamed = "".join(RemoteReporter(client).generate_report_stream("Critical Traffic Accident", details, "HIGH"))
+        assert streamed
+        assert streamed == client.report("Critical Traffic Accident", details, "HIGH")
+
+
+def test_unknown_session_is_reopened(service):
+    svc, url = service
+    with InferenceClient(url, transport="jpeg") as client:
+        with pytest.raises(ServiceError) as error:
+            client._request("POST", "/v1/sessions/missing/reset", b"")
+        assert error.value.status == 404
+
+        first = client.session
+        svc.close_session(first) # e.g. reaped after the TTL, or the service restarted
+        payload = client.detect(_frame(), stream="cam")
+        assert payload["details"]["vehicle_count"] == 3
+        assert client.session != first
+
+
+def test_stream_stats_are_per_session(service):
+    pytest.importorskip("ultralytics")
+    svc, url = service
+    svc.vision_model.get().fire_cascade = True
+    with InferenceClient(url, transport="jpeg") as a, InferenceClient(url, transport="jpeg") as b:
+        for seed in range(3):
+            a.detect(_frame(seed), stream="cam", track=True)
+        b.detect(_frame(), stream="cam", track=True)
+        assert RemoteDetector(a).fire_gate_stats("cam")["frames"] == 3
+        assert RemoteDetector(b).fire_gate_stats("cam")["frames"] == 1
+        assert a.stats()["fire_gate"]["frames"] == 4
+
+
+def test_zones_are_keyed_by_camera_name(service):
+    svc, url = service
+    ignore_all = {"size": [960, 360],
+                  "zones": [{"name": "all", "type": "ignore", "polygon": [[0, 0], [960, 0], [960, 360], [0, 360]]}]}
+    svc.vision_model.get().set_zones("cam-ignored", ignore_all) # As loaded from --zones
+    with InferenceClient(url, transport="jpeg") as client:
+        assert client.detect(_frame(), stream="cam-ignored")["details"]["vehicle_count"] == 0
+        assert client.detect(_frame(), stream="cam-1")["details"]["vehicle_count"] == 3
+
+
+def test_shared_client_never_mixes_up_concurrent_frames():
+    server = _serve(_BrightnessYOLO())
+    _, url = next(server)
+    try:
+        with InferenceClient(url, transport="shm") as client:
+            def detect(value):
+                # Every caller on the same stream, like dashboard sessions analysing still images
+                payload = client.detect(np.full((120, 160, 3), value, dtype=np.uint8))
+                return payload["boxes"]["xyxy"][0][2] - 10
+
+            values = [v % 200 for v in range(80)]
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                assert list(pool.map(detect, values)) == values
+    finally:
+        server.close()
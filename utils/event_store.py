@@ -0,0 +1,329 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from vision.array_result import ArrayBoxes, ArrayResult
+from utils.metrics import METRICS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS frames (
+    id INTEGER PRIMARY KEY,
+    camera TEXT NOT NULL,
+    ts REAL NOT NULL,
+    stream_time REAL,
+    frame INTEGER,
+    height INTEGER,
+    width INTEGER,
+    n_boxes INTEGER NOT NULL,
+    xyxy BLOB, cls BLOB, conf BLOB, ids BLOB,
+    fire_xyxy BLOB, fire_cls BLOB, fire_conf BLOB,
+    incident_type TEXT,
+    risk TEXT,
+    severity TEXT,
+    vehicle_count INTEGER,
+    person_count INTEGER,
+    flags TEXT,
+    settings_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS frames_camera_ts ON frames (camera, ts);
+CREATE INDEX IF NOT EXISTS frames_incident_ts ON frames (incident_type, ts);
+CREATE INDEX IF NOT EXISTS frames_ts ON frames (ts);
+CREATE TABLE IF NOT EXISTS cameras (
+    camera TEXT PRIMARY KEY,
+    names TEXT,
+    fire_names TEXT,
+    zones TEXT,
+    tile_size INTEGER
+);
+CREATE TABLE IF NOT EXISTS settings (
+    id INTEGER PRIMARY KEY,
+    camera TEXT NOT NULL,
+    names TEXT,
+    fire_names TEXT,
+    zones TEXT,
+    tile_size INTEGER
+);
+"""
+# Columns added after the first release (migrated on open)
+_MIGRATIONS = {"cameras": (("zones", "TEXT"), ("tile_size", "INTEGER")),
+               "frames": (("settings_id", "INTEGER"),)}
+
+_COLUMNS = ("camera", "ts", "stream_time", "frame", "height", "width", "n_boxes", "xyxy", "cls", "conf", "ids",
+            "fire_xyxy", "fire_cls", "fire_conf", "incident_type", "risk", "severity",
+            "vehicle_count", "person_count", "flags", "settings_id")
+_SUMMARY_COLUMNS = ("id", "camera", "ts", "stream_time", "frame", "n_boxes", "incident_type", "risk",
+                    "severity", "vehicle_count", "person_count", "flags")
+
+
+def _pack(values, dtype):
+    return None if values is None else np.ascontiguousarray(values, dtype=dtype).tobytes()
+
+
+def _unpack(blob, dtype, shape=(-1,)):
+    if blob is None:
+        return None
+    return np.frombuffer(blob, dtype=dtype).reshape(shape)
+
+
+class EventStore:
+    def __init__(self, path="cache/events.sqlite", flush_rows=256, flush_interval=1.0):
+        """
+        Append-only store of per-frame detections and incident outcomes.
+
+        One row per analyzed frame and camera; boxes, classes, confidences and
+        track IDs are kept column-wise as packed NumPy blobs (float32 / int32),
+        so a frame costs ~28 bytes per box. Indexes on (camera, ts),
+        (incident_type, ts) and ts serve the time-range and incident queries.
+
+        Rows are buffered and written in one transaction every flush_rows
+        rows or flush_interval seconds (WAL mode, so readers never block the
+        writer).
+
+        Per camera, the class labels, zone layout and tile size of the
+        recording are kept for replay: each change adds a settings version
+        and every frame points at the version it was recorded with.
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for table, migrations in _MIGRATIONS.items():
+            columns = set(row[1] for row in self._db.execute(f"PRAGMA table_info({table})"))
+            for column, kind in migrations:
+                if columns and column not in columns:
+                    self._db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        # camera -> ((zones JSON, tile_size), settings_id) of its latest settings version
+        self._known_cameras = {row[0]: ((row[1], row[2]), row[3]) for row in self._db.execute(
+            "SELECT camera, zones, tile_size, id FROM settings WHERE id IN (SELECT MAX(id) FROM settings GROUP BY camera)")}
+
+    # --- Write path --------------------------------------------------------------
+    def append(self, camera, main_result, fire_result=None, incident_type=None, risk=None, details=None,
+               ts=None, stream_time=None, frame_idx=None, zones=None, tile_size=None):
+        """
+        Records one analyzed frame: the raw detections (Ultralytics Results or
+        ArrayResult) and, when given, the incident outcome.
+        zones: the camera's zone config (see IncidentDetector.zone_config), if any.
+        tile_size: tile size the detections were made with (None: untiled).
+        """
+        camera = str(camera)
+        boxes = ArrayBoxes.from_boxes(main_result.boxes)
+        fire = ArrayBoxes.from_boxes(fire_result.boxes) if fire_result is not None else None
+        shape = getattr(main_result, "orig_shape", None)
+        height, width = (int(shape[0]), int(shape[1])) if shape is not None else (None, None)
+        details = details or {}
+        settings = (json.dumps(zones, sort_keys=True) if zones else None, int(tile_size) if tile_size else None)
+        row = [
+            camera, time.time() if ts is None else float(ts),
+            None if stream_time is None else float(stream_time), None if frame_idx is None else int(frame_idx),
+            height, width, len(boxes),
+            _pack(boxes.xyxy, np.float32), _pack(boxes.cls, np.int32), _pack(boxes.conf, np.float32),
+            _pack(boxes.id, np.int32),
+            _pack(fire.xyxy, np.float32) if fire is not None else None,
+            _pack(fire.cls, np.int32) if fire is not None else None,
+            _pack(fire.conf, np.float32) if fire is not None else None,
+            incident_type, risk, details.get("severity"),
+            None if details.get("vehicle_count") is None else int(details["vehicle_count"]),
+            None if details.get("person_count") is None else int(details["person_count"]),
+            json.dumps(details.get("flags", [])),
+        ]
+        with self._lock:
+            known_settings, settings_id = self._known_cameras.get(camera, (None, None))
+            if settings_id is None or known_settings != settings:
+                # Class labels, zone layout and tile size are stored once per change for replay;
+                # cameras keeps the latest ones
+                values = (camera, json.dumps(dict(main_result.names)),
+                          json.dumps(dict(fire_result.names)) if fire_result is not None else None) + settings
+                settings_id = self._db.execute("INSERT INTO settings (camera, names, fire_names, zones, tile_size) "
+                                               "VALUES (?, ?, ?, ?, ?)", values).lastrowid
+                self._db.execute("INSERT OR REPLACE INTO cameras (camera, names, fire_names, zones, tile_size) "
+                                 "VALUES (?, ?, ?, ?, ?)", values)
+                self._known_cameras[camera] = (settings, settings_id)
+            row.append(settings_id)
+            self._buffer.append(row)
+            if len(self._buffer) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._buffer:
+            with METRICS.time("event_store_flush"):
+                with self._db:
+                    self._db.executemany(
+                        f"INSERT INTO frames ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                        self._buffer)
+            self._buffer.clear()
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # --- Queries -----------------------------------------------------------------
+    def _where(self, camera=None, start=None, end=None, incident_types=None):
+        clauses, params = [], []
+        if camera is not None:
+            clauses.append("camera = ?")
+            params.append(str(camera))
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(end)
+        if incident_types:
+            clauses.append(f"incident_type IN ({', '.join('?' * len(incident_types))})")
+            params += list(incident_types)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, camera=None, start=None, end=None, incident_types=None, limit=None):
+        """
+        Incident outcomes (no detections) in [start, end) wall-clock seconds,
+        optionally filtered by camera and incident types, oldest first.
+        """
+        self.flush()
+        where, params = self._where(camera, start, end, incident_types)
+        sql = f"SELECT {', '.join(_SUMMARY_COLUMNS)} FROM frames{where} ORDER BY ts"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        records = [dict(zip(_SUMMARY_COLUMNS, row)) for row in rows]
+        for record in records:
+            record["flags"] = json.loads(record["flags"]) if record["flags"] else []
+        return records
+
+    def incident_counts(self, camera=None, start=None, end=None):
+        """
+        {incident_type: frames} over a time range.
+        """
+        self.flush()
+        where, params = self._where(camera, start, end)
+        with self._lock:
+            rows = self._db.execute(f"SELECT incident_type, COUNT(*) FROM frames{where} GROUP BY incident_type",
+                                    params).fetchall()
+        return dict(rows)
+
+    def cameras(self):
+        self.flush()
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT DISTINCT camera FROM frames ORDER BY camera")]
+
+    def camera_settings(self):
+        """
+        {camera: {"zones": config or None, "tile_size": int or None}}, the latest recorded.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT camera, zones, tile_size FROM cameras").fetchall()
+        return {camera: {"zones": json.loads(zones) if zones else None, "tile_size": tile_size}
+                for camera, zones, tile_size in rows}
+
+    def settings_history(self, camera=None):
+        """
+        {settings_id: {"camera", "zones", "tile_size"}}, every settings version
+        recorded, oldest first. Frames carry the settings_id they were recorded
+        with (None for frames written before versions were kept).
+        """
+        where, params = ("", []) if camera is None else (" WHERE camera = ?", [str(camera)])
+        with self._lock:
+            rows = self._db.execute(f"SELECT id, camera, zones, tile_size FROM settings{where} ORDER BY id",
+                                    params).fetchall()
+        return {settings_id: {"camera": cam, "zones": json.loads(zones) if zones else None, "tile_size": tile_size}
+                for settings_id, cam, zones, tile_size in rows}
+
+    def iter_frames(self, camera=None, start=None, end=None, batch=512):
+        """
+        Yields (record, main_result, fire_result) with detections rebuilt as
+        ArrayResults, in time order. Rows are fetched in batches.
+        """
+        self.flush()
+        def decode(row):
+            return json.loads(row[1]) if row[1] else None, json.loads(row[2]) if row[2] else None
+
+        with self._lock:
+            names = {row[0]: decode(row) for row in self._db.execute("SELECT camera, names, fire_names FROM cameras")}
+            version_names = {row[0]: decode(row)
+                             for row in self._db.execute("SELECT id, names, fire_names FROM settings")}
+        where, params = self._where(camera, start, end)
+        columns = ("id",) + _COLUMNS
+        cursor = self._db.cursor()
+        with self._lock:
+            cursor.execute(f"SELECT {', '.join(columns)} FROM frames{where} ORDER BY ts, id", params)
+            rows = cursor.fetchmany(batch)
+        while rows:
+            for row in rows:
+                r = dict(zip(columns, row))
+                main_names, fire_names = (version_names.get(r["settings_id"]) or names.get(r["camera"])
+                                          or (None, None))
+                main_names = {int(k): v for k, v in main_names.items()} if main_names else None
+                main = ArrayResult(ArrayBoxes(_unpack(r["xyxy"], np.float32, (-1, 4)), _unpack(r["cls"], np.int32),
+                                              _unpack(r["conf"], np.float32), _unpack(r["ids"], np.int32)),
+                                   main_names, (r["height"], r["width"]))
+                fire = None
+                if r["fire_conf"] is not None:
+                    fire_names = {int(k): v for k, v in fire_names.items()} if fire_names else None
+                    fire = ArrayResult(ArrayBoxes(_unpack(r["fire_xyxy"], np.float32, (-1, 4)),
+                                                  _unpack(r["fire_cls"], np.int32), _unpack(r["fire_conf"], np.float32)),
+                                       fire_names, (r["height"], r["width"]))
+                record = {k: r[k] for k in _SUMMARY_COLUMNS}
+                record["flags"] = json.loads(record["flags"]) if record["flags"] else []
+                record["settings_id"] = r["settings_id"]
+                yield record, main, fire
+            with self._lock:
+                rows = cursor.fetchmany(batch)
+
+    # --- Replay ------------------------------------------------------------------
+    def replay(self, detector=None, camera=None, start=None, end=None, thresholds=None):
+        """
+        Re-runs analyze_incident and calculate_risk over stored detections, no
+        model involved. Each camera keeps its own track history, fed in time
+        order exactly as live, and each frame is analyzed with the zone layout
+        that was active when it was recorded.
+        Yields (record, incident_type, risk, details) where record holds the
+        stored (original) outcome.
+
+        detector: an IncidentDetector to reuse; by default an analysis-only one
+                  is built with the given threshold overrides.
+        """
+        from utils.risk_assessment import calculate_risk
+        from vision.detector import IncidentDetector
+
+        if detector is None:
+            detector = IncidentDetector.from_models(thresholds=thresholds)
+        # Recorded layouts rebuilt on the replay thresholds; frames without one use the detector's.
+        # Frames from before settings versions fall back to their camera's latest layout.
+        zone_maps = {settings_id: detector.zone_map(settings["zones"])
+                     for settings_id, settings in self.settings_history(camera).items() if settings["zones"]}
+        latest_maps = {cam: detector.zone_map(settings["zones"])
+                       for cam, settings in self.camera_settings().items() if settings["zones"]}
+        for record, main, fire in self.iter_frames(camera, start, end):
+            if record["settings_id"] is None:
+                zones = latest_maps.get(record["camera"])
+            else:
+                zones = zone_maps.get(record["settings_id"])
+            incident_type, details = detector.analyze_incident(main, fire, stream_id=record["camera"], zones=zones)
+            yield record, incident_type, calculate_risk(incident_type, 0.8, details), details
@@ -42,5 +42,41 @@ def create_samples():
     
     print("Sample images created in sample_data/images/")
 
+def make_scene(num_vehicles=10, num_persons=2, size=(720, 1280), seed=0, overturned=0):
+    """
+    Synthetic CCTV-like frame with known ground truth, for offline benchmarks.
+
+    Returns (image_bgr, boxes) where boxes is a list of
+    (x1, y1, x2, y2, cls_id) in COCO ids (0 person, 2 car, 5 bus, 7 truck).
+    The first `overturned` vehicles get a flipped (extreme aspect ratio) box.
+    """
+    rng = np.random.default_rng(seed)
+    h, w = size
+    img = np.full((h, w, 3), 200, dtype=np.uint8)
+    road_x1, road_x2 = int(w * 0.15), int(w * 0.85)
+    cv2.rectangle(img, (road_x1, 0), (road_x2, h), (50, 50, 50), -1)
+
+    boxes = []
+    for i in range(num_vehicles):
+        cls_id = int(rng.choice([2, 2, 2, 5, 7]))
+        bw = int(rng.integers(60, 140 if cls_id == 2 else 220))
+        bh = int(bw * rng.uniform(0.7, 1.3))
+        if i < overturned:
+            bh = int(bw / 4) # Squashed profile of a vehicle on its side
+        x1 = int(rng.integers(road_x1, max(road_x1 + 1, road_x2 - bw)))
+        y1 = int(rng.integers(0, max(1, h - bh)))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(img, (x1, y1), (x1 + bw, y1 + bh), color, -1)
+        boxes.append((x1, y1, x1 + bw, y1 + bh, cls_id))
+
+    for _ in range(num_persons):
+        pw, ph = int(rng.integers(15, 30)), int(rng.integers(40, 80))
+        x1 = int(rng.integers(0, w - pw))
+        y1 = int(rng.integers(0, h - ph))
+        cv2.rectangle(img, (x1, y1), (x1 + pw, y1 + ph), (40, 40, 160), -1)
+        boxes.append((x1, y1, x1 + pw, y1 + ph, 0))
+
+    return img, boxes
+
 if __name__ == "__main__":
     create_samples()
@@ -0,0 +1,210 @@
+import functools
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Latency buckets in seconds (Prometheus histogram upper bounds)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _NullTimer:
+    # Shared no-op context manager returned while instrumentation is disabled
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class RollingHistogram:
+    def __init__(self, window=512):
+        """
+        Cumulative Prometheus-style buckets plus a rolling window of the most
+        recent observations for live percentiles.
+        """
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1) # last slot: +Inf
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        i = 0
+        while i < len(LATENCY_BUCKETS) and seconds > LATENCY_BUCKETS[i]:
+            i += 1
+        self.bucket_counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def percentiles(self):
+        if not self.recent:
+            return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+        p50, p95, p99 = np.percentile(np.fromiter(self.recent, dtype=np.float64), [50, 95, 99]) * 1000
+        return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+class Metrics:
+    def __init__(self, enabled=False, window=512):
+        """
+        Per-stage latency histograms, counters (frames dropped, models skipped)
+        and gauges (queue depths).
+
+        While disabled every hook is a single attribute check: time() hands
+        back a shared no-op context manager and observe/inc/set_gauge return
+        immediately.
+        """
+        self.enabled = enabled
+        self.window = window
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    # --- Hooks -----------------------------------------------------------------
+    def time(self, stage):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def timed(self, stage):
+        """
+        Decorator timing every call of a function as `stage`.
+        """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(stage, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._histograms.get(stage)
+            if hist is None:
+                hist = self._histograms[stage] = RollingHistogram(self.window)
+            hist.observe(seconds)
+
+    def inc(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        if not self.enabled:
+            return
+        self._gauges[name] = value
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    # --- Export ----------------------------------------------------------------
+    def snapshot(self):
+        """
+        Compact view for dashboards: per-stage count / mean / percentiles,
+        counters and gauges.
+        """
+        with self._lock:
+            stages = {}
+            for stage, hist in self._histograms.items():
+                stages[stage] = {"count": hist.count,
+                                 "mean_ms": 1000 * hist.total / hist.count if hist.count else 0.0,
+                                 **hist.percentiles()}
+            return {"stages": stages, "counters": dict(self._counters), "gauges": dict(self._gauges)}
+
+    def render_prometheus(self, prefix="cityguard"):
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        lines = [f"# HELP {prefix}_stage_latency_seconds Latency of pipeline stages.",
+                 f"# TYPE {prefix}_stage_latency_seconds histogram"]
+        with self._lock:
+            for stage, hist in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), hist.bucket_counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_latency_seconds_sum{{stage="{stage}"}} {hist.total:.6f}')
+                lines.append(f'{prefix}_stage_latency_seconds_count{{stage="{stage}"}} {hist.count}')
+            for name, value in sorted(self._counters.items()):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+            for name, value in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {prefix}_{name} gauge")
+                lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """
+        Atomically writes the exposition to a file (node_exporter textfile collector).
+        """
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp, path)
+
+    def serve(self, port=9108, host="127.0.0.1"):
+        """
+        Serves /metrics on a local background HTTP server (idempotent).
+        """
+        if self._server is not None:
+            return self._server
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="cityguard-metrics", daemon=True).start()
+        return self._server
+
+
+# Process-wide registry; enable with CITYGUARD_METRICS=1 or METRICS.enabled = True
+METRICS = Metrics(enabled=os.environ.get("CITYGUARD_METRICS") == "1")
@@ -0,0 +1,75 @@
+import importlib
+import sys
+import threading
+import time
+
+
+class BackgroundModel:
+    def __init__(self, name, factory, imports=()):
+        """
+        Builds a model on a background thread as soon as it is created.
+
+        name: label used in the startup report.
+        factory: zero-argument callable returning the model object.
+        imports: heavy modules imported (and timed) before calling factory.
+
+        ready is a threading.Event set once the model is available (or failed);
+        get() blocks until then and re-raises any loading error.
+        """
+        self.name = name
+        self.ready = threading.Event()
+        self.timings = {} # step -> seconds
+        self._factory = factory
+        self._imports = imports
+        self._model = None
+        self._error = None
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._load, name=f"load-{name}", daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        try:
+            for module in self._imports:
+                if module in sys.modules:
+                    continue # Already imported (possibly by another loader)
+                start = time.perf_counter()
+                importlib.import_module(module)
+                self.timings[f"import {module}"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            self._model = self._factory()
+            self.timings[f"load {self.name}"] = time.perf_counter() - start
+            # Finer breakdown reported by the model itself (e.g. main/fire engines)
+            for step, seconds in getattr(self._model, "load_timings", {}).items():
+                self.timings[f"{self.name}.{step}"] = seconds
+        except Exception as e:
+            self._error = e
+        finally:
+            self.timings[f"{self.name} ready after"] = time.perf_counter() - self._started
+            self.ready.set()
+
+    def is_ready(self):
+        return self.ready.is_set() and self._error is None
+
+    def get(self, timeout=None):
+        """
+        Waits for the model and returns it. Raises TimeoutError if not ready in time.
+        """
+        if not self.ready.wait(timeout):
+            raise TimeoutError(f"{self.name} is still loading")
+        if self._error is not None:
+            raise self._error
+        return self._model
+
+
+def startup_report(*models):
+    """
+    Formats the import / load timings of several BackgroundModels, one step per line.
+    """
+    lines = []
+    for model in models:
+        status = "ready" if model.is_ready() else ("failed" if model.ready.is_set() else "loading")
+        lines.append(f"{model.name}: {status}")
+        for step, seconds in model.timings.items():
+            lines.append(f"  {step}: {seconds:.2f}s")
+    return "\n".join(lines)
@@ -0,0 +1,101 @@
+import numpy as np
+
+from utils.event_store import EventStore
+from utils.risk_assessment import calculate_risk
+from vision.array_result import ArrayBoxes, ArrayResult, COCO_NAMES
+from vision.detector import IncidentDetector
+
+SHAPE = (720, 1280)
+IGNORE_ALL = {"size": [1280, 720],
+              "zones": [{"name": "all", "type": "ignore", "polygon": [[0, 0], [1280, 0], [1280, 720], [0, 720]]}]}
+
+
+def _frame(i):
+    """
+    Two parked cars and a slowly moving one, with stable track IDs.
+    """
+    xyxy = [[100, 100, 200, 180], [400, 300, 520, 380], [600 + 4 * i, 200, 700 + 4 * i, 280]]
+    return ArrayResult(ArrayBoxes(xyxy, [2, 2, 7], [0.9, 0.8, 0.7], [1, 2, 3]), COCO_NAMES, SHAPE)
+
+
+def _record(path, n=40, zones=None, tile_size=None):
+    detector = IncidentDetector.from_models()
+    if zones is not None:
+        detector.set_zones("cam-1", zones)
+    outcomes = []
+    with EventStore(path, flush_rows=16) as store:
+        for i in range(n):
+            main = _frame(i)
+            fire = ArrayResult(ArrayBoxes(np.zeros((0, 4)), [], []), {0: "fire", 1: "smoke"}, SHAPE)
+            incident_type, details = detector.analyze_incident(main, fire, stream_id="cam-1")
+            risk = calculate_risk(incident_type, 0.8, details)
+            store.append("cam-1", main, fire, incident_type, risk, details, ts=1000.0 + i, frame_idx=i,
+                         zones=detector.zone_config("cam-1"), tile_size=tile_size)
+            outcomes.append((incident_type, risk, details["vehicle_count"]))
+    return outcomes
+
+
+def test_round_trip_keeps_detections_and_outcomes(tmp_path):
+    path = str(tmp_path / "events.sqlite")
+    outcomes = _record(path)
+    with EventStore(path) as store:
+        assert store.cameras() == ["cam-1"]
+        records = store.query(camera="cam-1", start=1010.0, end=1020.0)
+        assert [r["frame"] for r in records] == list(range(10, 20))
+        assert sum(store.incident_counts().values()) == len(outcomes)
+
+        record, main, fire = next(store.iter_frames(start=1005.0))
+        expected = _frame(5).boxes
+        np.testing.assert_allclose(main.boxes.xyxy, expected.xyxy)
+        assert main.boxes.cls.tolist() == expected.cls.tolist()
+        assert main.boxes.id.tolist() == [1, 2, 3]
+        assert main.names == COCO_NAMES and tuple(main.orig_shape) == SHAPE
+        assert len(fire) == 0 and fire.names == {0: "fire", 1: "smoke"}
+        assert (record["incident_type"], record["risk"]) == outcomes[5][:2]
+
+
+def test_replay_reproduces_the_recorded_outcomes(tmp_path):
+    path = str(tmp_path / "events.sqlite")
+    outcomes = _record(path)
+    with EventStore(path) as store:
+        replayed = [(incident_type, risk, details["vehicle_count"])
+                    for _, incident_type, risk, details in store.replay()]
+    assert replayed == outcomes
+
+
+def test_replay_reapplies_the_recorded_zone_layout(tmp_path):
+    path = str(tmp_path / "events.sqlite")
+    outcomes = _record(path, zones=IGNORE_ALL, tile_size=640)
+    with EventStore(path) as store:
+        assert store.camera_settings() == {"cam-1": {"zones": IGNORE_ALL, "tile_size": 640}}
+        # The replay detector has no zones of its own
+        replayed = [(incident_type, risk, details["vehicle_count"])
+                    for _, incident_type, risk, details in store.replay()]
+    assert replayed == outcomes
+    assert all(count == 0 for _, _, count in replayed)
+
+
+def test_replay_applies_the_layout_active_when_each_frame_was_recorded(tmp_path):
+    path = str(tmp_path / "events.sqlite")
+    detector = IncidentDetector.from_models()
+    fire = ArrayResult(ArrayBoxes(np.zeros((0, 4)), [], []), {0: "fire", 1: "smoke"}, SHAPE)
+    with EventStore(path) as store:
+        for i in range(30):
+            if i == 10:
+                detector.set_zones("cam-1", IGNORE_ALL) # Layout edited mid-recording...
+            elif i == 20:
+                detector.set_zones("cam-1", None) # ...and removed again
+            main = _frame(i)
+            incident_type, details = detector.analyze_incident(main, fire, stream_id="cam-1")
+            store.append("cam-1", main, fire, incident_type, calculate_risk(incident_type, 0.8, details), details,
+                         ts=1000.0 + i, frame_idx=i, zones=detector.zone_config("cam-1"))
+
+    with EventStore(path) as store:
+        assert [s["zones"] for s in store.settings_history().values()] == [None, IGNORE_ALL, None]
+        assert store.camera_settings() == {"cam-1": {"zones": None, "tile_size": None}}
+        counts = [details["vehicle_count"] for _, _, _, details in store.replay()]
+        assert counts == [3] * 10 + [0] * 10 + [3] * 10
+
+        # Reopening continues the latest version instead of adding one
+        store.append("cam-1", _frame(30), fire, ts=1030.0, frame_idx=30)
+        assert len(store.settings_history("cam-1")) == 3
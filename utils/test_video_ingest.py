@@ -0,0 +1,45 @@
+import cv2
+import numpy as np
+import pytest
+
+from utils.video_ingest import VideoFrameReader
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    """
+    4 s of 30 FPS video; every frame's brightness encodes its index.
+    """
+    path = str(tmp_path_factory.mktemp("video") / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("OpenCV build cannot write MJPG video")
+    for i in range(120):
+        writer.write(np.full((48, 64, 3), 2 * i, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+@pytest.mark.parametrize("prefetch", [0, 4])
+def test_every_frame_without_target_fps(clip, prefetch):
+    with VideoFrameReader(clip, prefetch=prefetch) as reader:
+        frames = list(reader)
+    assert [idx for idx, _, _ in frames] == list(range(120))
+    assert reader.stats["decoded"] == 120
+
+
+def test_samples_on_the_time_grid_and_only_decodes_sampled_frames(clip):
+    with VideoFrameReader(clip, target_fps=5, prefetch=0) as reader:
+        frames = list(reader)
+    assert [idx for idx, _, _ in frames] == list(range(0, 120, 6))
+    assert [round(ts, 3) for _, ts, _ in frames] == [round(i / 5, 3) for i in range(20)]
+    assert reader.stats["decoded"] == 20
+    assert abs(int(frames[3][2].mean()) - 2 * 18) <= 3 # The decoded image is frame 18's
+
+
+def test_long_gaps_are_seeked(clip):
+    with VideoFrameReader(clip, target_fps=0.5, prefetch=0, seek_threshold=10) as reader:
+        frames = list(reader)
+    assert [idx for idx, _, _ in frames] == [0, 60]
+    assert reader.stats["seeks"] >= 1
+    assert reader.stats["grabbed"] < 120
@@ -0,0 +1,147 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import cv2
+
+
+@contextmanager
+def spooled_upload(uploaded_file, suffix="", chunk_size=1 << 20):
+    """
+    Streams an uploaded file-like object to a temporary spill file in chunks
+    (OpenCV needs a path) and removes the file when the block exits.
+    """
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="cityguard_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if hasattr(uploaded_file, "seek"):
+                uploaded_file.seek(0)
+            shutil.copyfileobj(uploaded_file, f, chunk_size)
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class VideoFrameReader:
+    def __init__(self, source, target_fps=None, prefetch=8, seek_threshold=90, live=False):
+        """
+        Skip-aware, time-based frame sampler.
+
+        target_fps: analysis rate independent of the source FPS (None = every frame).
+        Frames that are not sampled are only grab()bed, never decoded to BGR.
+        Gaps longer than seek_threshold frames are jumped with a (keyframe
+        aware) seek instead of grabbing every frame; disabled for live sources.
+        prefetch: decoded frames buffered by a background thread so decoding
+        overlaps inference (0 = decode synchronously in the caller's thread).
+
+        Iterating yields (frame_idx, timestamp_s, frame_bgr).
+        """
+        self.source = source
+        self.target_fps = target_fps
+        self.prefetch = prefetch
+        self.seek_threshold = seek_threshold
+        self.live = live
+
+        self.cap = cv2.VideoCapture(source)
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.source_fps = fps if fps and fps > 0 else 25.0
+        self.stats = {"grabbed": 0, "decoded": 0, "seeks": 0}
+
+        self._queue = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def queue_depth(self):
+        """
+        Decoded frames waiting in the prefetch buffer.
+        """
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _frames(self):
+        cap = self.cap
+        interval = 1.0 / self.target_fps if self.target_fps else 0.0
+        can_seek = not self.live and cap.get(cv2.CAP_PROP_FRAME_COUNT) > 0
+        frame_idx = -1
+        next_due = 0.0
+
+        while not self._stop.is_set():
+            # Jump over long gaps instead of grabbing frame by frame
+            gap = int(next_due * self.source_fps) - (frame_idx + 1)
+            if can_seek and gap > self.seek_threshold:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx + 1 + gap)
+                frame_idx += gap
+                self.stats["seeks"] += 1
+
+            if not cap.grab():
+                break
+            frame_idx += 1
+            self.stats["grabbed"] += 1
+            ts = frame_idx / self.source_fps
+            if self.live or not can_seek:
+                pos = cap.get(cv2.CAP_PROP_POS_MSEC)
+                if pos > 0:
+                    ts = pos / 1000.0
+
+            if ts + 1e-6 < next_due:
+                continue
+            ret, frame = cap.retrieve()
+            if not ret:
+                continue
+            self.stats["decoded"] += 1
+            # Stay on the time grid; after a stall resync instead of bursting
+            next_due += interval
+            if next_due <= ts:
+                next_due = ts + interval
+            yield frame_idx, ts, frame
+
+    def _prefetch_loop(self):
+        try:
+            for item in self._frames():
+                while not self._stop.is_set():
+                    try:
+                        self._queue.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+        finally:
+            self._queue.put(None)
+
+    def __iter__(self):
+        if not self.prefetch:
+            yield from self._frames()
+            return
+        self._queue = queue.Queue(maxsize=self.prefetch)
+        self._thread = threading.Thread(target=self._prefetch_loop, name="cityguard-decode", daemon=True)
+        self._thread.start()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            yield item
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            # Unblock a producer waiting on a full queue
+            while self._thread.is_alive():
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+                self._thread.join(timeout=0.05)
+        self.cap.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
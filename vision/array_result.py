@@ -0,0 +1,60 @@
+import numpy as np
+
+# COCO labels of the classes the incident logic cares about
+COCO_NAMES = {0: "person", 1: "bicycle", 2: "car", 3: "motorcycle", 4: "airplane", 5: "bus", 6: "train", 7: "truck"}
+
+
+class ArrayBoxes:
+    def __init__(self, xyxy, cls, conf, ids=None):
+        """
+        NumPy stand-in for Ultralytics Boxes, exposing the attributes
+        analyze_incident reads: xyxy (N, 4), cls (N,), conf (N,), id (N,) or None.
+        """
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.cls = np.asarray(cls, dtype=np.float32).reshape(-1)
+        self.conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+        self.id = None if ids is None else np.asarray(ids, dtype=np.float32).reshape(-1)
+
+    def __len__(self):
+        return len(self.xyxy)
+
+    @property
+    def data(self):
+        """
+        Ultralytics layout: [x1, y1, x2, y2, (id), conf, cls].
+        """
+        cols = [self.xyxy]
+        if self.id is not None:
+            cols.append(self.id[:, None])
+        cols += [self.conf[:, None], self.cls[:, None]]
+        return np.concatenate(cols, axis=1)
+
+    @classmethod
+    def from_boxes(cls, boxes):
+        """
+        Copies an Ultralytics Boxes (torch tensors) into host arrays.
+        """
+        def host(t):
+            return t.cpu().numpy() if hasattr(t, "cpu") else np.asarray(t)
+        return cls(host(boxes.xyxy), host(boxes.cls), host(boxes.conf),
+                   host(boxes.id) if boxes.id is not None else None)
+
+
+class ArrayResult:
+    def __init__(self, boxes, names=None, orig_shape=None):
+        """
+        Minimal Results replacement built from NumPy detections. Behaves like
+        an Ultralytics Results object for analyze_incident (len, truthiness,
+        boxes, names), so stored, remote or synthetic detections can be
+        analysed without loading a model.
+        """
+        self.boxes = boxes
+        self.names = names or COCO_NAMES
+        self.orig_shape = orig_shape
+
+    def __len__(self):
+        return len(self.boxes)
+
+    @classmethod
+    def from_result(cls, result):
+        return cls(ArrayBoxes.from_boxes(result.boxes), dict(result.names), tuple(result.orig_shape))
@@ -0,0 +1,272 @@
+"""
+Latency-budget autotuner for the vision engine (local CPU).
+
+Sweeps model variant x input size x confidence on a clip set, measures
+per-frame latency against detection / incident agreement and writes the
+node profile IncidentDetector loads at startup.
+
+    python -m vision.autotune --budget-ms 150 --data clips/ --out models/profile.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from vision.array_result import ArrayBoxes, ArrayResult
+
+DEFAULT_PROFILE = "models/profile.json"
+DETECTOR_DEFAULTS = {"model_path": "yolov8x.pt", "imgsz": 640, "conf": 0.15, "fire_conf": 0.3, "backend": "pytorch"}
+MODEL_VARIANTS = {"n": "yolov8n.pt", "s": "yolov8s.pt", "m": "yolov8m.pt", "x": "yolov8x.pt"}
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v")
+SCORED_CLASSES = (0, 2, 3, 5, 7) # person + vehicles: what analyze_incident looks at
+
+
+def load_profile(path=DEFAULT_PROFILE):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def resolve_settings(profile_path=DEFAULT_PROFILE, **explicit):
+    """
+    Detector settings (model_path, imgsz, conf, fire_conf, backend): explicit
+    arguments first, then the node profile, then DETECTOR_DEFAULTS.
+    Returns (settings, profile or None).
+
+    The profile's latencies were measured on its backend; overriding the
+    backend explicitly keeps the tuned model / size but warns, since the
+    latency budget may no longer hold.
+    """
+    settings = dict(DETECTOR_DEFAULTS)
+    profile = load_profile(profile_path)
+    if profile:
+        settings.update({key: profile[key] for key in DETECTOR_DEFAULTS if key in profile})
+    backend = explicit.get("backend")
+    if profile and backend is not None and "backend" in profile and backend != profile["backend"]:
+        print(f"Warning: node profile was tuned on the {profile['backend']} backend; running {backend}, "
+              f"so {settings['model_path']} @ {settings['imgsz']} may exceed its {profile.get('budget_ms')} ms budget.",
+              file=sys.stderr)
+    settings.update({key: value for key, value in explicit.items() if value is not None})
+    return settings, profile
+
+
+# --- Data --------------------------------------------------------------------
+
+def load_frames(paths, frames_per_clip=20, clip_fps=1.0):
+    """
+    Frames of images, videos and directories of both, as (key, BGR frame).
+    Video keys are "<file>@<frame index>", image keys the file name.
+    """
+    from utils.video_ingest import VideoFrameReader
+
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += [os.path.join(path, name) for name in sorted(os.listdir(path))]
+        else:
+            files.append(path)
+
+    frames = []
+    for path in files:
+        name = os.path.basename(path)
+        if path.lower().endswith(IMAGE_EXTENSIONS):
+            image = cv2.imread(path)
+            if image is not None:
+                frames.append((name, image))
+        elif path.lower().endswith(VIDEO_EXTENSIONS):
+            with VideoFrameReader(path, target_fps=clip_fps, prefetch=0) as reader:
+                for n, (frame_idx, _, frame) in enumerate(reader):
+                    if n >= frames_per_clip:
+                        break
+                    frames.append((f"{name}@{frame_idx}", frame))
+    return frames
+
+
+def load_labels(path, frames):
+    """
+    Ground truth {key: {"boxes": [[x1, y1, x2, y2, cls], ...], "incident_type": ...}}
+    turned into reference ArrayResults (and incident types, where given).
+    """
+    with open(path, encoding="utf-8") as f:
+        labels = json.load(f)
+    results, incidents = [], []
+    for key, frame in frames:
+        entry = labels.get(key, {})
+        boxes = np.asarray(entry.get("boxes", []), dtype=np.float64).reshape(-1, 5)
+        results.append(ArrayResult(ArrayBoxes(boxes[:, :4], boxes[:, 4], np.ones(len(boxes))),
+                                   orig_shape=frame.shape[:2]))
+        incidents.append(entry.get("incident_type"))
+    return results, incidents
+
+
+# --- Scoring -----------------------------------------------------------------
+
+def filter_result(result, conf, classes=SCORED_CLASSES):
+    boxes = result.boxes
+    keep = (boxes.conf >= conf) & np.isin(boxes.cls.astype(np.int64), classes)
+    return ArrayResult(ArrayBoxes(boxes.xyxy[keep], boxes.cls[keep], boxes.conf[keep]),
+                       result.names, result.orig_shape)
+
+
+def match_counts(pred, ref, iou_threshold=0.5):
+    """
+    Greedy same-class matching by confidence; returns (tp, fp, fn).
+    """
+    from vision.detector import IncidentDetector
+
+    n_pred, n_ref = len(pred.boxes), len(ref.boxes)
+    if n_pred == 0 or n_ref == 0:
+        return 0, n_pred, n_ref
+    iou = IncidentDetector.compute_iou_matrix(pred.boxes.xyxy, ref.boxes.xyxy)
+    iou[pred.boxes.cls[:, None] != ref.boxes.cls[None, :]] = 0
+    matched = np.zeros(n_ref, dtype=bool)
+    tp = 0
+    for i in np.argsort(-pred.boxes.conf, kind="stable"):
+        candidates = np.where(matched, 0, iou[i])
+        j = int(np.argmax(candidates))
+        if candidates[j] >= iou_threshold:
+            matched[j] = True
+            tp += 1
+    return tp, n_pred - tp, n_ref - tp
+
+
+def incident_types(results):
+    """
+    Frame-by-frame incident decisions (no tracking state carried over).
+    """
+    from vision.detector import IncidentDetector
+
+    detector = IncidentDetector.from_models()
+    return [detector.analyze_incident(result)[0] for result in results]
+
+
+def score(preds, refs, ref_incidents):
+    tp = fp = fn = 0
+    for pred, ref in zip(preds, refs):
+        t, p, n = match_counts(pred, ref)
+        tp, fp, fn = tp + t, fp + p, fn + n
+    f1 = 2 * tp / (2 * tp + fp + fn) if tp + fp + fn else 1.0
+    agreement = float(np.mean([a == b for a, b in zip(incident_types(preds), ref_incidents)])) if preds else 0.0
+    return f1, agreement
+
+
+# --- Sweep -------------------------------------------------------------------
+
+def measure_variant(model, frames, imgsz, conf, warmup=2):
+    """
+    Single-frame latency (as in the live loop) and raw detections at the
+    lowest swept confidence; higher thresholds are applied afterwards, since
+    confidence does not change the forward pass.
+    """
+    for _, frame in frames[:warmup]:
+        model(frame, imgsz=imgsz, conf=conf, verbose=False)
+    latencies, results = [], []
+    for _, frame in frames:
+        start = time.perf_counter()
+        result = model(frame, imgsz=imgsz, conf=conf, verbose=False)[0]
+        latencies.append(time.perf_counter() - start)
+        results.append(ArrayResult.from_result(result))
+    return np.asarray(latencies) * 1000, results
+
+
+def sweep(frames, variants, sizes, confs, backend="pytorch", labels=None, reference_conf=0.15):
+    from vision.backends import load_yolo
+
+    raw = {}
+    for variant in variants:
+        print(f"Measuring yolov8{variant} ({backend})...", file=sys.stderr)
+        model = load_yolo(MODEL_VARIANTS[variant], backend=backend, imgsz=max(sizes), warmup=False)
+        for imgsz in sizes:
+            raw[(variant, imgsz)] = measure_variant(model, frames, imgsz, min(confs + [reference_conf]))
+
+    if labels:
+        refs, ref_incidents = load_labels(labels, frames)
+        refs = [filter_result(ref, 0.0) for ref in refs]
+        computed = incident_types(refs)
+        ref_incidents = [given or derived for given, derived in zip(ref_incidents, computed)]
+        reference = f"labels:{labels}"
+    else:
+        # Pseudo ground truth: the production configuration (largest model / input) of today
+        ref_key = max(raw, key=lambda k: ("nsmx".index(k[0]), k[1]))
+        refs = [filter_result(r, reference_conf) for r in raw[ref_key][1]]
+        ref_incidents = incident_types(refs)
+        reference = f"{MODEL_VARIANTS[ref_key[0]]}@{ref_key[1]} conf {reference_conf}"
+
+    rows = []
+    for (variant, imgsz), (latency_ms, results) in raw.items():
+        for conf in confs:
+            f1, agreement = score([filter_result(r, conf) for r in results], refs, ref_incidents)
+            rows.append({
+                "model_path": MODEL_VARIANTS[variant], "imgsz": imgsz, "conf": conf,
+                "p50_ms": float(np.percentile(latency_ms, 50)), "p95_ms": float(np.percentile(latency_ms, 95)),
+                "detection_f1": f1, "incident_agreement": agreement, "accuracy": (f1 + agreement) / 2,
+            })
+    return rows, reference
+
+
+def pick(rows, budget_ms):
+    """
+    Most accurate configuration whose p95 latency fits the budget (faster
+    wins ties); the fastest one when nothing fits.
+    """
+    within = [row for row in rows if row["p95_ms"] <= budget_ms]
+    if not within:
+        print(f"Warning: no configuration meets {budget_ms} ms; picking the fastest.", file=sys.stderr)
+        return min(rows, key=lambda row: row["p95_ms"])
+    return max(within, key=lambda row: (row["accuracy"], -row["p95_ms"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pick the most accurate vision configuration within a latency budget")
+    parser.add_argument("--budget-ms", type=float, required=True, help="p95 per-frame latency budget of the main model")
+    parser.add_argument("--data", nargs="+", default=["sample_data/images"],
+                        help="images, clips or directories (defaults to the synthetic samples)")
+    parser.add_argument("--labels", default=None, help="optional ground truth JSON (otherwise: agreement with yolov8x@640)")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_VARIANTS), choices=list(MODEL_VARIANTS))
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[320, 480, 640])
+    parser.add_argument("--conf", nargs="+", type=float, default=[0.1, 0.15, 0.25, 0.35])
+    parser.add_argument("--reference-conf", type=float, default=DETECTOR_DEFAULTS["conf"])
+    parser.add_argument("--backend", default="pytorch", choices=["pytorch", "onnx", "openvino"])
+    parser.add_argument("--frames-per-clip", type=int, default=20)
+    parser.add_argument("--out", default=DEFAULT_PROFILE, help="node profile to write")
+    args = parser.parse_args(argv)
+
+    frames = load_frames(args.data, args.frames_per_clip)
+    if not frames:
+        print("No frames found in --data.", file=sys.stderr)
+        return 1
+    print(f"Sweeping on {len(frames)} frames...", file=sys.stderr)
+    rows, reference = sweep(frames, args.models, args.imgsz, args.conf, args.backend, args.labels, args.reference_conf)
+
+    print(f"{'model':12s} {'imgsz':>5s} {'conf':>5s} {'p50 ms':>8s} {'p95 ms':>8s} {'det F1':>7s} {'incident':>8s}")
+    for row in sorted(rows, key=lambda r: r["p95_ms"]):
+        print(f"{row['model_path']:12s} {row['imgsz']:5d} {row['conf']:5.2f} {row['p50_ms']:8.1f} {row['p95_ms']:8.1f} "
+              f"{row['detection_f1']:7.3f} {row['incident_agreement']:8.1%}")
+
+    best = pick(rows, args.budget_ms)
+    profile = {
+        "model_path": best["model_path"], "imgsz": best["imgsz"], "conf": best["conf"],
+        "fire_conf": DETECTOR_DEFAULTS["fire_conf"], "backend": args.backend, "budget_ms": args.budget_ms,
+        "p50_ms": best["p50_ms"], "p95_ms": best["p95_ms"], "detection_f1": best["detection_f1"],
+        "incident_agreement": best["incident_agreement"], "reference": reference, "frames": len(frames),
+        "node": {"machine": platform.machine(), "processor": platform.processor(), "cpus": os.cpu_count()},
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sweep": rows,
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    print(f"Selected {best['model_path']} @ {best['imgsz']} conf {best['conf']} "
+          f"(p95 {best['p95_ms']:.1f} ms, F1 {best['detection_f1']:.3f}); profile saved to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
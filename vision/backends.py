@@ -0,0 +1,45 @@
+import os
+import numpy as np
+
+YOLO_BACKENDS = ("pytorch", "onnx", "openvino")
+
+
+def exported_path(model_path, backend):
+    """
+    Location Ultralytics exports to, next to the .pt weights.
+    """
+    stem = os.path.splitext(model_path)[0]
+    if backend == "onnx":
+        return stem + ".onnx"
+    if backend == "openvino":
+        return stem + "_openvino_model"
+    return model_path
+
+
+def load_yolo(model_path, backend="pytorch", imgsz=640, warmup=True):
+    """
+    Loads a YOLO engine on the requested CPU backend.
+
+    "onnx" and "openvino" export the .pt weights once (dynamic batch/shape,
+    so detect_batch keeps working) and reuse the cached artifact on later
+    starts. The returned object is a regular Ultralytics YOLO model: results,
+    tracking and class names behave exactly as with the PyTorch weights.
+    """
+    from ultralytics import YOLO
+
+    if backend not in YOLO_BACKENDS:
+        raise ValueError(f"Unknown vision backend '{backend}', choose from {YOLO_BACKENDS}")
+
+    if backend == "pytorch":
+        model = YOLO(model_path)
+    else:
+        artifact = exported_path(model_path, backend)
+        if not os.path.exists(artifact):
+            print(f"Exporting {model_path} to {backend} (one-time)...")
+            artifact = YOLO(model_path).export(format=backend, imgsz=imgsz, dynamic=True)
+        model = YOLO(artifact, task="detect")
+
+    if warmup:
+        # First inference pays for graph compilation / allocator setup; do it at load time
+        model(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), imgsz=imgsz, verbose=False)
+    return model
@@ -1,83 +1,530 @@
 import cv2
 import os
-from ultralytics import YOLO
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 import numpy as np
+from vision.backends import load_yolo
+from vision.track_history import TrackHistory
+from vision.fire_gate import FireCascade
+from vision.tiling import TiledInference
+from vision.zones import ZoneMap, load_zone_config
+from vision.autotune import DEFAULT_PROFILE, DETECTOR_DEFAULTS, resolve_settings
+from vision.array_result import ArrayBoxes, ArrayResult, COCO_NAMES
+from utils.metrics import METRICS
+
+# Decision thresholds of analyze_incident (override per detector to tune, e.g. in replay)
+ANALYSIS_THRESHOLDS = {
+    "fire_conf": 0.35, # Specialized fire/smoke confidence
+    "stagnant_min_positions": 10, # Track positions needed before judging movement
+    "stagnant_max_motion_px": 10, # Net motion below which a vehicle counts as stagnant
+    "gridlock_vehicles": 8,
+    "congestion_vehicles": 4,
+    "overturned_ar_high": 3.5, # Sideways flipped (squashed profile)
+    "overturned_ar_low": 0.65, # Vertical flipped
+    "crash_iou": 0.12, # Vehicle overlap counted as a crash indicator
+    "crash_min_persons": 2, # People around vehicles treated as an accident scene
+}
 
 class IncidentDetector:
-    def __init__(self, model_path='yolov8x.pt', fire_model_path='models/yolo/fire_smoke.pt'):
+    def __init__(self, model_path=None, fire_model_path='models/yolo/fire_smoke.pt',
+                 history_max_age=150, history_max_tracks=4096,
+                 fire_cascade=False, fire_cascade_period=30, fire_cascade_hold=45,
+                 backend=None, tiling=False, tile_size=640, tile_overlap=0.2,
+                 tile_regions=None, tile_workers=4, thresholds=None, zones=None,
+                 imgsz=None, conf=None, fire_conf=None, profile=DEFAULT_PROFILE):
         """
         Initialize Multi-Model AI Engine.
         1. YOLOv8x: SOTA General Detection & Tracking.
         2. Specialized Fire/Smoke Model: Dedicated neural engine for fire safety.
+
+        history_max_age / history_max_tracks bound the per-stream track history:
+        tracks unseen for that many frames are evicted and memory is capped.
+
+        fire_cascade gates the fire/smoke model on video streams behind a cheap
+        colour/flicker pre-filter; it still runs every fire_cascade_period frames
+        and stays on for fire_cascade_hold frames after a positive result.
+
+        backend selects the CPU runtime of both engines: 'pytorch', 'onnx' or
+        'openvino' (None: the node profile's backend, else 'pytorch').
+        Exported models are cached next to the .pt weights and warmed up at
+        load time.
+
+        tiling runs the main model on overlapping tile_size crops of the native
+        frame (optionally only inside tile_regions) plus a downscaled overview,
+        batched in one forward pass and merged with cross-tile NMS, so distant
+        vehicles and people in 4K / panoramic feeds are not lost to
+        downscaling. Tracking then runs on the merged detections.
+
+        thresholds overrides entries of ANALYSIS_THRESHOLDS.
+
+        zones: per-camera zone configuration (dict or JSON path, see
+        vision/zones.py): lane / shoulder / crosswalk / ignore polygons with
+        their own thresholds.
+
+        model_path / imgsz / conf / fire_conf / backend left as None come from the node
+        profile written by `python -m vision.autotune` (if present), else
+        from DETECTOR_DEFAULTS (yolov8x.pt, 640, 0.15, 0.3, pytorch).
         """
-        print(f"Loading SOTA Hybrid Intelligence Engine...")
-        self.main_model = YOLO(model_path)
-        
-        # Load specialized fire model if exists, fallback to main
-        if os.path.exists(fire_model_path):
-            print(f"Loading Specialized Fire/Smoke Neural Engine...")
-            self.fire_model = YOLO(fire_model_path)
-        else:
-            print(f"Warning: Specialized Fire model not found. Falling back to heuristics.")
-            self.fire_model = None
+        settings, self.profile = resolve_settings(profile, model_path=model_path, imgsz=imgsz,
+                                                  conf=conf, fire_conf=fire_conf, backend=backend)
+        model_path, backend = settings["model_path"], settings["backend"]
+        print(f"Loading SOTA Hybrid Intelligence Engine ({model_path} @ {settings['imgsz']}, {backend} backend)...")
+        self.backend = backend
+        self.load_timings = {} # model -> seconds
+
+        def timed_load(name, path, imgsz=640):
+            start = time.perf_counter()
+            model = load_yolo(path, backend=backend, imgsz=imgsz)
+            self.load_timings[name] = time.perf_counter() - start
+            return model
+
+        # Both engines load concurrently (weights I/O and warm-up overlap)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            main_future = pool.submit(timed_load, "main_model", model_path, settings["imgsz"])
+            # Load specialized fire model if exists, fallback to main
+            fire_future = None
+            if os.path.exists(fire_model_path):
+                print(f"Loading Specialized Fire/Smoke Neural Engine...")
+                fire_future = pool.submit(timed_load, "fire_model", fire_model_path)
+            else:
+                print(f"Warning: Specialized Fire model not found. Falling back to heuristics.")
+            self.main_model = main_future.result()
+            self.fire_model = fire_future.result() if fire_future else None
 
+        self._init_state(history_max_age, history_max_tracks,
+                         fire_cascade, fire_cascade_period, fire_cascade_hold,
+                         tiling, tile_size, tile_overlap, tile_regions, tile_workers, thresholds, zones,
+                         settings["imgsz"], settings["conf"], settings["fire_conf"])
+
+    def _init_state(self, history_max_age=150, history_max_tracks=4096,
+                    fire_cascade=False, fire_cascade_period=30, fire_cascade_hold=45,
+                    tiling=False, tile_size=640, tile_overlap=0.2, tile_regions=None, tile_workers=4,
+                    thresholds=None, zones=None, imgsz=DETECTOR_DEFAULTS["imgsz"],
+                    conf=DETECTOR_DEFAULTS["conf"], fire_conf=DETECTOR_DEFAULTS["fire_conf"]):
+        self.imgsz = imgsz # Main model input size
+        self.conf = conf # Main model confidence threshold (per-call override in detect)
+        self.fire_conf = fire_conf
+        self.thresholds = dict(ANALYSIS_THRESHOLDS, **(thresholds or {}))
         self.vehicle_classes = [2, 3, 5, 7] # car, motorcycle, bus, truck
         self.person_class = 0
-        self.history = {} # Stores positions for speed/stagnancy analysis
+        self.history_max_age = history_max_age
+        self.history_max_tracks = history_max_tracks
+        self.history = self._new_history() # Stores positions for speed/stagnancy analysis
+        self.tracker_config = "bytetrack.yaml"
+        self._stream_trackers = {} # stream_id -> BYTETracker (batched multi-camera path)
+        self._stream_histories = {} # stream_id -> track history (batched multi-camera path)
+
+        self.fire_cascade = fire_cascade
+        self.fire_cascade_period = fire_cascade_period
+        self.fire_cascade_hold = fire_cascade_hold
+        self._fire_gates = {} # stream_id -> FireCascade
+        self._retired_fire_stats = FireCascade.empty_stats() # Counters of gates dropped by reset_stream
+        self._zone_maps = {} # stream_id -> ZoneMap ("*": any camera without its own)
+        if zones:
+            self.load_zones(zones)
+
+        self.tiler = None
+        self._tilers = {} # tile_size -> TiledInference for per-call tiling (see detect)
+        if tiling:
+            self.set_tiling(tile_size, tile_overlap, tile_regions, tile_workers)
 
-    def detect(self, image, track=False):
+    @classmethod
+    def from_models(cls, main_model=None, fire_model=None, names=None, **options):
+        """
+        Builds a detector around already constructed engines instead of loading
+        weights (stub models in benchmarks, analysis-only replay).
+        Without a main_model only analyze_incident is usable; names then
+        provides the class labels (COCO by default).
+        """
+        self = cls.__new__(cls)
+        self.backend = "external"
+        self.load_timings = {}
+        self.profile = None
+        self.main_model = main_model if main_model is not None else SimpleNamespace(names=names or COCO_NAMES)
+        self.fire_model = fire_model
+        self._init_state(**options)
+        return self
+
+    def detect(self, image, track=False, conf=None, tile_size=None, stream_id=None):
         """
         Dual-Inference Pipeline.
+        conf overrides the main model's confidence threshold for this call.
+        tile_size overrides the configured tiling for this call (0: untiled),
+        so callers sharing one detector need not change its state.
+        stream_id tracks the frame on that stream's own ByteTrack and fire
+        cascade (as detect_batch does) instead of the state shared by every
+        caller; pass the same id to analyze_incident.
         """
+        conf = self.conf if conf is None else conf
+        tiler = self.tiler if tile_size is None else self.tiler_for(tile_size)
         # 1. Main Detection (Vehicles, People, Tracking)
-        if track:
-            main_results = self.main_model.track(image, conf=0.15, persist=True, tracker="bytetrack.yaml")
-        else:
-            main_results = self.main_model(image, conf=0.15)
+        with METRICS.time("main_model"):
+            if tiler is not None:
+                # Tiles of one frame cannot share Ultralytics' persist tracker; the
+                # merged result is tracked like a single stream instead
+                main_results = self._detect_tiled([image], [stream_id] if track else None, conf, tiler)
+            elif track and stream_id is not None:
+                main_results = self.main_model(image, conf=conf, imgsz=self.imgsz)
+                with METRICS.time("tracking"):
+                    self._update_stream_tracker(stream_id, main_results[0], image)
+            elif track:
+                main_results = self.main_model.track(image, conf=conf, imgsz=self.imgsz, persist=True,
+                                                     tracker="bytetrack.yaml")
+            else:
+                main_results = self.main_model(image, conf=conf, imgsz=self.imgsz)
         
         # 2. Specialized Fire/Smoke Inference
+        # Still images are always checked; video streams may go through the cascade.
         fire_results = None
-        if self.fire_model:
-            fire_results = self.fire_model(image, conf=0.3) # More confident for specialized task
+        gate = self._fire_gate_for(stream_id) if track else None
+        if self.fire_model and (gate is None or gate.should_run(image)):
+            with METRICS.time("fire_model"):
+                fire_results = self.fire_model(image, conf=self.fire_conf) # More confident for specialized task
+            if gate is not None:
+                gate.report(self._fire_positive(fire_results[0], stream_id))
+        elif self.fire_model:
+            METRICS.inc("fire_model_skipped")
         
         return main_results[0], (fire_results[0] if fire_results else None)
 
-    def analyze_incident(self, main_result, fire_result=None):
+    def detect_batch(self, frames, stream_ids=None, track=False, conf=None):
+        """
+        Cross-camera Dual-Inference Pipeline.
+        Runs one main_model and one fire_model forward pass for a whole batch of
+        frames coming from different streams. Each stream keeps its own ByteTrack
+        state, so tracking stays consistent per camera.
+
+        Returns a list of (main_result, fire_result) pairs in input order.
+        """
+        if not frames:
+            return []
+        conf = self.conf if conf is None else conf
+        if stream_ids is None:
+            stream_ids = list(range(len(frames)))
+
+        # 1. Main Detection (one batched forward pass; in tiling mode over the
+        #    tiles of all frames)
+        with METRICS.time("main_model_batch"):
+            if self.tiler is not None:
+                main_results = self._detect_tiled(list(frames), conf=conf)
+            else:
+                main_results = self.main_model(list(frames), conf=conf, imgsz=self.imgsz)
+        METRICS.set_gauge("last_batch_size", len(frames))
+
+        # Per-stream tracking on top of the batched detections
+        if track:
+            with METRICS.time("tracking"):
+                for stream_id, result, frame in zip(stream_ids, main_results, frames):
+                    self._update_stream_tracker(stream_id, result, frame)
+
+        # 2. Specialized Fire/Smoke Inference (one batched forward pass over the
+        #    frames the per-stream cascade lets through)
+        # Still images (track=False) always get the fire model, as in detect();
+        # only video streams go through the cascade.
+        fire_results = [None] * len(frames)
+        if self.fire_model:
+            gates = [self._fire_gate_for(stream_id) if track else None for stream_id in stream_ids]
+            selected = [i for i, gate in enumerate(gates) if gate is None or gate.should_run(frames[i])]
+            METRICS.inc("fire_model_skipped", len(frames) - len(selected))
+            if selected:
+                with METRICS.time("fire_model_batch"):
+                    batch_results = self.fire_model([frames[i] for i in selected], conf=self.fire_conf)
+                for i, result in zip(selected, batch_results):
+                    fire_results[i] = result
+                    gate = gates[i]
+                    if gate is not None:
+                        gate.report(self._fire_positive(result, stream_ids[i]))
+
+        return list(zip(main_results, fire_results))
+
+    def set_tiling(self, tile_size=640, overlap=0.2, regions=None, workers=4):
+        """
+        Enables tiled inference for the main model (tile_size=None disables it).
+        """
+        if self.tiler is not None:
+            self.tiler.close()
+        self.tiler = TiledInference(tile_size, overlap, regions, workers=workers) if tile_size else None
+
+    def tiler_for(self, tile_size):
+        """
+        Tiled inference engine for a per-call tile size (None for 0): the
+        configured one if it matches, else a cached one with default settings.
+        """
+        if not tile_size:
+            return None
+        if self.tiler is not None and self.tiler.tile_size == tile_size:
+            return self.tiler
+        tiler = self._tilers.get(tile_size)
+        if tiler is None:
+            tiler = self._tilers[tile_size] = TiledInference(tile_size)
+        return tiler
+
+    def _detect_tiled(self, frames, stream_ids=None, conf=None, tiler=None):
+        """
+        Tiled main-model detection for a list of frames; returns one merged
+        result per frame, tracked per stream when stream_ids is given.
+        """
+        tiler = tiler or self.tiler
+        merged = tiler.run(self.main_model, frames, conf=self.conf if conf is None else conf)
+        results = [self._merged_result(frame, *parts) for frame, parts in zip(frames, merged)]
+        if stream_ids is not None:
+            with METRICS.time("tracking"):
+                for stream_id, result, frame in zip(stream_ids, results, frames):
+                    self._update_stream_tracker(stream_id, result, frame)
+        return results
+
+    def _merged_result(self, frame, xyxy, cls, conf, template):
+        """
+        Wraps merged detections in the result type the model produces, so
+        plotting and tracking keep working (Ultralytics Results, or ArrayResult
+        for array-based engines).
+        """
+        if template is None or isinstance(template, ArrayResult):
+            return ArrayResult(ArrayBoxes(xyxy, cls, conf), self.main_model.names, frame.shape[:2])
+        import torch
+        from ultralytics.engine.results import Results
+
+        data = np.concatenate([xyxy, conf[:, None], cls[:, None]], axis=1).astype(np.float32)
+        return Results(frame, path=template.path, names=template.names, boxes=torch.from_numpy(data))
+
+    def _get_stream_tracker(self, stream_id):
+        """
+        Lazily creates an independent ByteTrack instance for a stream.
+        """
+        tracker = self._stream_trackers.get(stream_id)
+        if tracker is None:
+            from ultralytics.trackers.byte_tracker import BYTETracker
+            from ultralytics.utils import IterableSimpleNamespace
+            from ultralytics.utils.checks import check_yaml
+            try:
+                from ultralytics.utils import YAML
+                cfg = YAML.load(check_yaml(self.tracker_config))
+            except ImportError: # Older ultralytics releases
+                from ultralytics.utils import yaml_load
+                cfg = yaml_load(check_yaml(self.tracker_config))
+            tracker = BYTETracker(args=IterableSimpleNamespace(**cfg))
+            self._stream_trackers[stream_id] = tracker
+        return tracker
+
+    def _update_stream_tracker(self, stream_id, result, frame):
+        """
+        Mirrors Ultralytics' track-mode postprocessing for a single stream:
+        updates the stream's tracker and writes track IDs back into the result
+        (an Ultralytics Results, or an ArrayResult from tiled array engines).
+        """
+        tracker = self._get_stream_tracker(stream_id)
+        if isinstance(result, ArrayResult):
+            from ultralytics.engine.results import Boxes
+
+            # ByteTrack reads xywh / conf / cls off an Ultralytics Boxes, which wraps NumPy as well
+            tracks = tracker.update(Boxes(result.boxes.data, result.orig_shape), frame)
+            if len(tracks):
+                result.boxes = ArrayBoxes(tracks[:, :4], tracks[:, 6], tracks[:, 5], tracks[:, 4])
+            return result
+        import torch
+
+        det = result.boxes.cpu().numpy()
+        tracks = tracker.update(det, frame)
+        if len(tracks) == 0:
+            return result
+        # tracks: [x1, y1, x2, y2, track_id, conf, cls, det_idx]
+        result.update(boxes=torch.as_tensor(tracks[:, :-1], device=result.boxes.data.device))
+        return result
+
+    def reset_stream(self, stream_id):
+        """
+        Drops tracker and history state of a stream (e.g. camera disconnected).
+        Its fire cascade counters stay in fire_gate_stats.
+        """
+        self._stream_trackers.pop(stream_id, None)
+        self._stream_histories.pop(stream_id, None)
+        gate = self._fire_gates.pop(stream_id, None)
+        if gate is not None:
+            for key, value in gate.stats.items():
+                self._retired_fire_stats[key] += value
+
+    def _fire_gate_for(self, stream_id):
+        """
+        Returns the fire cascade of a stream, or None when the cascade is disabled.
+        """
+        if not self.fire_cascade:
+            return None
+        gate = self._fire_gates.get(stream_id)
+        if gate is None:
+            gate = FireCascade(period=self.fire_cascade_period, hold=self.fire_cascade_hold)
+            self._fire_gates[stream_id] = gate
+        return gate
+
+    def _fire_positive(self, fire_result, stream_id=None):
+        """
+        Whether a fire model result would flag fire in analyze_incident, on the
+        stream's zone config thresholds when it has one; only those keep the
+        cascade's hold window open (low-confidence noise does not).
+        """
+        if fire_result is None or len(fire_result.boxes) == 0:
+            return False
+        zone_map = self.zones_for(stream_id)
+        t = zone_map.thresholds if zone_map is not None else self.thresholds
+        return bool((self._to_numpy(fire_result.boxes.conf) > t["fire_conf"]).any())
+
+    def fire_gate_stats(self, stream_id=None):
+        """
+        Aggregated cascade counters over all streams (fire model run vs skipped),
+        including streams already reset; with stream_id, that live stream's only.
+        """
+        if stream_id is not None:
+            gate = self._fire_gates.get(stream_id)
+            totals = dict(gate.stats) if gate is not None else FireCascade.empty_stats()
+        else:
+            totals = dict(self._retired_fire_stats)
+            for gate in self._fire_gates.values():
+                for key, value in gate.stats.items():
+                    totals[key] += value
+        totals["skip_rate"] = totals["skipped"] / totals["frames"] if totals["frames"] else 0.0
+        return totals
+
+    def set_zones(self, stream_id, config):
+        """
+        Installs (or with config=None removes) the zone layout of a camera.
+        stream_id "*" applies to every camera without its own layout,
+        including the single-stream path.
+        """
+        if config is None:
+            self._zone_maps.pop(stream_id, None)
+        else:
+            self._zone_maps[stream_id] = self.zone_map(config)
+
+    def zone_map(self, config):
+        """
+        Builds a ZoneMap on this detector's thresholds, e.g. to pass to analyze_incident(zones=...).
+        """
+        return ZoneMap.from_config(config, self.thresholds)
+
+    def load_zones(self, zones):
+        """
+        Replaces all zone layouts.
+        zones: {camera_id: config} or a path to such a JSON file.
+        """
+        self._zone_maps = {}
+        if isinstance(zones, str):
+            zones = load_zone_config(zones)
+        for stream_id, config in zones.items():
+            self.set_zones(stream_id, config)
+
+    def zone_config(self, stream_id=None):
+        """
+        Zone config applied to a camera (its own or "*"), or None.
+        """
+        zone_map = self.zones_for(stream_id)
+        return zone_map.config if zone_map is not None else None
+
+    def zones_for(self, stream_id):
+        """
+        ZoneMap applied to a camera (its own or "*"), or None; pass it to
+        analyze_incident(zones=...) when the state key is not the camera name.
+        """
+        if not self._zone_maps:
+            return None
+        zone_map = self._zone_maps.get(stream_id)
+        return zone_map if zone_map is not None else self._zone_maps.get("*")
+
+    def _new_history(self):
+        return TrackHistory(length=15, max_age=self.history_max_age, max_tracks=self.history_max_tracks)
+
+    def _history_for(self, stream_id):
+        if stream_id is None:
+            return self.history
+        history = self._stream_histories.get(stream_id)
+        if history is None:
+            history = self._stream_histories[stream_id] = self._new_history()
+        return history
+
+    @staticmethod
+    def _to_numpy(values):
+        """
+        Single bulk device->host transfer (torch tensor or array-like).
+        """
+        if hasattr(values, "cpu"):
+            values = values.cpu()
+        if hasattr(values, "numpy"):
+            return values.numpy()
+        return np.asarray(values)
+
+    def _boxes_to_arrays(self, boxes):
+        """
+        Converts a Boxes object into flat NumPy arrays: xyxy (float64), cls, conf, ids.
+        ids is None when the result carries no tracking information.
+        """
+        n = len(boxes)
+        if n == 0:
+            return np.zeros((0, 4)), np.zeros(0, dtype=np.int64), np.zeros(0), None
+        xyxy = self._to_numpy(boxes.xyxy).astype(np.float64).reshape(n, 4)
+        cls = self._to_numpy(boxes.cls).astype(np.int64).reshape(n)
+        conf = self._to_numpy(boxes.conf).astype(np.float64).reshape(n)
+        ids = self._to_numpy(boxes.id).astype(np.int64).reshape(n) if boxes.id is not None else None
+        return xyxy, cls, conf, ids
+
+    @METRICS.timed("analyze_incident")
+    def analyze_incident(self, main_result, fire_result=None, stream_id=None, zones=None, return_analysis=False):
         """
         Hyper-sensitive Hybrid Intelligence Engine.
         Combined Neural Detection + Geometric Reasoning.
+
+        All geometry is evaluated in array form on one bulk transfer of the
+        detections (xyxy/cls/conf/id), so cost stays flat for dense scenes.
+
+        stream_id selects the per-camera track history used by the batched
+        multi-stream path; the default keeps the single-stream behaviour.
+        It also selects the camera's zone map (see set_zones), if any;
+        zones (a ZoneMap, see zone_map) overrides it for this call.
+
+        return_analysis adds a third value, the per-box view of the decision
+        (boxes, track IDs, zones, stagnant / crash / overturned masks) that
+        OverlayRenderer draws. It belongs to this call only, so sessions
+        sharing one detector never draw each other's boxes.
         """
-        boxes = main_result.boxes
-        vehicles = []
-        persons = []
-        
-        # Track IDs
-        track_ids = boxes.id.int().cpu().tolist() if boxes.id is not None else [None] * len(boxes)
-        
-        for i, box in enumerate(boxes):
-            cls_id = int(box.cls[0])
-            xyxy = box.xyxy[0].tolist()
-            conf = float(box.conf[0])
-            tid = track_ids[i]
-            
-            # Center calculation
-            cx, cy = (xyxy[0] + xyxy[2]) / 2, (xyxy[1] + xyxy[3]) / 2
-            
-            if tid is not None:
-                if tid not in self.history:
-                    self.history[tid] = []
-                self.history[tid].append((cx, cy))
-                if len(self.history[tid]) > 15: self.history[tid].pop(0)
-
-            if cls_id in self.vehicle_classes:
-                vehicles.append({'box': xyxy, 'conf': conf, 'id': tid, 'cls': cls_id, 'center': (cx, cy)})
-            elif cls_id == self.person_class:
-                persons.append(xyxy)
-        
+        t = self.thresholds
+        history_store = self._history_for(stream_id)
+        xyxy, cls, conf, ids = self._boxes_to_arrays(main_result.boxes)
+
+        # Zone assignment: one label-mask lookup per box. Detections in ignore
+        # zones are dropped before any history or IoU work.
+        zone_map = zones if zones is not None else self.zones_for(stream_id)
+        labels = None
+        if zone_map is not None:
+            t = zone_map.thresholds
+            labels = zone_map.lookup(xyxy, getattr(main_result, "orig_shape", None))
+            keep = ~zone_map.ignored[labels]
+            if not keep.all():
+                xyxy, cls, conf, labels = xyxy[keep], cls[keep], conf[keep], labels[keep]
+                ids = ids[keep] if ids is not None else None
+
+        # Center calculation (all boxes at once)
+        centers = np.stack([(xyxy[:, 0] + xyxy[:, 2]) / 2, (xyxy[:, 1] + xyxy[:, 3]) / 2], axis=1)
+
+        history_store.update(ids, centers)
+
+        vehicle_mask = np.isin(cls, self.vehicle_classes)
+        person_mask = cls == self.person_class
+        person_count = int(np.count_nonzero(person_mask))
+        v_boxes = xyxy[vehicle_mask]
+        v_cls = cls[vehicle_mask]
+        v_ids = ids[vehicle_mask] if ids is not None else None
+        vehicle_count = len(v_boxes)
+
+        # Per-box thresholds: camera scalars, or the zone tables when zones are configured
+        v_labels = labels[vehicle_mask] if labels is not None else None
+        def zone_threshold(key):
+            return t[key] if v_labels is None else zone_map.tables[key][v_labels]
+        # Persons in zones where pedestrians are expected (crosswalks) do not hint at an accident
+        scene_persons = person_count if labels is None else int(np.count_nonzero(
+            person_mask & zone_map.count_persons[labels]))
+
         incident_type = "Normal Traffic"
         details = {
-            "vehicle_count": len(vehicles), 
-            "person_count": len(persons),
+            "vehicle_count": vehicle_count, 
+            "person_count": person_count,
             "severity": "LOW",
             "flags": []
         }
@@ -86,61 +533,89 @@ class IncidentDetector:
         if fire_result and len(fire_result.boxes) > 0:
             # Check fire model classes (typically 0: fire, 1: smoke)
             fire_conf = float(fire_result.boxes.conf[0])
-            if fire_conf > 0.35:
+            if fire_conf > t["fire_conf"]:
                 incident_type = "Critical: Active Fire/Smoke Detected"
                 details["severity"] = "HIGH"
                 details["flags"].append(f"Specialized Model: High Confidence Fire ({fire_conf:.2f})")
 
         # 2. CONGESTION & MOVEMENT
-        stagnant_count = 0
-        for v in vehicles:
-            tid = v['id']
-            if tid and len(self.history.get(tid, [])) >= 10:
-                history = self.history[tid]
-                dist = np.sqrt((history[-1][0]-history[0][0])**2 + (history[-1][1]-history[0][1])**2)
-                if dist < 10: stagnant_count += 1
+        stagnant = np.zeros(vehicle_count, dtype=bool)
+        if v_ids is not None:
+            # Vectorized query over live tracks: >= 10 positions and < 10px net motion.
+            # Track ID 0 is treated as "no track", as in the original truthiness check.
+            valid, dist = history_store.displacement(v_ids, min_length=t["stagnant_min_positions"])
+            stagnant = valid & (v_ids != 0) & (dist < zone_threshold("stagnant_max_motion_px"))
+            if v_labels is not None:
+                stagnant &= zone_map.count_stagnant[v_labels] # e.g. cars parked on the shoulder
+        stagnant_count = int(np.count_nonzero(stagnant))
         
-        if stagnant_count >= 8:
+        if stagnant_count >= t["gridlock_vehicles"]:
             incident_type = "Severe Traffic Gridlock"
             details["severity"] = "HIGH"
             details["flags"].append(f"Gridlock Alert: {stagnant_count} vehicles immobilized")
-        elif stagnant_count >= 4:
+        elif stagnant_count >= t["congestion_vehicles"]:
             incident_type = "Traffic Congestion"
             details["severity"] = "MEDIUM"
             details["flags"].append(f"Movement Analysis: {stagnant_count} vehicles blocked")
 
         # 3. ADVANCED CRASH & OVERTURNED DETECTION (Geometric Intelligence)
+        w = v_boxes[:, 2] - v_boxes[:, 0]
+        h = v_boxes[:, 3] - v_boxes[:, 1]
+        aspect_ratio = np.divide(w, h, out=np.zeros_like(w), where=h > 0)
+
+        # Geometric Alert: Overturned Vehicles
+        # Normally oriented vehicles have a predictable AR from CCTV angles.
+        # Cars (2), Trucks (7), Buses (5)
+        # If a vehicle is flipped, its bounding box ratio usually becomes extreme:
+        # Vertical flipped: AR < 0.65
+        # Sideways flipped (squashed profile): AR > 3.5
+        overturned = np.isin(v_cls, [2, 5, 7]) & ((aspect_ratio > zone_threshold("overturned_ar_high"))
+                                                  | (aspect_ratio < zone_threshold("overturned_ar_low")))
+        overturned_detected = bool(overturned.any())
+        for cls_id in v_cls[overturned].tolist():
+            details["flags"].append(f"Geometric Alert: Overturned {self.main_model.names[cls_id]} detected!")
+
+        # Pairwise vehicle overlap (upper triangle of the IoU matrix)
         crash_indicators = 0
-        overturned_detected = False
-        
-        for i, v1 in enumerate(vehicles):
-            b1 = v1['box']
-            w, h = b1[2]-b1[0], b1[3]-b1[1]
-            aspect_ratio = w / h if h > 0 else 0
-            
-            # Geometric Alert: Overturned Vehicles
-            # Normally oriented vehicles have a predictable AR from CCTV angles.
-            # Cars (2), Trucks (7), Buses (5)
-            if v1['cls'] in [2, 5, 7]:
-                # If a vehicle is flipped, its bounding box ratio usually becomes extreme:
-                # Vertical flipped: AR < 0.65
-                # Sideways flipped (squashed profile): AR > 3.5
-                if aspect_ratio > 3.5 or aspect_ratio < 0.65:
-                    overturned_detected = True
-                    details["flags"].append(f"Geometric Alert: Overturned {self.main_model.names[v1['cls']]} detected!")
-
-            for j in range(i + 1, len(vehicles)):
-                iou = self.compute_iou(b1, vehicles[j]['box'])
-                if iou > 0.12: crash_indicators += 1
-
-        if overturned_detected or crash_indicators > 0 or (len(vehicles) > 0 and len(persons) >= 2):
+        crashed = np.zeros(vehicle_count, dtype=bool)
+        if vehicle_count > 1:
+            iou = self.compute_iou_matrix(v_boxes, v_boxes)
+            crash_iou = zone_threshold("crash_iou")
+            if v_labels is not None:
+                crash_iou = np.maximum.outer(crash_iou, crash_iou) # Stricter zone of the pair applies
+            crash_pairs = np.triu(iou > crash_iou, k=1)
+            crash_indicators = int(np.count_nonzero(crash_pairs))
+            crashed = crash_pairs.any(axis=0) | crash_pairs.any(axis=1)
+
+        if overturned_detected or crash_indicators > 0 or (vehicle_count > 0 and scene_persons >= t["crash_min_persons"]):
             if incident_type == "Normal Traffic" or "Congestion" in incident_type:
                 incident_type = "Critical Traffic Accident"
                 if overturned_detected:
                     incident_type = "Severe Emergency: Overturned Vehicle"
                 details["severity"] = "HIGH"
-            
-        return incident_type, details
+
+        if not return_analysis:
+            return incident_type, details
+
+        # Per-box view of the decision for overlays (OverlayRenderer)
+        v_index = np.flatnonzero(vehicle_mask)
+        analysis = {
+            "xyxy": xyxy, "cls": cls, "ids": ids, "names": self.main_model.names, "zones": labels,
+            "stagnant": self._scatter(v_index, stagnant, len(cls)),
+            "crash": self._scatter(v_index, crashed, len(cls)),
+            "overturned": self._scatter(v_index, overturned, len(cls)),
+            "incident_type": incident_type, "severity": details["severity"], "flags": details["flags"],
+        }
+        return incident_type, details, analysis
+
+    @staticmethod
+    def _scatter(index, values, size):
+        """
+        Expands a mask over a subset of boxes (index) to all boxes.
+        """
+        full = np.zeros(size, dtype=bool)
+        full[index] = values
+        return full
 
     @staticmethod
     def compute_iou(box1, box2):
@@ -159,3 +634,24 @@ class IncidentDetector:
         
         union = area1 + area2 - intersection
         return intersection / union if union > 0 else 0
+
+    @staticmethod
+    def compute_iou_matrix(boxes1, boxes2):
+        """
+        Vectorized IoU between every box in boxes1 (N, 4) and boxes2 (M, 4).
+        Returns an (N, M) matrix; same semantics as compute_iou.
+        """
+        boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+        boxes2 = np.asarray(boxes2, dtype=np.float64).reshape(-1, 4)
+
+        x1 = np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+        y1 = np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+        x2 = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2])
+        y2 = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3])
+
+        intersection = np.maximum(0, x2 - x1) * np.maximum(0, y2 - y1)
+        area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+        area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+
+        union = area1[:, None] + area2[None, :] - intersection
+        return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
@@ -0,0 +1,108 @@
+import cv2
+import numpy as np
+
+
+class FirePrefilter:
+    def __init__(self, size=(160, 96), min_fire_ratio=0.002, min_flicker=0.1, min_smoke_ratio=0.05):
+        """
+        Cheap colour/flicker statistic used to decide whether the specialized
+        fire/smoke model is worth running on a frame.
+
+        Works on a downscaled HSV copy of the frame:
+        - fire_ratio: share of saturated red/orange/yellow bright pixels.
+        - flicker: share of flame-coloured pixels that toggled since the previous frame.
+        - smoke_ratio: share of desaturated pixels with soft, diffuse intensity change.
+        """
+        self.size = size
+        self.min_fire_ratio = min_fire_ratio
+        self.min_flicker = min_flicker
+        self.min_smoke_ratio = min_smoke_ratio
+        self._prev_flame = None
+        self._prev_gray = None
+
+    def score(self, image):
+        small = cv2.resize(image, self.size, interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        h, s, v = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+
+        # Flame colours: hue 0-35 (OpenCV scale 0-180), saturated and bright
+        flame = (h <= 35) & (s >= 100) & (v >= 150)
+        fire_ratio = float(flame.mean())
+
+        gray = v.astype(np.int16)
+        flicker = 0.0
+        smoke_ratio = 0.0
+        if self._prev_flame is not None:
+            union = flame | self._prev_flame
+            if union.any():
+                flicker = float((flame ^ self._prev_flame).sum() / union.sum())
+            # Smoke: grey pixels whose brightness drifts softly between frames
+            diff = np.abs(gray - self._prev_gray)
+            smoke = (s <= 40) & (v >= 80) & (v <= 220) & (diff >= 4) & (diff <= 40)
+            smoke_ratio = float(smoke.mean())
+
+        self._prev_flame = flame
+        self._prev_gray = gray
+        return {"fire_ratio": fire_ratio, "flicker": flicker, "smoke_ratio": smoke_ratio}
+
+    def is_candidate(self, image):
+        first_frame = self._prev_flame is None
+        stats = self.score(image)
+        if stats["fire_ratio"] >= self.min_fire_ratio:
+            # Without a previous frame colour is all we know; afterwards real flames
+            # must also flicker (static red cars, signs and lights do not)
+            if first_frame or stats["flicker"] >= self.min_flicker:
+                return True
+        return stats["smoke_ratio"] >= self.min_smoke_ratio
+
+
+class FireCascade:
+    def __init__(self, prefilter=None, period=30, hold=45):
+        """
+        Gating policy for the specialized fire/smoke model on one stream.
+
+        The model runs when the pre-filter flags a frame, at least every
+        `period` frames so nothing goes unchecked for long, and on every frame
+        for `hold` frames after a positive result.
+        """
+        self.prefilter = prefilter or FirePrefilter()
+        self.period = max(1, int(period))
+        self.hold = int(hold)
+        self._since_run = self.period # Force a run on the first frame
+        self._hold_left = 0
+        self.stats = self.empty_stats()
+
+    @staticmethod
+    def empty_stats():
+        return {"frames": 0, "run": 0, "skipped": 0, "run_prefilter": 0, "run_periodic": 0, "run_hold": 0}
+
+    def should_run(self, image):
+        self.stats["frames"] += 1
+        self._since_run += 1
+
+        # Always scored so the flicker/smoke statistics see consecutive frames
+        candidate = self.prefilter.is_candidate(image)
+
+        reason = None
+        if self._hold_left > 0:
+            self._hold_left -= 1
+            reason = "run_hold"
+        elif self._since_run >= self.period:
+            reason = "run_periodic"
+        elif candidate:
+            reason = "run_prefilter"
+
+        if reason is None:
+            self.stats["skipped"] += 1
+            return False
+        self.stats[reason] += 1
+        self.stats["run"] += 1
+        self._since_run = 0
+        return True
+
+    def report(self, positive):
+        """
+        Feeds back the fire model outcome; a positive result opens the hold window.
+        """
+        if positive:
+            self._hold_left = self.hold
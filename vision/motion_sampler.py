@@ -0,0 +1,77 @@
+import cv2
+import numpy as np
+
+
+class AdaptiveSampler:
+    def __init__(self, size=(160, 96), pixel_threshold=20, motion_threshold=0.004,
+                 max_interval=12, learning_rate=0.05, incident_hold=30):
+        """
+        Motion-gated frame sampler placed in front of IncidentDetector.detect.
+
+        A running-average background of a downscaled, blurred grayscale frame
+        gives a cheap motion score (share of pixels that differ by more than
+        pixel_threshold). Static scenes back off exponentially to one analyzed
+        frame every max_interval frames; motion or an active incident snaps
+        straight back to every frame.
+
+        ByteTrack only advances on analyzed frames, and max_interval stays well
+        below its track buffer (30 updates), so tracks survive the gaps; callers
+        reuse the last result for skipped frames.
+        """
+        self.size = size
+        self.pixel_threshold = pixel_threshold
+        self.motion_threshold = motion_threshold
+        self.max_interval = max(1, int(max_interval))
+        self.learning_rate = learning_rate
+        self.incident_hold = incident_hold
+
+        self.interval = 1
+        self._since_analyzed = 0
+        self._hold_left = 0
+        self._background = None
+        self.last_score = 0.0
+        self.stats = {"frames": 0, "analyzed": 0, "skipped": 0}
+
+    def motion_score(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        if self._background is None:
+            self._background = gray.astype(np.float32)
+            return 1.0 # First frame: treat as motion so it is analyzed
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        cv2.accumulateWeighted(gray, self._background, self.learning_rate)
+        return float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+
+    def should_analyze(self, frame):
+        """
+        Scores the frame and returns True when it should go through inference.
+        """
+        self.stats["frames"] += 1
+        self._since_analyzed += 1
+        self.last_score = self.motion_score(frame)
+
+        if self.last_score >= self.motion_threshold or self._hold_left > 0:
+            self.interval = 1
+        elif self._since_analyzed >= self.interval:
+            # Static and due: analyze this frame and back off further
+            self.interval = min(self.interval * 2, self.max_interval)
+            self._since_analyzed = 0
+            self.stats["analyzed"] += 1
+            return True
+
+        if self.interval == 1:
+            self._hold_left = max(0, self._hold_left - 1)
+            self._since_analyzed = 0
+            self.stats["analyzed"] += 1
+            return True
+        self.stats["skipped"] += 1
+        return False
+
+    def report_incident(self, incident_type):
+        """
+        Feeds back the latest analysis: any non-normal scene keeps the sampler
+        at full rate for incident_hold frames.
+        """
+        if incident_type and incident_type != "Normal Traffic":
+            self._hold_left = self.incident_hold
+            self.interval = 1
@@ -0,0 +1,117 @@
+import time
+
+import cv2
+import numpy as np
+
+# RGB colours
+VEHICLE_COLOR = (46, 134, 222)
+PERSON_COLOR = (46, 213, 115)
+OTHER_COLOR = (160, 160, 160)
+STAGNANT_COLOR = (255, 165, 2)
+CRASH_COLOR = (255, 99, 72)
+OVERTURNED_COLOR = (255, 71, 87)
+RISK_COLORS = {"HIGH": (255, 71, 87), "MEDIUM": (255, 165, 2), "LOW": (46, 213, 115)}
+
+
+class OverlayRenderer:
+    def __init__(self, max_fps=15.0, font_scale=0.45, max_flags=3):
+        """
+        Annotation renderer for the dashboard, replacing result.plot() plus a
+        separate BGR->RGB conversion.
+
+        The frame is converted straight into a preallocated RGB buffer (the
+        only full-frame pass) and boxes, track IDs, incident flags and
+        stagnant / crash / overturned highlights from analyze_incident are
+        drawn in place. Rendering is throttled to max_fps (the display refresh
+        rate), independent of the analysis rate.
+
+        The returned buffer is reused by the next render call; display or copy
+        it before rendering again.
+        """
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.font_scale = font_scale
+        self.max_flags = max_flags
+        self._buffer = None
+        self._last_render = None
+        self._label_sizes = {} # label -> (w, h, baseline)
+
+    def due(self):
+        """
+        True when the display refresh interval has elapsed.
+        """
+        return self._last_render is None or time.monotonic() - self._last_render >= self.min_interval
+
+    def render(self, frame, analysis, risk=None, force=False):
+        """
+        frame: BGR image; analysis: from analyze_incident(..., return_analysis=True) (or None
+        for a bare frame). Returns the annotated RGB buffer, or None when
+        throttled (keep showing the previous one).
+        """
+        if not force and not self.due():
+            return None
+        self._last_render = time.monotonic()
+
+        if self._buffer is None or self._buffer.shape != frame.shape:
+            self._buffer = np.empty_like(frame)
+        canvas = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._buffer)
+        if analysis is None:
+            return canvas
+
+        thickness = max(1, round(max(frame.shape[:2]) / 640))
+        names = analysis["names"]
+        ids = analysis["ids"]
+        xyxy = analysis["xyxy"].round().astype(np.int32)
+        for i, cls_id in enumerate(analysis["cls"].tolist()):
+            x1, y1, x2, y2 = xyxy[i].tolist()
+            if analysis["overturned"][i]:
+                color, width = OVERTURNED_COLOR, thickness * 3
+            elif analysis["crash"][i]:
+                color, width = CRASH_COLOR, thickness * 3
+            elif analysis["stagnant"][i]:
+                color, width = STAGNANT_COLOR, thickness * 2
+            else:
+                color = PERSON_COLOR if cls_id == 0 else VEHICLE_COLOR if cls_id in (2, 3, 5, 7) else OTHER_COLOR
+                width = thickness
+            cv2.rectangle(canvas, (x1, y1), (x2, y2), color, width)
+
+            label = names.get(cls_id, str(cls_id)) if isinstance(names, dict) else str(cls_id)
+            if ids is not None and ids[i]:
+                label = f"{label} #{int(ids[i])}"
+            self._draw_label(canvas, label, x1, y1, color)
+
+        self._draw_banner(canvas, analysis, risk)
+        return canvas
+
+    def _text_size(self, label):
+        size = self._label_sizes.get(label)
+        if size is None:
+            (w, h), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, self.font_scale, 1)
+            size = self._label_sizes[label] = (w, h, baseline)
+            if len(self._label_sizes) > 4096: # Track IDs keep growing on long streams
+                self._label_sizes.clear()
+        return size
+
+    def _draw_label(self, canvas, label, x, y, color):
+        w, h, baseline = self._text_size(label)
+        top = y - h - baseline - 2 if y - h - baseline - 2 >= 0 else y
+        cv2.rectangle(canvas, (x, top), (x + w + 4, top + h + baseline + 2), color, -1)
+        cv2.putText(canvas, label, (x + 2, top + h + 1), cv2.FONT_HERSHEY_SIMPLEX, self.font_scale,
+                    (255, 255, 255), 1, cv2.LINE_AA)
+
+    def _draw_banner(self, canvas, analysis, risk):
+        """
+        Incident type, risk and the first flags in the top-left corner.
+        """
+        incident_type = analysis.get("incident_type")
+        if not incident_type:
+            return
+        lines = [incident_type + (f" | Risk: {risk}" if risk else "")]
+        lines += analysis.get("flags", [])[: self.max_flags]
+        color = RISK_COLORS.get(risk or analysis.get("severity"), OTHER_COLOR)
+        scale = self.font_scale * 1.3
+        y = 8
+        for n, line in enumerate(lines):
+            (w, h), baseline = cv2.getTextSize(line, cv2.FONT_HERSHEY_SIMPLEX, scale, 1)
+            cv2.rectangle(canvas, (8, y), (16 + w, y + h + baseline + 6), color if n == 0 else (30, 30, 30), -1)
+            cv2.putText(canvas, line, (12, y + h + 3), cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255), 1, cv2.LINE_AA)
+            y += h + baseline + 8
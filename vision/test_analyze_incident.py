@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+
+from benchmarks.fakes import fake_result, fake_track_sequence
+from vision.array_result import ArrayBoxes, ArrayResult
+from vision.detector import IncidentDetector
+
+FIRE_NAMES = {0: "fire", 1: "smoke"}
+
+
+class _ReferenceAnalysis:
+    """
+    The per-box Python loop analyze_incident was vectorized from (scalar
+    compute_iou over every vehicle pair, list-based track history), kept as
+    the oracle the array version must agree with.
+    """
+    def __init__(self, detector):
+        self.detector = detector
+        self.t = detector.thresholds
+        self.history = {}
+
+    def __call__(self, main_result, fire_result=None):
+        d, t = self.detector, self.t
+        boxes = main_result.boxes
+        track_ids = boxes.id.tolist() if boxes.id is not None else [None] * len(boxes)
+        vehicles, persons = [], []
+        for xyxy, cls_id, tid in zip(boxes.xyxy.tolist(), boxes.cls.tolist(), track_ids):
+            cls_id = int(cls_id)
+            cx, cy = (xyxy[0] + xyxy[2]) / 2, (xyxy[1] + xyxy[3]) / 2
+            if tid is not None:
+                positions = self.history.setdefault(tid, [])
+                positions.append((cx, cy))
+                if len(positions) > 15:
+                    positions.pop(0)
+            if cls_id in d.vehicle_classes:
+                vehicles.append({"box": xyxy, "id": tid, "cls": cls_id})
+            elif cls_id == d.person_class:
+                persons.append(xyxy)
+
+        incident_type = "Normal Traffic"
+        details = {"vehicle_count": len(vehicles), "person_count": len(persons), "severity": "LOW", "flags": []}
+
+        if fire_result and len(fire_result.boxes) > 0:
+            fire_conf = float(fire_result.boxes.conf[0])
+            if fire_conf > t["fire_conf"]:
+                incident_type = "Critical: Active Fire/Smoke Detected"
+                details["severity"] = "HIGH"
+                details["flags"].append(f"Specialized Model: High Confidence Fire ({fire_conf:.2f})")
+
+        stagnant_count = 0
+        for v in vehicles:
+            history = self.history.get(v["id"], [])
+            if v["id"] and len(history) >= t["stagnant_min_positions"]:
+                dist = np.sqrt((history[-1][0] - history[0][0]) ** 2 + (history[-1][1] - history[0][1]) ** 2)
+                if dist < t["stagnant_max_motion_px"]:
+                    stagnant_count += 1
+        if stagnant_count >= t["gridlock_vehicles"]:
+            incident_type = "Severe Traffic Gridlock"
+            details["severity"] = "HIGH"
+            details["flags"].append(f"Gridlock Alert: {stagnant_count} vehicles immobilized")
+        elif stagnant_count >= t["congestion_vehicles"]:
+            incident_type = "Traffic Congestion"
+            details["severity"] = "MEDIUM"
+            details["flags"].append(f"Movement Analysis: {stagnant_count} vehicles blocked")
+
+        crash_indicators = 0
+        overturned_detected = False
+        for i, v1 in enumerate(vehicles):
+            b1 = v1["box"]
+            w, h = b1[2] - b1[0], b1[3] - b1[1]
+            aspect_ratio = w / h if h > 0 else 0
+            if v1["cls"] in [2, 5, 7] and (aspect_ratio > t["overturned_ar_high"]
+                                           or aspect_ratio < t["overturned_ar_low"]):
+                overturned_detected = True
+                details["flags"].append(f"Geometric Alert: Overturned {main_result.names[v1['cls']]} detected!")
+            for v2 in vehicles[i + 1:]:
+                if d.compute_iou(b1, v2["box"]) > t["crash_iou"]:
+                    crash_indicators += 1
+
+        if overturned_detected or crash_indicators > 0 or (vehicles and len(persons) >= t["crash_min_persons"]):
+            if incident_type == "Normal Traffic" or "Congestion" in incident_type:
+                incident_type = "Critical Traffic Accident"
+                if overturned_detected:
+                    incident_type = "Severe Emergency: Overturned Vehicle"
+                details["severity"] = "HIGH"
+        return incident_type, details
+
+
+def _fire(rng, shape=(720, 1280)):
+    n = int(rng.integers(0, 3))
+    xyxy = np.tile([100.0, 100.0, 200.0, 200.0], (n, 1))
+    return ArrayResult(ArrayBoxes(xyxy, np.zeros(n), rng.uniform(0.1, 0.9, n)), FIRE_NAMES, shape)
+
+
+def test_iou_matrix_matches_scalar_iou():
+    rng = np.random.default_rng(0)
+    boxes = fake_result(60, rng).boxes.xyxy
+    boxes[:5, 2] = boxes[:5, 0] # Zero-width boxes
+    boxes[5:10] = boxes[10:15] # Exact duplicates
+    matrix = IncidentDetector.compute_iou_matrix(boxes, boxes[::-1])
+    expected = [[IncidentDetector.compute_iou(a, b) for b in boxes[::-1].tolist()] for a in boxes.tolist()]
+    np.testing.assert_allclose(matrix, expected, rtol=1e-12, atol=1e-12)
+
+
+# Random boxes trip the person and aspect-ratio rules on most frames; relaxed
+# thresholds let congestion and normal traffic through as well
+RELAXED = {"crash_min_persons": 100, "overturned_ar_low": 0.3, "crash_iou": 0.3}
+
+
+@pytest.mark.parametrize("thresholds", [None, RELAXED])
+@pytest.mark.parametrize("num_boxes, jitter, churn", [
+    (12, 1.0, 0.0), # Stagnant traffic: congestion / gridlock
+    (40, 3.0, 0.1), # Moving, with scene turnover
+    (150, 0.5, 0.02), # Dense: overlaps and crash pairs
+])
+def test_vectorized_decisions_match_the_scalar_loop(num_boxes, jitter, churn, thresholds):
+    detector = IncidentDetector.from_models(thresholds=thresholds)
+    reference = _ReferenceAnalysis(detector)
+    rng = np.random.default_rng(num_boxes)
+    outcomes = set()
+    for frame in fake_track_sequence(num_boxes, 40, seed=num_boxes, churn=churn, jitter=jitter):
+        fire = _fire(rng)
+        expected = reference(frame, fire)
+        assert detector.analyze_incident(frame, fire) == expected
+        outcomes.add(expected[0])
+    assert len(outcomes) > 1 # The sequence exercised more than one rule
+
+
+def test_vectorized_decisions_match_untracked_and_overturned_boxes():
+    detector = IncidentDetector.from_models()
+    reference = _ReferenceAnalysis(detector)
+    rng = np.random.default_rng(7)
+    for _ in range(50):
+        frame = fake_result(int(rng.integers(0, 30)), rng, track=False)
+        flip = rng.random(len(frame.boxes)) < 0.1
+        frame.boxes.xyxy[flip, 3] = frame.boxes.xyxy[flip, 1] + 5 # Squashed profile
+        assert detector.analyze_incident(frame) == reference(frame)
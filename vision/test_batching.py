@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from benchmarks.fakes import FakeYOLO
+from vision.batching import BatchScheduler, measure_batching_gain
+from vision.detector import IncidentDetector
+
+CAR = (100, 100, 200, 180, 2)
+
+
+class _RecordingYOLO(FakeYOLO):
+    """
+    FakeYOLO that logs every forward pass as (batch size, conf).
+    """
+    def __init__(self, fail=False, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, source, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        self.calls.append((len(images), kwargs.get("conf")))
+        if self.fail:
+            raise RuntimeError("engine crashed")
+        return super().__call__(source, **kwargs)
+
+
+def _frames(n):
+    return [np.full((48, 64, 3), i, dtype=np.uint8) for i in range(n)]
+
+
+def _detector(**kwargs):
+    return IncidentDetector.from_models(_RecordingYOLO(default=[CAR], **kwargs),
+                                        fire_model=_RecordingYOLO(names={0: "fire", 1: "smoke"}))
+
+
+def test_detect_batch_runs_one_pass_per_model():
+    detector = _detector()
+    results = detector.detect_batch(_frames(3), stream_ids=["a", "b", "c"])
+    assert detector.main_model.calls == [(3, detector.conf)]
+    assert detector.fire_model.calls == [(3, detector.fire_conf)]
+    assert len(results) == 3
+    for main_res, fire_res in results:
+        assert len(main_res.boxes) == 1 and len(fire_res.boxes) == 0
+
+
+def test_scheduler_coalesces_streams_in_the_window():
+    detector = _detector()
+    with BatchScheduler(detector, max_batch_size=8, max_wait_ms=500, track=False) as scheduler:
+        futures = [scheduler.submit(f"cam{i}", frame) for i, frame in enumerate(_frames(3))]
+        results = [f.result(timeout=5) for f in futures]
+    assert detector.main_model.calls == [(3, detector.conf)]
+    assert scheduler.stats == {"batches": 1, "frames": 3, "max_batch": 3}
+    assert all(len(main_res.boxes) == 1 for main_res, _ in results)
+
+
+def test_scheduler_respects_max_batch_size():
+    detector = _detector()
+    with BatchScheduler(detector, max_batch_size=2, max_wait_ms=500, track=False) as scheduler:
+        futures = [scheduler.submit(f"cam{i}", frame) for i, frame in enumerate(_frames(5))]
+        for f in futures:
+            f.result(timeout=5)
+    sizes = [n for n, _ in detector.main_model.calls]
+    assert sum(sizes) == 5 and max(sizes) <= 2
+    assert scheduler.stats["max_batch"] <= 2
+
+
+def test_scheduler_groups_frames_by_options():
+    detector = _detector()
+    with BatchScheduler(detector, max_batch_size=8, max_wait_ms=500, track=False) as scheduler:
+        frames = _frames(3)
+        futures = [scheduler.submit("a", frames[0]), scheduler.submit("b", frames[1], conf=0.5),
+                   scheduler.submit("c", frames[2])]
+        for f in futures:
+            f.result(timeout=5)
+    # One batch window, but one detect_batch call per (track, conf)
+    assert sorted(detector.main_model.calls) == sorted([(2, detector.conf), (1, 0.5)])
+    assert scheduler.stats["batches"] == 2
+
+
+def test_scheduler_propagates_errors_to_every_frame_of_the_batch():
+    detector = _detector(fail=True)
+    with BatchScheduler(detector, max_batch_size=8, max_wait_ms=500, track=False) as scheduler:
+        futures = [scheduler.submit(f"cam{i}", frame) for i, frame in enumerate(_frames(3))]
+        for f in futures:
+            with pytest.raises(RuntimeError, match="engine crashed"):
+                f.result(timeout=5)
+        # The worker survives a failed batch
+        detector.main_model.fail = False
+        assert len(scheduler.submit("cam0", _frames(1)[0]).result(timeout=5)[0].boxes) == 1
+
+
+def test_measure_batching_gain_reports_both_paths():
+    detector = _detector()
+    stats = measure_batching_gain(detector, {"a": _frames(4), "b": _frames(4)}, max_batch_size=4)
+    assert stats["frames"] == 8 and stats["streams"] == 2
+    assert stats["sequential_fps"] > 0 and stats["batched_fps"] > 0
+    assert [n for n, _ in detector.main_model.calls].count(4) == 2 # 8 frames in two batched passes
+
+
+def test_scheduler_groups_tracked_and_untracked_frames():
+    pytest.importorskip("ultralytics")
+    detector = _detector()
+    with BatchScheduler(detector, max_batch_size=8, max_wait_ms=500, track=True) as scheduler:
+        frames = _frames(3)
+        futures = [scheduler.submit("a", frames[0]), scheduler.submit("b", frames[1], track=False),
+                   scheduler.submit("c", frames[2])]
+        tracked, untracked, _ = [f.result(timeout=5)[0] for f in futures]
+    assert sorted(n for n, _ in detector.main_model.calls) == [1, 2]
+    assert tracked.boxes.id is not None and untracked.boxes.id is None
+    assert set(detector._stream_trackers) == {"a", "c"} # One ByteTrack per tracked stream
@@ -0,0 +1,86 @@
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks.fakes import FakeYOLO
+from utils.generate_samples import make_scene
+from vision.detector import IncidentDetector
+from vision.fire_gate import FireCascade
+
+FIRE_NAMES = {0: "fire", 1: "smoke"}
+
+
+class _CountingYOLO(FakeYOLO):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.frames = 0
+
+    def __call__(self, source, **kwargs):
+        self.frames += len(source) if isinstance(source, list) else 1
+        return super().__call__(source, **kwargs)
+
+
+def _burning(image, rng):
+    """
+    The scene with a flickering blaze: flame-coloured blobs that move every frame.
+    """
+    image = image.copy()
+    for _ in range(6):
+        center = (int(rng.integers(560, 720)), int(rng.integers(280, 440)))
+        cv2.circle(image, center, int(rng.integers(30, 70)), (0, int(rng.integers(120, 200)), 255), -1)
+    return image
+
+
+@pytest.fixture(scope="module")
+def scene():
+    image, boxes = make_scene(seed=3)
+    return image, boxes
+
+
+def test_prefilter_skips_static_scenes_and_passes_flames(scene):
+    image, _ = scene
+    cascade = FireCascade(period=100, hold=0)
+    calm = [cascade.should_run(image.copy()) for _ in range(20)]
+    assert calm == [True] + [False] * 19 # Only the forced first run
+
+    rng = np.random.default_rng(0)
+    burning = [cascade.should_run(_burning(image, rng)) for _ in range(10)]
+    assert all(burning[1:]) # From the first frame with flicker to compare against
+    assert cascade.stats["run_prefilter"] >= 9
+
+
+def test_detector_runs_the_fire_model_only_when_the_cascade_lets_frames_through(scene):
+    pytest.importorskip("ultralytics") # Per-stream ByteTrack
+    image, boxes = scene
+    fire_model = _CountingYOLO(names=FIRE_NAMES)
+    detector = IncidentDetector.from_models(FakeYOLO(default=boxes), fire_model=fire_model,
+                                            fire_cascade=True, fire_cascade_period=100, fire_cascade_hold=0)
+    for _ in range(20):
+        _, fire_res = detector.detect(image.copy(), track=True, stream_id="cam")
+    assert fire_model.frames == 1 and fire_res is None
+
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        detector.detect(_burning(image, rng), track=True, stream_id="cam")
+    assert fire_model.frames >= 10
+    stats = detector.fire_gate_stats("cam")
+    assert stats["frames"] == 30 and stats["run"] == fire_model.frames
+
+
+def test_zone_fire_threshold_decides_the_hold_window(scene):
+    pytest.importorskip("ultralytics")
+    image, boxes = scene
+    h, w = image.shape[:2]
+    strict = {"size": [w, h], "thresholds": {"fire_conf": 0.9}, "zones": []}
+    detector = IncidentDetector.from_models(FakeYOLO(default=boxes), fire_model=FakeYOLO(
+        names=FIRE_NAMES, default=[(600, 300, 700, 400, 0)]), fire_cascade=True, fire_cascade_hold=5)
+    detector.set_zones("strict", strict)
+
+    for stream_id in ("strict", "default"):
+        main_res, fire_res = detector.detect(image, track=True, stream_id=stream_id)
+        incident_type, _ = detector.analyze_incident(main_res, fire_res, stream_id=stream_id)
+        # Fire boxes at conf 0.8: above the camera threshold, below the strict layout's.
+        # The cascade holds open exactly when analyze_incident flags fire.
+        flagged = incident_type == "Critical: Active Fire/Smoke Detected"
+        assert flagged == (stream_id == "default")
+        assert (detector._fire_gates[stream_id]._hold_left > 0) == flagged
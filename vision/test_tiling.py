@@ -0,0 +1,50 @@
+import numpy as np
+
+from vision.detector import IncidentDetector
+from vision.tiling import batched_nms, tile_grid
+
+
+def test_tile_grid_covers_the_frame_with_overlap():
+    tiles = tile_grid((1080, 1920, 3), tile_size=640, overlap=0.2)
+    covered = np.zeros((1080, 1920), dtype=bool)
+    for x1, y1, x2, y2 in tiles:
+        assert x2 - x1 == 640 and y2 - y1 == 640
+        covered[y1:y2, x1:x2] = True
+    assert covered.all()
+    xs = sorted({t[0] for t in tiles})
+    assert all(b - a <= 640 * 0.8 for a, b in zip(xs, xs[1:]))
+
+
+def test_tile_grid_small_frame_and_regions():
+    assert tile_grid((480, 640), tile_size=640) == [(0, 0, 640, 480)]
+    tiles = tile_grid((2160, 3840), tile_size=640, regions=[(1000, 1000, 1500, 1400)])
+    assert tiles == [(1000, 1000, 1640, 1640)]
+    assert tile_grid((2160, 3840), regions=[(5000, 0, 6000, 100)]) == []
+
+
+def test_batched_nms_suppresses_within_a_class_only():
+    xyxy = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [0, 0, 10, 10], [50, 50, 60, 60]], dtype=np.float64)
+    conf = np.array([0.6, 0.9, 0.8, 0.5])
+    cls = np.array([2, 2, 0, 2])
+    keep = batched_nms(xyxy, conf, cls, iou_threshold=0.5)
+    assert keep.tolist() == [1, 2, 3] # Sorted by confidence; box 0 loses to box 1 of the same class
+
+
+def test_batched_nms_empty():
+    assert len(batched_nms(np.zeros((0, 4)), np.zeros(0), np.zeros(0))) == 0
+
+
+def test_batched_nms_matches_greedy_definition_on_dense_scene():
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(0, 400, (600, 2))
+    xyxy = np.concatenate([xy, xy + rng.uniform(20, 60, (600, 2))], axis=1)
+    conf = rng.uniform(0.15, 0.95, 600)
+    cls = rng.choice([0, 2, 7], 600)
+    keep = batched_nms(xyxy, conf, cls, iou_threshold=0.5)
+    assert np.all(np.diff(conf[keep]) <= 0)
+    kept = set(keep.tolist())
+    for i in range(600):
+        same = [k for k in keep if cls[k] == cls[i] and k != i and conf[k] >= conf[i]]
+        overlaps = IncidentDetector.compute_iou_matrix(xyxy[[i]], xyxy[same])[0] > 0.5 if same else np.zeros(0, bool)
+        # A box is dropped exactly when a kept, more confident box of its class overlaps it
+        assert (i in kept) != bool(overlaps.any())
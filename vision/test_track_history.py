@@ -0,0 +1,43 @@
+import numpy as np
+
+from vision.track_history import TrackHistory
+
+
+def test_ring_buffer_keeps_the_latest_positions():
+    history = TrackHistory(length=3)
+    for i in range(5):
+        history.update(np.array([7]), np.array([[i, 0]]))
+    assert history.get(7) == [(2.0, 0.0), (3.0, 0.0), (4.0, 0.0)]
+    valid, distance = history.displacement(np.array([7, 8]), min_length=3)
+    assert valid.tolist() == [True, False]
+    assert distance.tolist() == [2.0, 0.0]
+
+
+def test_stale_tracks_are_evicted():
+    history = TrackHistory(max_age=5)
+    history.update(np.array([1]), np.array([[0, 0]]))
+    for _ in range(6):
+        history.update(None, None)
+    assert history.evict_stale() == 1
+    assert 1 not in history
+
+
+def test_duplicate_ids_in_a_frame_are_stored_once():
+    history = TrackHistory(length=4)
+    history.update(np.array([1, 2, 1]), np.array([[0, 0], [1, 1], [5, 5]]))
+    assert history.get(1) == [(0.0, 0.0)]
+    assert history.duplicates == 1
+
+
+def test_full_buffer_never_recycles_a_track_of_the_current_frame():
+    history = TrackHistory(length=4, max_tracks=3)
+    history.update(np.array([1, 2]), np.array([[0, 0], [1, 1]]))
+    history.update(np.array([1, 2, 3, 4, 5]), np.arange(10.0).reshape(5, 2))
+    assert len(history) == 3
+    assert history.dropped == 2
+    assert history.get(1) == [(0.0, 0.0), (0.0, 1.0)]
+    assert history.get(3) == [(4.0, 5.0)]
+
+    history.update(np.array([4]), np.array([[9, 9]])) # Recycles the least recently seen track
+    assert history.evicted == 1
+    assert history.get(4) == [(9.0, 9.0)]
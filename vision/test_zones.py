@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from vision.zones import ZoneMap
+
+THRESHOLDS = {"stagnant_max_motion_px": 5.0, "overturned_ar_high": 2.0, "overturned_ar_low": 0.5, "crash_iou": 0.3}
+CONFIG = {
+    "size": [100, 100],
+    "anchor": "center",
+    "zones": [
+        {"name": "road", "type": "lane", "polygon": [[0, 0], [100, 0], [100, 50], [0, 50]]},
+        {"name": "verge", "type": "shoulder", "polygon": [[0, 50], [100, 50], [100, 100], [0, 100]],
+         "thresholds": {"crash_iou": 0.6}},
+        {"name": "gantry", "type": "ignore", "polygon": [[40, 0], [60, 0], [60, 20], [40, 20]]},
+    ],
+}
+
+
+def test_lookup_scales_polygons_and_later_zones_win():
+    zone_map = ZoneMap.from_config(CONFIG, THRESHOLDS)
+    boxes = np.array([[10, 10, 30, 30], [10, 150, 30, 170], [90, 10, 110, 30], [500, 500, 510, 510]], dtype=np.float32)
+    labels = zone_map.lookup(boxes, (200, 200))
+    assert [zone_map.zone_name(label) for label in labels] == ["road", "verge", "gantry", "verge"]
+    assert zone_map.ignored[labels].tolist() == [False, False, True, False]
+    assert not zone_map.count_stagnant[labels[1]]
+
+
+def test_per_zone_thresholds_and_source_config():
+    zone_map = ZoneMap.from_config(CONFIG, THRESHOLDS)
+    assert zone_map.tables["crash_iou"].tolist() == [0.3, 0.3, 0.6, 0.3]
+    assert zone_map.config is CONFIG
+
+
+def test_bottom_anchor_uses_the_ground_contact_point():
+    zone_map = ZoneMap.from_config(dict(CONFIG, anchor="bottom"), THRESHOLDS)
+    label = zone_map.lookup(np.array([[10, 30, 30, 70]], dtype=np.float32), (100, 100))[0]
+    assert zone_map.zone_name(label) == "verge"
+
+
+def test_invalid_configs_are_rejected():
+    with pytest.raises(ValueError):
+        ZoneMap([{"name": "x", "type": "sidewalk", "polygon": [[0, 0], [1, 0], [1, 1]]}], THRESHOLDS)
+    with pytest.raises(ValueError):
+        ZoneMap([{"name": "x", "type": "lane", "polygon": [[0, 0], [1, 0], [1, 1]], "thresholds": {"conf": 0.1}}],
+                THRESHOLDS)
@@ -0,0 +1,208 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from vision.array_result import ArrayBoxes
+from utils.metrics import METRICS
+
+
+def _axis_starts(lo, hi, size, stride, limit):
+    """
+    Evenly spaced window starts covering [lo, hi) with windows of `size`,
+    at most `stride` apart; the last window ends on hi (or on the frame edge).
+    """
+    span = hi - lo
+    n = 1 if span <= size else math.ceil((span - size) / stride) + 1
+    starts = np.linspace(lo, max(lo, hi - size), n).round().astype(int)
+    return [int(max(0, min(s, limit - size))) for s in starts]
+
+
+def tile_grid(shape, tile_size=640, overlap=0.2, regions=None):
+    """
+    Overlapping tile windows (x1, y1, x2, y2) for a frame of shape (h, w, ...).
+    regions: optional list of (x1, y1, x2, y2) pixel boxes; only these areas
+    are tiled (e.g. the carriageway of a panoramic camera).
+    """
+    h, w = shape[:2]
+    stride = max(1, int(tile_size * (1 - overlap)))
+    tiles = []
+    for rx1, ry1, rx2, ry2 in (regions or [(0, 0, w, h)]):
+        rx1, ry1 = max(0, int(rx1)), max(0, int(ry1))
+        rx2, ry2 = min(w, int(rx2)), min(h, int(ry2))
+        if rx2 <= rx1 or ry2 <= ry1:
+            continue
+        for y in _axis_starts(ry1, ry2, tile_size, stride, h):
+            for x in _axis_starts(rx1, rx2, tile_size, stride, w):
+                tile = (x, y, min(x + tile_size, w), min(y + tile_size, h))
+                if tile not in tiles:
+                    tiles.append(tile)
+    return tiles
+
+
+def batched_nms(xyxy, conf, cls, iou_threshold=0.5):
+    """
+    Class-aware greedy NMS on host arrays. Returns the kept indices ordered by
+    descending confidence.
+
+    Runs torchvision's batched NMS kernel (installed with ultralytics); the
+    NumPy fallback only computes IoU rows of kept boxes, never an n x n matrix.
+    """
+    if len(xyxy) == 0:
+        return np.zeros(0, dtype=np.int64)
+    try:
+        import torch
+        from torchvision.ops import batched_nms as tv_batched_nms
+    except ImportError:
+        return _greedy_nms(xyxy, conf, cls, iou_threshold)
+    keep = tv_batched_nms(torch.from_numpy(np.ascontiguousarray(xyxy, dtype=np.float32)),
+                          torch.from_numpy(np.ascontiguousarray(conf, dtype=np.float32)),
+                          torch.from_numpy(np.ascontiguousarray(cls, dtype=np.int64)), iou_threshold)
+    return keep.numpy().astype(np.int64)
+
+
+def _greedy_nms(xyxy, conf, cls, iou_threshold):
+    keep = []
+    for c in np.unique(cls):
+        idx = np.flatnonzero(cls == c)
+        idx = idx[np.argsort(-conf[idx], kind="stable")]
+        boxes = xyxy[idx]
+        area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        alive = np.arange(len(idx))
+        while len(alive):
+            i, rest = alive[0], alive[1:]
+            keep.append(idx[i])
+            iw = np.clip(np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0]), 0, None)
+            ih = np.clip(np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1]), 0, None)
+            inter = iw * ih
+            iou = inter / np.maximum(area[i] + area[rest] - inter, 1e-9)
+            alive = rest[iou <= iou_threshold]
+    keep = np.asarray(keep, dtype=np.int64)
+    return keep[np.argsort(-conf[keep], kind="stable")]
+
+
+class TiledInference:
+    def __init__(self, tile_size=640, overlap=0.2, regions=None, overview=True,
+                 iou_threshold=0.5, edge_margin=2, workers=4):
+        """
+        Tiled inference for high-resolution frames (4K / panoramic CCTV).
+        Instead of letting the model downscale the whole frame, overlapping
+        tile_size crops are detected at native resolution, all in one batched
+        forward pass, and merged back into frame coordinates.
+
+        overview adds a downscaled full frame to the batch so objects larger
+        than a tile are still found; with it, tile detections touching an inner
+        tile border (cut objects) are discarded in favour of the neighbouring
+        tile or the overview. Cross-tile duplicates are removed with
+        class-aware NMS at iou_threshold.
+
+        workers: threads cropping / resizing tiles (OpenCV and NumPy copies
+                 release the GIL).
+        """
+        self.tile_size = int(tile_size)
+        self.overlap = overlap
+        self.regions = regions
+        self.overview = overview
+        self.iou_threshold = iou_threshold
+        self.edge_margin = edge_margin
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cityguard-tiles") if workers > 1 else None
+        self._grids = {} # frame shape -> tile windows
+
+    def tiles_for(self, shape):
+        key = tuple(shape[:2])
+        grid = self._grids.get(key)
+        if grid is None:
+            grid = self._grids[key] = tile_grid(shape, self.tile_size, self.overlap, self.regions)
+        return grid
+
+    def _crop(self, image, window):
+        if window is None: # Overview: longest side scaled to tile_size
+            h, w = image.shape[:2]
+            scale = self.tile_size / max(h, w)
+            patch = cv2.resize(image, (max(1, round(w * scale)), max(1, round(h * scale))),
+                               interpolation=cv2.INTER_AREA)
+            return patch, scale
+        x1, y1, x2, y2 = window
+        return np.ascontiguousarray(image[y1:y2, x1:x2]), 1.0
+
+    def prepare(self, images):
+        """
+        Crops every image into patches. Returns (patches, jobs) where jobs[k]
+        is (image_index, window or None for the overview, scale).
+        """
+        jobs = []
+        for i, image in enumerate(images):
+            windows = list(self.tiles_for(image.shape))
+            if self.overview and max(image.shape[:2]) > self.tile_size:
+                windows.append(None)
+            jobs += [(i, window) for window in windows]
+        if self._pool is not None:
+            crops = list(self._pool.map(lambda job: self._crop(images[job[0]], job[1]), jobs))
+        else:
+            crops = [self._crop(images[i], window) for i, window in jobs]
+        patches = [patch for patch, _ in crops]
+        return patches, [(i, window, scale) for (i, window), (_, scale) in zip(jobs, crops)]
+
+    def _edge_mask(self, xyxy, window, frame_shape):
+        """
+        True for boxes not cut by an inner tile border (frame borders are fine).
+        """
+        x1, y1, x2, y2 = window
+        h, w = frame_shape[:2]
+        m = self.edge_margin
+        keep = np.ones(len(xyxy), dtype=bool)
+        if x1 > 0:
+            keep &= xyxy[:, 0] > x1 + m
+        if y1 > 0:
+            keep &= xyxy[:, 1] > y1 + m
+        if x2 < w:
+            keep &= xyxy[:, 2] < x2 - m
+        if y2 < h:
+            keep &= xyxy[:, 3] < y2 - m
+        return keep
+
+    def run(self, model, images, **kwargs):
+        """
+        Detects on all tiles of all images in one forward pass.
+        Returns per image (xyxy, cls, conf, template) in frame coordinates, where
+        template is one of the raw per-tile results (carries names / type).
+        """
+        with METRICS.time("tiling_prepare"):
+            patches, jobs = self.prepare(images)
+        METRICS.set_gauge("last_tile_count", len(patches))
+        with METRICS.time("main_model_tiled"):
+            # Tiles are detected at native resolution (no second downscale)
+            results = model(patches, imgsz=self.tile_size, **kwargs) if patches else []
+
+        with METRICS.time("tiling_merge"):
+            parts = [[] for _ in images]
+            templates = [None] * len(images)
+            for (i, window, scale), result in zip(jobs, results):
+                if templates[i] is None:
+                    templates[i] = result
+                boxes = ArrayBoxes.from_boxes(result.boxes)
+                if len(boxes) == 0:
+                    continue
+                xyxy = boxes.xyxy.astype(np.float64)
+                if window is None:
+                    xyxy /= scale
+                    keep = np.ones(len(xyxy), dtype=bool)
+                else:
+                    xyxy += (window[0], window[1], window[0], window[1])
+                    keep = self._edge_mask(xyxy, window, images[i].shape) if self.overview else slice(None)
+                parts[i].append((xyxy[keep], boxes.cls[keep].astype(np.int64), boxes.conf[keep].astype(np.float64)))
+
+            merged = []
+            for i in range(len(images)):
+                if parts[i]:
+                    xyxy, cls, conf = (np.concatenate(cols) for cols in zip(*parts[i]))
+                else:
+                    xyxy, cls, conf = np.zeros((0, 4)), np.zeros(0, dtype=np.int64), np.zeros(0)
+                keep = batched_nms(xyxy, conf, cls, self.iou_threshold)
+                merged.append((xyxy[keep], cls[keep], conf[keep], templates[i]))
+        return merged
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
@@ -0,0 +1,155 @@
+import numpy as np
+
+
+class TrackHistory:
+    def __init__(self, length=15, max_age=150, max_tracks=4096):
+        """
+        Compact, bounded store of recent track centers.
+
+        Every live track owns one slot in preallocated NumPy ring buffers, so
+        memory is fixed at construction (max_tracks * length positions) no
+        matter how long a feed runs.
+
+        length: positions kept per track (ring buffer size).
+        max_age: tracks not seen for this many frames are evicted.
+        max_tracks: hard ceiling on simultaneously stored tracks; when full the
+                    least recently seen track is recycled. Tracks already
+                    updated in the current frame are never recycled: if a
+                    single frame holds more than max_tracks tracks, the extra
+                    ones are dropped (counted in dropped).
+        """
+        self.length = int(length)
+        self.max_age = int(max_age)
+        self.max_tracks = int(max_tracks)
+
+        self.positions = np.zeros((self.max_tracks, self.length, 2), dtype=np.float64)
+        self.counts = np.zeros(self.max_tracks, dtype=np.int64) # valid entries per slot
+        self.heads = np.zeros(self.max_tracks, dtype=np.int64) # next write index per slot
+        self.last_seen = np.full(self.max_tracks, -1, dtype=np.int64) # -1: slot free
+        self.slot_ids = np.full(self.max_tracks, -1, dtype=np.int64)
+
+        self._slots = {} # track_id -> slot
+        self._free = list(range(self.max_tracks - 1, -1, -1))
+        self.frame = 0
+        self.evicted = 0
+        self.dropped = 0 # track updates skipped: more tracks in one frame than max_tracks
+        self.duplicates = 0 # repeated IDs within a frame (only the first is stored)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, track_id):
+        return track_id in self._slots
+
+    @property
+    def nbytes(self):
+        return (self.positions.nbytes + self.counts.nbytes + self.heads.nbytes
+                + self.last_seen.nbytes + self.slot_ids.nbytes)
+
+    def get(self, track_id, default=None):
+        """
+        Returns the stored centers of a track, oldest first, as a list of (x, y).
+        """
+        slot = self._slots.get(track_id)
+        if slot is None:
+            return default
+        count = self.counts[slot]
+        order = (self.heads[slot] - count + np.arange(count)) % self.length
+        return [tuple(p) for p in self.positions[slot, order].tolist()]
+
+    def update(self, track_ids, centers):
+        """
+        Advances the frame clock and appends one center per track.
+        track_ids: (N,) int array or None; centers: (N, 2) array.
+        """
+        self.frame += 1
+        if self.frame % 30 == 0:
+            self.evict_stale()
+        if track_ids is None or len(track_ids) == 0:
+            return
+
+        track_ids = np.asarray(track_ids)
+        centers = np.asarray(centers)
+        unique_ids, first = np.unique(track_ids, return_index=True)
+        if len(unique_ids) < len(track_ids):
+            # A repeated ID would write the same ring position twice per frame
+            self.duplicates += len(track_ids) - len(unique_ids)
+            first.sort() # Keep detection order
+            track_ids, centers = track_ids[first], centers[first]
+
+        slots = np.fromiter((self._slot_for(tid) for tid in track_ids.tolist()), dtype=np.int64, count=len(track_ids))
+        kept = slots >= 0
+        if not kept.all():
+            slots, centers = slots[kept], centers[kept]
+        self.positions[slots, self.heads[slots]] = centers
+        self.heads[slots] = (self.heads[slots] + 1) % self.length
+        self.counts[slots] = np.minimum(self.counts[slots] + 1, self.length)
+        self.last_seen[slots] = self.frame
+
+    def _slot_for(self, track_id):
+        """
+        Slot of a track, allocating one for a new track; -1 when every slot
+        already holds a track of the current frame.
+        """
+        slot = self._slots.get(track_id)
+        if slot is not None:
+            self.last_seen[slot] = self.frame # protects it from recycling within this frame
+            return slot
+        if not self._free:
+            self.evict_stale()
+        if not self._free:
+            # Memory ceiling reached: recycle the least recently seen track of an earlier frame
+            older = np.nonzero((self.last_seen >= 0) & (self.last_seen < self.frame))[0]
+            if len(older) == 0:
+                self.dropped += 1
+                return -1
+            self._release(older[np.argmin(self.last_seen[older])])
+        slot = self._free.pop()
+        self._slots[track_id] = slot
+        self.slot_ids[slot] = track_id
+        self.counts[slot] = 0
+        self.heads[slot] = 0
+        self.last_seen[slot] = self.frame
+        return slot
+
+    def _release(self, slot):
+        del self._slots[int(self.slot_ids[slot])]
+        self.slot_ids[slot] = -1
+        self.last_seen[slot] = -1
+        self.counts[slot] = 0
+        self._free.append(int(slot))
+        self.evicted += 1
+
+    def evict_stale(self):
+        """
+        Frees every slot whose track has not been seen for more than max_age frames.
+        """
+        stale = np.nonzero((self.last_seen >= 0) & (self.frame - self.last_seen > self.max_age))[0]
+        for slot in stale.tolist():
+            self._release(slot)
+        return len(stale)
+
+    def displacement(self, track_ids, min_length=10):
+        """
+        Vectorized query over live tracks: distance between the oldest and the
+        newest stored center of each requested track.
+
+        Returns (valid, distance): valid marks tracks with at least min_length
+        stored positions; distance is 0 where not valid.
+        """
+        n = len(track_ids)
+        valid = np.zeros(n, dtype=bool)
+        distance = np.zeros(n, dtype=np.float64)
+        if n == 0:
+            return valid, distance
+
+        slots = np.fromiter((self._slots.get(tid, -1) for tid in track_ids.tolist()), dtype=np.int64, count=n)
+        known = slots >= 0
+        s = slots[known]
+        valid[known] = self.counts[s] >= min_length
+        s = slots[valid]
+        if len(s):
+            newest = self.positions[s, (self.heads[s] - 1) % self.length]
+            oldest = self.positions[s, (self.heads[s] - self.counts[s]) % self.length]
+            distance[valid] = np.sqrt(((newest - oldest) ** 2).sum(axis=1))
+        return valid, distance
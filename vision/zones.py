@@ -0,0 +1,121 @@
+import json
+
+import cv2
+import numpy as np
+
+# Behaviour of each zone type: do vehicles count toward stagnancy, do persons
+# count toward the "people around vehicles" accident rule. ignore zones drop
+# their detections entirely.
+ZONE_TYPES = {
+    "lane": {"stagnancy": True, "persons": True},
+    "shoulder": {"stagnancy": False, "persons": True}, # Parked / broken-down cars are expected
+    "crosswalk": {"stagnancy": True, "persons": False}, # Pedestrians are expected
+    "ignore": None,
+}
+
+# Thresholds that can differ per zone (the rest stay per camera)
+ZONE_THRESHOLDS = ("stagnant_max_motion_px", "overturned_ar_high", "overturned_ar_low", "crash_iou")
+
+
+class ZoneMap:
+    def __init__(self, zones, thresholds, size=None, anchor="center"):
+        """
+        Per-camera zone layout used by analyze_incident.
+
+        zones: list of {"name", "type", "polygon": [[x, y], ...], "thresholds": {...}}.
+               Where polygons overlap, later zones win. Area outside every
+               zone behaves as a lane with the camera thresholds.
+        thresholds: camera-level analysis thresholds (per-zone entries of
+                    ZONE_THRESHOLDS override them inside a zone).
+        size: (width, height) the polygons were drawn at; they are scaled to
+              the actual frame resolution.
+        anchor: "center" or "bottom" (ground contact point) of a box used for
+                the zone lookup.
+
+        Zones are rasterized once per frame resolution into a uint8 label
+        mask, so assigning boxes to zones is a single array lookup.
+        """
+        if len(zones) > 254:
+            raise ValueError("At most 254 zones per camera")
+        if anchor not in ("center", "bottom"):
+            raise ValueError(f"Unknown anchor: {anchor}")
+        for zone in zones:
+            if zone.get("type") not in ZONE_TYPES:
+                raise ValueError(f"Unknown zone type {zone.get('type')!r} in zone {zone.get('name')!r}")
+        self.zones = zones
+        self.thresholds = dict(thresholds)
+        self.size = tuple(size) if size else None
+        self.anchor = anchor
+
+        # Label -> behaviour lookup tables (label 0: outside every zone)
+        n = len(zones) + 1
+        self.ignored = np.zeros(n, dtype=bool)
+        self.count_stagnant = np.ones(n, dtype=bool)
+        self.count_persons = np.ones(n, dtype=bool)
+        self.tables = {key: np.full(n, float(self.thresholds[key])) for key in ZONE_THRESHOLDS}
+        for label, zone in enumerate(zones, start=1):
+            behaviour = ZONE_TYPES[zone["type"]]
+            if behaviour is None:
+                self.ignored[label] = True
+                continue
+            self.count_stagnant[label] = behaviour["stagnancy"]
+            self.count_persons[label] = behaviour["persons"]
+            for key, value in zone.get("thresholds", {}).items():
+                if key not in self.tables:
+                    raise ValueError(f"Threshold {key!r} cannot be set per zone")
+                self.tables[key][label] = value
+        self._masks = {} # (h, w) -> label mask
+        self.config = None # Source config (see from_config), recorded with events for replay
+
+    @classmethod
+    def from_config(cls, config, thresholds):
+        """
+        config: {"size": [w, h], "anchor": ..., "thresholds": {...}, "zones": [...]}
+        """
+        zone_map = cls(config.get("zones", []), dict(thresholds, **config.get("thresholds", {})),
+                       size=config.get("size"), anchor=config.get("anchor", "center"))
+        zone_map.config = config
+        return zone_map
+
+    def mask_for(self, shape):
+        """
+        Label mask (uint8, frame resolution) for a frame of shape (h, w, ...).
+        """
+        if shape is None:
+            if self.size is None:
+                raise ValueError("Frame shape unknown and zone config has no size")
+            shape = (self.size[1], self.size[0])
+        h, w = int(shape[0]), int(shape[1])
+        mask = self._masks.get((h, w))
+        if mask is None:
+            mask = np.zeros((h, w), dtype=np.uint8)
+            sx, sy = (w / self.size[0], h / self.size[1]) if self.size else (1.0, 1.0)
+            for label, zone in enumerate(self.zones, start=1):
+                pts = np.round(np.asarray(zone["polygon"], dtype=np.float64) * (sx, sy)).astype(np.int32)
+                cv2.fillPoly(mask, [pts], int(label))
+            self._masks[(h, w)] = mask
+        return mask
+
+    def lookup(self, xyxy, shape):
+        """
+        Zone label of every box (N, 4) in a frame of the given shape.
+        """
+        mask = self.mask_for(shape)
+        h, w = mask.shape
+        x = (xyxy[:, 0] + xyxy[:, 2]) / 2
+        y = xyxy[:, 3] - 1 if self.anchor == "bottom" else (xyxy[:, 1] + xyxy[:, 3]) / 2
+        x = np.clip(x.astype(np.int64), 0, w - 1)
+        y = np.clip(y.astype(np.int64), 0, h - 1)
+        return mask[y, x]
+
+    def zone_name(self, label):
+        return self.zones[label - 1].get("name", self.zones[label - 1]["type"]) if label else None
+
+
+def load_zone_config(path):
+    """
+    Reads a zone configuration file: {camera_id: config, ...}; the key "*"
+    applies to every camera without its own entry.
+    """
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)